@@ -0,0 +1,408 @@
+#!/usr/bin/env python3
+"""
+Benchmarks of the startup, dispatch and database paths.
+
+Every benchmark is timed with :mod:`timeit`-style repeats, and the results are
+written as JSON, so they can be kept as a baseline and compared against later:
+
+    python benchmarks/run.py --save main
+    python benchmarks/run.py --compare main
+
+The database benchmarks run against a throwaway SQLite database (if aiosqlite
+is installed), or with ``--database``, against the database of a snadra
+configuration file (the benchmark creates and deletes workspaces named
+``bench-*``).
+"""
+import argparse
+import asyncio
+import contextlib
+import json
+import os
+import pathlib
+import platform
+import shlex
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+import timeit
+from typing import Any, Awaitable, Callable, Dict, Iterator, List, Optional
+
+BASE_DIR = pathlib.Path(__file__).resolve().parents[1]
+SRC_DIR = BASE_DIR / "src"
+BASELINES_DIR = BASE_DIR / "benchmarks" / ".baselines"
+
+if str(SRC_DIR) not in sys.path:
+    sys.path.insert(0, str(SRC_DIR))
+
+from _snadra.cmd.base import Commands  # noqa: E402
+from _snadra.cmd.parsers import dispatch_line, parse_line, tokenize  # noqa: E402
+from _snadra.cmd.utils import console, error_console  # noqa: E402
+
+# A benchmark regressed if its fastest repeat is slower than the baseline's by more
+# than this fraction (the fastest repeat is the least noisy one)
+DEFAULT_THRESHOLD = 0.25
+
+PARSE_LINES = {
+    "simple": "help workspace",
+    "options": "workspace --add my-workspace --desc 'the workspace of the week'",
+    "background": 'workspace --export "/tmp/some dir/workspaces.csv" &',
+    "long": "workspace " + " ".join(f"arg{i}" for i in range(10_000)),
+    "quotes": "workspace " + " ".join("'a b' \"c d\"" for _ in range(2_500)),
+    "escapes": "workspace " + "\\ " * 10_000,
+    "whitespace": "help" + " \t" * 10_000 + "workspace",
+    "unbalanced": "workspace 'unterminated " + "x " * 5_000,
+}
+
+DISPATCH_LINES = ["help", "help workspace", "jobs", "stats"]
+
+COLD_START_CODE = """
+import pathlib, sys, time
+start = time.perf_counter()
+from _snadra.cmd.base import Commands
+Commands(manifest_path=pathlib.Path(sys.argv[1]))
+print(time.perf_counter() - start)
+"""
+
+
+class Result:
+    """
+    Timings of a single benchmark, in seconds per call.
+    """
+
+    def __init__(self, timings: List[float], number: int) -> None:
+        self.timings = timings
+        self.number = number
+
+    def to_json(self) -> Dict[str, Any]:
+        median = statistics.median(self.timings)
+        return {
+            "number": self.number,
+            "repeat": len(self.timings),
+            "min_us": min(self.timings) * 1e6,
+            "median_us": median * 1e6,
+            "max_us": max(self.timings) * 1e6,
+            "ops_per_sec": 1 / median if median else None,
+        }
+
+
+class Runner:
+    """
+    Run benchmarks and collect their results.
+    """
+
+    def __init__(self, repeat: int, pattern: Optional[str] = None) -> None:
+        self.repeat = repeat
+        self.pattern = pattern
+        self.results: Dict[str, Result] = {}
+
+    def selected(self, name: str) -> bool:
+        return self.pattern is None or self.pattern in name
+
+    def add(self, name: str, result: Result) -> None:
+        self.results[name] = result
+        summary = result.to_json()
+        print(
+            f"{name:<40} {summary['median_us']:>12.1f} us"
+            f" (min {summary['min_us']:.1f}, x{result.number})",
+            file=sys.stderr,
+        )
+
+    def bench(self, name: str, func: Callable[[], Any]) -> None:
+        """
+        Time a function.
+        """
+        if not self.selected(name):
+            return
+
+        timer = timeit.Timer(func)
+        number, _ = timer.autorange()
+        timings = [seconds / number for seconds in timer.repeat(self.repeat, number)]
+        self.add(name, Result(timings, number))
+
+    async def bench_async(
+        self, name: str, func: Callable[[], Awaitable[Any]], number: int = 100
+    ) -> None:
+        """
+        Time a coroutine function, on the running event loop.
+        """
+        if not self.selected(name):
+            return
+
+        timings = []
+        for _ in range(self.repeat):
+            start = time.perf_counter()
+            for _ in range(number):
+                await func()
+            timings.append((time.perf_counter() - start) / number)
+        self.add(name, Result(timings, number))
+
+    def bench_process(self, name: str, argv: List[str], setup: Callable[[], Any]):
+        """
+        Time a fresh interpreter, which prints its own measurement.
+        """
+        if not self.selected(name):
+            return
+
+        env = dict(os.environ)
+        env["PYTHONPATH"] = os.pathsep.join(
+            filter(None, [str(SRC_DIR), env.get("PYTHONPATH")])
+        )
+        timings = []
+        for _ in range(self.repeat):
+            setup()
+            output = subprocess.run(
+                argv, check=True, env=env, stdout=subprocess.PIPE, text=True
+            ).stdout
+            timings.append(float(output.strip()))
+        self.add(name, Result(timings, 1))
+
+
+@contextlib.contextmanager
+def silenced() -> Iterator[None]:
+    """
+    Send the output of the consoles to the void, so rendering is still measured
+    but the terminal isn't.
+    """
+    with open(os.devnull, "w") as devnull:
+        files = console.file, error_console.file
+        console.file = error_console.file = devnull
+        try:
+            yield
+        finally:
+            console.file, error_console.file = files
+
+
+def bench_startup(runner: Runner, tmp_dir: pathlib.Path) -> None:
+    manifest_path = tmp_dir / "manifest.json"
+
+    def remove_manifest():
+        with contextlib.suppress(FileNotFoundError):
+            manifest_path.unlink()
+
+    argv = [sys.executable, "-c", COLD_START_CODE, str(manifest_path)]
+    runner.bench_process("startup.process_cold_manifest", argv, remove_manifest)
+    runner.bench_process("startup.process_warm_manifest", argv, lambda: None)
+
+    runner.bench(
+        "startup.commands_cold_manifest",
+        lambda: (remove_manifest(), Commands(manifest_path=manifest_path)),
+    )
+    runner.bench(
+        "startup.commands_warm_manifest",
+        lambda: Commands(manifest_path=manifest_path),
+    )
+
+
+def bench_parse(runner: Runner) -> None:
+    for name, line in PARSE_LINES.items():
+        # A line that was not tokenized recently
+        runner.bench(
+            f"parse_line.{name}",
+            lambda line=line: (tokenize.cache_clear(), parse_line(line)),
+        )
+        # A replayed line
+        runner.bench(f"parse_line.{name}_cached", lambda line=line: parse_line(line))
+
+
+async def bench_dispatch(runner: Runner, commands: Commands) -> None:
+    help_command = commands.get_command("help")
+    help_args = argparse.Namespace(topic=None)
+    await runner.bench_async("help.render", lambda: help_command.run(help_args))
+
+    for line in DISPATCH_LINES:
+        await runner.bench_async(
+            f"dispatch_line.{line.replace(' ', '_')}",
+            lambda line=line: dispatch_line(line, commands=commands),
+        )
+
+
+def database_config(
+    config_path: Optional[pathlib.Path], tmp_dir: pathlib.Path
+) -> Optional[Dict[str, Any]]:
+    """
+    Get the configuration of the database to benchmark, if there is one.
+    """
+    from _snadra.config import DEFAULT_CONFIG, load_config
+
+    if config_path is not None:
+        return load_config(config_path)["database"]
+
+    try:
+        import aiosqlite  # noqa: F401
+    except ImportError:
+        print("aiosqlite is not installed, skipping the database", file=sys.stderr)
+        return None
+
+    return dict(
+        DEFAULT_CONFIG["database"], type="sqlite", path=str(tmp_dir / "bench.sqlite3")
+    )
+
+
+async def bench_database(
+    runner: Runner, commands: Commands, config: Dict[str, Any]
+) -> None:
+    from _snadra.db.config import dispose_engine, get_engine
+    from _snadra.db.utils import start_db
+
+    engine = get_engine(config)
+    await start_db(engine)
+
+    counter = iter(range(sys.maxsize))
+
+    async def cycle():
+        name = shlex.quote(f"bench-{next(counter)}")
+        await dispatch_line(f"workspace --add {name}", commands=commands)
+        await dispatch_line("workspace --filter bench-", commands=commands)
+        await dispatch_line(f"workspace --delete {name}", commands=commands)
+
+    try:
+        await runner.bench_async("workspace.add_list_delete", cycle, number=20)
+        await runner.bench_async(
+            "dispatch_line.workspace",
+            lambda: dispatch_line("workspace", commands=commands),
+        )
+    finally:
+        await dispose_engine()
+
+
+async def run_all(runner: Runner, database: Optional[pathlib.Path]) -> None:
+    with tempfile.TemporaryDirectory() as tmp_dir:
+        bench_startup(runner, pathlib.Path(tmp_dir))
+        commands = Commands(manifest_path=pathlib.Path(tmp_dir) / "manifest.json")
+
+        config = database_config(database, pathlib.Path(tmp_dir))
+
+        with silenced():
+            bench_parse(runner)
+            await bench_dispatch(runner, commands)
+            if config is not None:
+                await bench_database(runner, commands, config)
+
+        await commands.jobs.shutdown()
+
+
+def metadata() -> Dict[str, Any]:
+    try:
+        commit = subprocess.run(
+            ["git", "rev-parse", "--short", "HEAD"],
+            cwd=BASE_DIR,
+            stdout=subprocess.PIPE,
+            stderr=subprocess.DEVNULL,
+            text=True,
+        ).stdout.strip()
+    except OSError:
+        commit = ""
+
+    return {
+        "commit": commit or None,
+        "machine": platform.machine(),
+        "platform": platform.platform(),
+        "python": platform.python_version(),
+        "timestamp": time.strftime("%Y-%m-%dT%H:%M:%S%z"),
+    }
+
+
+def compare(
+    current: Dict[str, Any], baseline: Dict[str, Any], threshold: float
+) -> List[str]:
+    """
+    Print how the current results differ from the baseline.
+
+    Returns
+    -------
+    List[str]
+        Names of the benchmarks that regressed by more than ``threshold``.
+    """
+    regressions = []
+    print(f"{'benchmark':<40} {'baseline':>12} {'current':>12} {'ratio':>7}")
+    for name, result in current["results"].items():
+        base = baseline["results"].get(name)
+        if base is None:
+            print(f"{name:<40} {'-':>12} {result['min_us']:>12.1f}")
+            continue
+
+        ratio = result["min_us"] / base["min_us"]
+        mark = ""
+        if ratio > 1 + threshold:
+            regressions.append(name)
+            mark = "  REGRESSION"
+        print(
+            f"{name:<40} {base['min_us']:>12.1f} {result['min_us']:>12.1f}"
+            f" {ratio:>7.2f}{mark}"
+        )
+
+    return regressions
+
+
+def baseline_path(name: str) -> pathlib.Path:
+    path = pathlib.Path(name)
+    if path.suffix == ".json":
+        return path
+    return BASELINES_DIR / f"{name}.json"
+
+
+def main(args: argparse.Namespace) -> int:
+    runner = Runner(repeat=args.repeat, pattern=args.filter)
+    asyncio.run(run_all(runner, args.database))
+
+    current = {
+        "meta": metadata(),
+        "results": {name: result.to_json() for name, result in runner.results.items()},
+    }
+
+    if args.save is not None:
+        path = baseline_path(args.save)
+        path.parent.mkdir(parents=True, exist_ok=True)
+        path.write_text(json.dumps(current, indent=2, sort_keys=True) + "\n")
+        print(f"Saved results to {path}", file=sys.stderr)
+
+    if args.compare is not None:
+        baseline = json.loads(baseline_path(args.compare).read_text())
+        regressions = compare(current, baseline, args.threshold)
+        if regressions:
+            print(f"Regressions: {', '.join(regressions)}", file=sys.stderr)
+            return 1
+    elif args.save is None:
+        json.dump(current, sys.stdout, indent=2, sort_keys=True)
+        sys.stdout.write("\n")
+
+    return 0
+
+
+if __name__ == "__main__":
+    argparser = argparse.ArgumentParser(description="Run the snadra benchmarks")
+    argparser.add_argument(
+        "--save",
+        metavar="NAME",
+        help="Save the results as a baseline (a name, or a path to a '.json' file)",
+    )
+    argparser.add_argument(
+        "--compare",
+        metavar="NAME",
+        help="Compare the results with a baseline, and fail on regressions",
+    )
+    argparser.add_argument(
+        "--threshold",
+        default=DEFAULT_THRESHOLD,
+        type=float,
+        help="Allowed slowdown before failing a comparison (default: %(default)s)",
+    )
+    argparser.add_argument(
+        "--database",
+        metavar="CONFIG",
+        type=pathlib.Path,
+        help="Configuration file of a throwaway database (default: a SQLite file)",
+    )
+    argparser.add_argument(
+        "-k",
+        "--filter",
+        metavar="SUBSTRING",
+        help="Only run the benchmarks whose name contains SUBSTRING",
+    )
+    argparser.add_argument(
+        "--repeat", default=5, type=int, help="Repeats of each benchmark"
+    )
+
+    sys.exit(main(argparser.parse_args()))
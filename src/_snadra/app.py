@@ -1,43 +1,183 @@
-from prompt_toolkit import PromptSession
-from prompt_toolkit.auto_suggest import AutoSuggestFromHistory
-from prompt_toolkit.completion import WordCompleter
-from prompt_toolkit.history import InMemoryHistory
-from prompt_toolkit.patch_stdout import patch_stdout
+import pathlib
+from typing import IO, TYPE_CHECKING, Optional
 
+from _snadra.batch import BatchReport, read_lines, run_lines
 from _snadra.cmd.base import Commands
 from _snadra.cmd.parsers import dispatch_line
 from _snadra.cmd.utils import console
-from _snadra.state import state
+from _snadra.config import get_config, get_config_service
+from _snadra.db.config import dispose_engine, update_engine
+from _snadra.jobs import JobManager
+from _snadra.output import Output, get_output, set_output
+from _snadra.state import get_session
+from _snadra.stats import Stats
+
+if TYPE_CHECKING:
+    from _snadra.config.service import Config
 
 
 class SnadraApplication:
     def __init__(self):
-        self.commands = Commands()
-        self.config = ""
+        self.config_service = get_config_service()
+        set_output(Output(self.config["output"]["mode"]))
+        jobs = JobManager(max_concurrent=self.config["jobs"]["max_concurrent"])
+        stats = Stats(**self.config["stats"])
+        plugins = self.config["plugins"]
+        self.commands = Commands(
+            jobs=jobs,
+            stats=stats,
+            plugin_paths=[pathlib.Path(path).expanduser() for path in plugins["paths"]],
+            max_workers=plugins["max_workers"],
+        )
         self.current_workspace = ""
 
+    @property
+    def config(self) -> "Config":
+        """
+        The configuration of the current workspace, see
+        :func:`_snadra.config.get_config`.
+        """
+        return get_config()
+
+    async def refresh_config(self) -> None:
+        """
+        Pick up the changes of the configuration files, and of the current
+        workspace, reporting any error.
+
+        Notes
+        -----
+        Only the interactive console calls it, before every line. Scripts and
+        the daemon keep the configuration that they started with.
+        """
+        try:
+            self.config_service.refresh()
+        except Exception as err:
+            console.log(
+                f"[red]Error[/red]: Failed to reload the configuration: {err!r}"
+            )
+
+        config = self.config
+        if get_output().mode != config["output"]["mode"]:
+            set_output(Output(config["output"]["mode"]))
+        try:
+            await update_engine(config["database"])
+        except Exception as err:
+            console.log(
+                f"[red]Error[/red]: Failed to switch the database, keeping the"
+                f" previous one: {err!r}"
+            )
+
     async def run(self) -> None:  # pragma: no cover # TODO: Remove this pragma
         """
         The main loop.
 
         This is an infitine loop, until the user decides to exit.
+        The background jobs are cancelled and the database connections are closed
+        when the loop ends.
         """
+        from prompt_toolkit.patch_stdout import patch_stdout
+
         self.__running = True
 
-        while self.__running:
-            try:
-                current_workspace = state["current_workspace"]
-                self.__prompt.message = f"({current_workspace}) snadra > "
-                with patch_stdout():
-                    line = await self.__prompt.prompt_async()
-                await dispatch_line(line, commands=self.commands)
-            except (EOFError, SystemExit):
-                self.__running = False
-            except KeyboardInterrupt:
-                pass
-            except Exception:
-                # Unexpected errors, we catch them so the application won't crash.
-                console.print_exception(width=None, show_locals=True)
+        watcher = None
+        if self.config["reload"]["enabled"]:
+            from _snadra.cmd.reload import CommandsWatcher
+
+            watcher = CommandsWatcher(
+                self.commands,
+                interval=self.config["reload"]["interval"],
+                force_polling=self.config["reload"]["force_polling"],
+            )
+            watcher.start()
+
+        try:
+            while self.__running:
+                try:
+                    await self.refresh_config()
+                    current_workspace = get_session().current_workspace
+                    self.__history.workspace = current_workspace
+                    self.__prompt.message = f"({current_workspace}) snadra > "
+                    with patch_stdout():
+                        line = await self.__prompt.prompt_async()
+                    await dispatch_line(line, commands=self.commands)
+                except EOFError:
+                    self.__running = False
+                except SystemExit:
+                    # The parser of a command printed a usage error, or the
+                    # help of ``-h``.
+                    pass
+                except KeyboardInterrupt:
+                    pass
+                except Exception:
+                    # Unexpected errors, we catch them so the application won't
+                    # crash.
+                    console.print_exception(width=None, show_locals=True)
+        finally:
+            if watcher is not None:
+                await watcher.stop()
+            await self.__history.flush()
+            await self.commands.jobs.shutdown()
+            await dispose_engine()
+
+    async def run_script(self, file_obj: IO[str]) -> BatchReport:
+        """
+        Execute the lines of a script, without the interactive prompt.
+
+        Parameters
+        ----------
+        file_obj : IO[str]
+            The script, either a resource file or a pipe (like `sys.stdin`).
+
+        Returns
+        -------
+        BatchReport
+            Summary of the execution.
+
+        Notes
+        -----
+        The background jobs that the script started are awaited before returning.
+
+        See Also
+        --------
+        _snadra.batch.run_lines
+        """
+        try:
+            report = await run_lines(read_lines(file_obj), commands=self.commands)
+            await self.commands.jobs.join()
+            return report
+        finally:
+            await self.commands.jobs.shutdown()
+            await dispose_engine()
+
+    async def run_daemon(self, socket_path: Optional[pathlib.Path] = None) -> None:
+        """
+        Serve the commands to the clients of a Unix socket, until cancelled.
+
+        Parameters
+        ----------
+        socket_path : pathlib.Path, optional
+            Path of the socket, defaults to the configured path.
+
+        See Also
+        --------
+        _snadra.daemon.SnadraDaemon
+        """
+        from _snadra.daemon import SnadraDaemon
+
+        config = self.config["daemon"]
+        if socket_path is None:
+            socket_path = pathlib.Path(config["socket_path"]).expanduser()
+
+        daemon = SnadraDaemon(
+            self.commands, socket_path=socket_path, socket_mode=config["socket_mode"]
+        )
+        await daemon.start()
+        console.log(f"Listening on {socket_path}")
+        try:
+            await daemon.serve_forever()
+        finally:
+            await self.commands.jobs.shutdown()
+            await dispose_engine()
 
     def _setup_prompt(self) -> None:  # pragma: no cover
         """
@@ -48,10 +188,21 @@ class SnadraApplication:
         The only reason for this being in a seperate function is that it changes
         the `sys.stdout` and `sys.stderr` which disturbes `pytest`.
         """
-        current_workspace = state["current_workspace"]
+        from prompt_toolkit import PromptSession
+
+        from _snadra.completion import SnadraCompleter
+        from _snadra.config import DEFAULT_HISTORY_DIR_PATH
+        from _snadra.history import IndexedAutoSuggest, WorkspaceHistory
+
+        current_workspace = get_session().current_workspace
+        self.__history = WorkspaceHistory(
+            DEFAULT_HISTORY_DIR_PATH,
+            workspace=current_workspace,
+            **self.config["history"],
+        )
         self.__prompt: "PromptSession[str]" = PromptSession(
             f"({current_workspace}) snadra > ",
-            auto_suggest=AutoSuggestFromHistory(),
-            history=InMemoryHistory(),
-            completer=WordCompleter(self.commands.keywords),
+            auto_suggest=IndexedAutoSuggest(self.__history),
+            history=self.__history,
+            completer=SnadraCompleter(self.commands),
         )
@@ -0,0 +1,177 @@
+"""
+Non-interactive execution of scripts.
+
+Lines are fed directly into the command dispatcher, without the prompt.
+"""
+import asyncio
+import time
+from typing import IO, TYPE_CHECKING, AsyncIterator, Awaitable, List, NamedTuple
+
+from _snadra.cmd.parsers import dispatch, parse_line
+from _snadra.cmd.utils import error_console
+
+if TYPE_CHECKING:
+    from _snadra.cmd.base import Commands
+
+# Bytes of lines to read from the script at once
+READ_SIZE = 64 * 1024
+
+
+class BatchReport(NamedTuple):
+    """
+    Summary of a script execution.
+    """
+
+    lines: int
+    errors: int
+    seconds: float
+
+    @property
+    def lines_per_second(self) -> float:
+        """
+        Throughput of the execution.
+
+        Examples
+        --------
+        >>> BatchReport(lines=10, errors=0, seconds=2.0).lines_per_second
+        5.0
+        """
+        if self.seconds == 0:
+            return float(self.lines)
+        return self.lines / self.seconds
+
+
+async def read_lines(file_obj: IO[str]) -> AsyncIterator[str]:
+    """
+    Read lines from a file without blocking the event loop.
+
+    Parameters
+    ----------
+    file_obj : IO[str]
+        The file to read, may be a pipe (like `sys.stdin`).
+
+    Yields
+    ------
+    str
+        Lines of the file.
+    """
+    loop = asyncio.get_running_loop()
+    while True:
+        lines = await loop.run_in_executor(None, file_obj.readlines, READ_SIZE)
+        if not lines:
+            return
+        for line in lines:
+            yield line
+
+
+async def _guard(awaitable: Awaitable[None]) -> bool:
+    """
+    Await a dispatch, reporting unexpected errors instead of raising them.
+
+    Returns
+    -------
+    bool
+        Whether the dispatch succeeded.
+
+    Raises
+    ------
+    EOFError
+        If the command exits (like ``exit``).
+    """
+    try:
+        await awaitable
+    except (EOFError, asyncio.CancelledError):
+        raise
+    except SystemExit as err:
+        # The parser of the command exits on a usage error (after printing
+        # it), or after printing the help of ``-h``.
+        return err.code in {0, None}
+    except Exception:
+        error_console.print_exception(width=None)
+        return False
+    return True
+
+
+async def run_lines(lines: AsyncIterator[str], *, commands: "Commands") -> BatchReport:
+    """
+    Execute the lines of a script.
+
+    Parameters
+    ----------
+    lines : AsyncIterator[str]
+        The lines to execute. Empty lines and lines that start with ``#`` are
+        skipped.
+    commands : Commands
+        Commands object.
+
+    Returns
+    -------
+    BatchReport
+        Summary of the execution.
+
+    Notes
+    -----
+    Consecutive lines whose commands are :attr:`CommandMeta.concurrent` are
+    executed concurrently, any other line waits for all the lines before it and
+    blocks the lines after it. The script stops at the first command that exits
+    (like ``exit``), after the concurrent lines before it finish.
+
+    A line fails if it can not be tokenized, if its command is unknown, if its
+    arguments are not valid, or if its command raises.
+    """
+    executed = 0
+    errors = 0
+    pending: List[Awaitable[bool]] = []
+
+    async def flush() -> None:
+        nonlocal errors
+        if not pending:
+            return
+        awaitables = pending.copy()
+        pending.clear()
+        results = await asyncio.gather(*awaitables, return_exceptions=True)
+        errors += results.count(False)
+        for result in results:
+            if isinstance(result, BaseException):
+                raise result
+
+    start = time.perf_counter()
+    try:
+        async for line in lines:
+            if line.lstrip().startswith("#") or not line.strip():
+                continue
+
+            pline = parse_line(line)
+            command = None if pline is None else commands.get_command(pline[0])
+            if command is None or not command.concurrent:
+                await flush()
+
+            executed += 1
+            if pline is None:
+                errors += 1
+            elif command is None:
+                # Reports the unknown command.
+                await dispatch(pline, commands=commands)
+                errors += 1
+            elif command.concurrent:
+                pending.append(_guard(dispatch(pline, commands=commands)))
+            elif not await _guard(dispatch(pline, commands=commands)):
+                errors += 1
+
+        await flush()
+    except EOFError:
+        pass
+
+    return BatchReport(
+        lines=executed, errors=errors, seconds=time.perf_counter() - start
+    )
+
+
+def print_report(report: BatchReport) -> None:
+    """
+    Print the summary of a script execution to stderr.
+    """
+    error_console.log(
+        f"Executed {report.lines} lines ({report.errors} failed)"
+        f" in {report.seconds:.3f}s, {report.lines_per_second:.1f} lines/s"
+    )
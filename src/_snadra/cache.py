@@ -0,0 +1,139 @@
+"""
+In-memory caches.
+"""
+import collections
+import time
+from typing import Any, Callable, Hashable, Optional, OrderedDict, Tuple
+
+
+class TTLCache:
+    """
+    Size bounded, least recently used cache, whose entries expire.
+
+    Parameters
+    ----------
+    maxsize : int
+        Maximum number of entries, the least recently used entry is evicted
+        when a new entry would exceed it.
+    ttl : float
+        Seconds until an entry expires.
+    timer : Callable[[], float], optional
+        Clock for the expiration, defaults to :func:`time.monotonic`.
+
+    Notes
+    -----
+    Every invalidation (:meth:`TTLCache.pop` or :meth:`TTLCache.clear`)
+    increments :attr:`TTLCache.generation`. Code that computes a value
+    across an ``await`` should read the generation first, and pass it to
+    :meth:`TTLCache.set`, so a value that was computed before an
+    invalidation is not cached after it.
+
+    Examples
+    --------
+    >>> cache = TTLCache(maxsize=2, ttl=60)
+    >>> cache.set("a", 1)
+    >>> cache.set("b", 2)
+    >>> cache.set("c", 3)
+    >>> cache.get("a") is None, cache.get("c")
+    (True, 3)
+    """
+
+    __slots__ = {
+        "_data",
+        "generation",
+        "maxsize",
+        "timer",
+        "ttl",
+    }
+
+    def __init__(
+        self,
+        maxsize: int,
+        ttl: float,
+        timer: Optional[Callable[[], float]] = None,
+    ) -> None:
+        if maxsize < 1:
+            raise ValueError("maxsize must be at least 1")
+
+        self.maxsize = maxsize
+        self.ttl = ttl
+        self.timer = time.monotonic if timer is None else timer
+        self.generation = 0
+        self._data: OrderedDict[Hashable, Tuple[float, Any]] = collections.OrderedDict()
+
+    def get(self, key: Hashable, default: Any = None) -> Any:
+        """
+        Get the value of a key.
+
+        Parameters
+        ----------
+        key : Hashable
+            Key to look for.
+        default : Any, optional
+            Value to return if ``key`` is missing or expired.
+
+        Returns
+        -------
+        Any
+            The cached value, or ``default``.
+        """
+        try:
+            expires_at, value = self._data[key]
+        except KeyError:
+            return default
+
+        if expires_at <= self.timer():
+            del self._data[key]
+            return default
+
+        self._data.move_to_end(key)
+        return value
+
+    def set(self, key: Hashable, value: Any, generation: Optional[int] = None) -> None:
+        """
+        Set the value of a key.
+
+        Parameters
+        ----------
+        key : Hashable
+            Key to set.
+        value : Any
+            Value to cache.
+        generation : int, optional
+            The :attr:`TTLCache.generation` that ``value`` was computed in,
+            if the cache was invalidated since, ``value`` is not cached.
+        """
+        if generation is not None and generation != self.generation:
+            return
+
+        self._data[key] = (self.timer() + self.ttl, value)
+        self._data.move_to_end(key)
+
+        while len(self._data) > self.maxsize:
+            self._data.popitem(last=False)
+
+    def pop(self, key: Hashable) -> None:
+        """
+        Remove a key, if it is cached.
+
+        Parameters
+        ----------
+        key : Hashable
+            Key to remove.
+        """
+        self._data.pop(key, None)
+        self.generation += 1
+
+    def clear(self) -> None:
+        """
+        Remove all the entries.
+        """
+        self._data.clear()
+        self.generation += 1
+
+    def __contains__(self, key: Hashable) -> bool:
+        sentinel = object()
+        return self.get(key, sentinel) is not sentinel
+
+    def __len__(self) -> int:
+        return len(self._data)
@@ -1,16 +1,33 @@
-import importlib
-import importlib.util
+import os
 import pathlib
-import sys
-from typing import TYPE_CHECKING, Iterable, Optional, Set
+from typing import (
+    TYPE_CHECKING,
+    Dict,
+    Iterable,
+    KeysView,
+    List,
+    Optional,
+    Set,
+    Type,
+)
 
+from _snadra.cmd import loader
+from _snadra.cmd.loader import CommandRoot
+from _snadra.cmd.manifest import Manifest, ManifestEntry
 from _snadra.cmd.utils import iter_dir
+from _snadra.config.constants import DEFAULT_MANIFEST_FILE_PATH
+from _snadra.jobs import JobManager
+from _snadra.output import get_output
+from _snadra.stats import Stats
 
 if TYPE_CHECKING:
     import types
 
     from _snadra.cmd.utils import CommandMeta
 
+# The package of the core commands
+CORE_PACKAGE = "_snadra.cmd.commands"
+
 
 class Commands:
     """
@@ -21,50 +38,291 @@ class Commands:
     path : pathlib.Path, optional.
         Path to the directory with the commands to load.
         If not specified, the snadra's core commands directory is being loaded.
-        Sequence containing strings of paths to the command directories.
     skip : Union[Sequence[str], Set[str], FrozenSet[str]]], optional.
         Module names to skip.
+    manifest_path : pathlib.Path, optional.
+        Path of the commands manifest file.
+        If not specified, the manifest is kept in snadra's cache directory.
+    jobs : JobManager, optional.
+        Manager for the commands that run in the background.
+    stats : Stats, optional.
+        Instrumentation of the dispatched commands.
+    plugin_paths : Iterable[pathlib.Path], optional.
+        More directories with commands to load, after ``path``.
+    max_workers : int, optional.
+        Most threads to read the modules that changed with.
 
     Notes
     -----
     The module names inside `skip`, should not be with a file suffix.
+
+    Each command is instantiated only once, the first time it is requested,
+    so its :class:`argparse.ArgumentParser` is built once and reused on every
+    dispatch. Use :meth:`Commands.invalidate` to drop a cached instance
+    (for example after the command's module got reloaded).
+
+    The command modules are not imported when the object is created, their
+    keywords, aliases and descriptions are read from a :class:`Manifest`.
+    A module is imported only the first time its command is requested. The
+    modules whose metadata can not be read statically are imported right away,
+    a module that fails to import is reported, and skipped.
+
+    The directories are searched recursively, and every module is imported
+    under a name that is unique to its directory, see
+    :mod:`_snadra.cmd.loader`. A command of a later directory replaces a
+    command with the same keyword of an earlier one.
+
+    Use :meth:`Commands.reload` to pick up a module that changed on disk,
+    without loading the other modules again.
     """
 
     __slots__ = {
+        "_classes",
         "_commands_alias",
         "_commands_core",
+        "_instances",
         "commands",
+        "jobs",
+        "manifest",
+        "path",
+        "roots",
+        "stats",
     }
 
     def __init__(
         self,
         path: Optional[pathlib.Path] = None,
         skip: Optional[Set[str]] = None,
+        manifest_path: Optional[pathlib.Path] = None,
+        jobs: Optional[JobManager] = None,
+        stats: Optional[Stats] = None,
+        plugin_paths: Iterable[pathlib.Path] = (),
+        max_workers: Optional[int] = None,
     ) -> None:
+        core_path = pathlib.Path(__file__).parent.resolve() / "commands"
         if path is None:
-            path = pathlib.Path(__file__).parent / "commands"
+            path = core_path
+        if manifest_path is None:
+            manifest_path = DEFAULT_MANIFEST_FILE_PATH
 
-        module_paths = iter_dir(path=path, skip=skip)
-        modules = Commands.fetch_modules(file_paths=module_paths)
+        self.path = path
+        self.roots: List[CommandRoot] = [
+            CommandRoot(core_path, CORE_PACKAGE)
+            if root_path.resolve() == core_path
+            else CommandRoot.plugin(root_path)
+            for root_path in [path, *plugin_paths]
+        ]
+        self._commands_core: Dict[str, ManifestEntry] = {}
+        self._commands_alias: Dict[str, ManifestEntry] = {}
+        self._classes: Dict[str, Type["CommandMeta"]] = {}
+        self._instances: Dict[str, "CommandMeta"] = {}
+        self.commands: Dict[str, ManifestEntry] = {}
+        self.jobs = JobManager() if jobs is None else jobs
+        self.stats = Stats() if stats is None else stats
 
-        self._commands_core = {}
-        self._commands_alias = {}
+        self.manifest = Manifest(path=manifest_path)
+        module_paths = [
+            module_path
+            for root in self.roots
+            for module_path in iter_dir(path=root.path, skip=skip, recursive=True)
+        ]
+        entries = self.manifest.get_many(module_paths, max_workers=max_workers)
+        for module_path, entry in zip(module_paths, entries):
+            if entry is not None:
+                if entry.keyword:
+                    self._register_entry(entry)
+                continue
 
-        for module in modules:
-            command = module.Command  # type: ignore
-            core_keyword = command.keyword
-            self._commands_core[core_keyword] = command
-            if command.aliases is None:
+            # The metadata could not be read statically, import the module.
+            try:
+                module = self.load_module(path=module_path)
+            except Exception as err:
+                get_output().log(
+                    f"[red]Error[/red]: Failed to load commands from "
+                    f"{module_path.name}: {err!r}"
+                )
                 continue
+            command = getattr(module, "Command", None)
+            if command is None:
+                self.manifest.add_helper(module_path)
+            else:
+                self.register(command, path=module_path)
 
-            for alias in command.aliases:
-                self._commands_alias[alias] = command
+        self.manifest.prune()
+        self.manifest.save()
 
+    def register(
+        self,
+        command: Type["CommandMeta"],
+        path: Optional[pathlib.Path] = None,
+    ) -> None:
+        """
+        Register a command class, replacing any command with the same keyword.
+
+        Parameters
+        ----------
+        command : Type[:class:`CommandMeta`]
+            The command class to register.
+        path : pathlib.Path, optional
+            Path of the module that defines ``command``.
+
+        Notes
+        -----
+        Any cached instance of a command with the same keyword is invalidated,
+        so the next dispatch will build a fresh parser. If the keywords change,
+        all the cached instances are invalidated, since the arguments of a
+        command may depend on the other commands (like the topics of
+        ``help``).
+        """
+        entry = ManifestEntry(
+            keyword=command.keyword,  # type: ignore
+            aliases=frozenset(command.aliases or ()),  # type: ignore
+            description=command.description,  # type: ignore
+            long_help=command.long_help,  # type: ignore
+            path="" if path is None else str(path),
+            mtime_ns=0,
+            size=0,
+            digest="",
+        )
+        self._register_entry(entry)
+        self._classes[entry.keyword] = command
+
+    def _register_entry(self, entry: ManifestEntry) -> None:
+        keywords = self.commands.keys()
+        self._remove(entry.keyword)
+
+        self._commands_core[entry.keyword] = entry
+        for alias in entry.aliases:
+            self._commands_alias[alias] = entry
+
+        self._update_commands(keywords)
+
+    def _update_commands(self, keywords: KeysView[str]) -> None:
         self.commands = {**self._commands_alias, **self._commands_core}
+        if self._instances and self.commands.keys() != keywords:
+            self._instances.clear()
+
+    def unregister(self, keyword: str) -> bool:
+        """
+        Remove a command, with its aliases and its cached instance.
+
+        The other cached instances are invalidated too, see :meth:`register`.
+
+        Parameters
+        ----------
+        keyword : str
+            Core keyword of the command.
+
+        Returns
+        -------
+        bool
+            Whether the command was removed, `False` if it is not registered.
+        """
+        keywords = self.commands.keys()
+        if not self._remove(keyword):
+            return False
+
+        self._update_commands(keywords)
+        return True
+
+    def _remove(self, keyword: str) -> bool:
+        entry = self._commands_core.pop(keyword, None)
+        if entry is None:
+            return False
+
+        for alias in entry.aliases:
+            self._commands_alias.pop(alias, None)
+        self._classes.pop(keyword, None)
+        self._instances.pop(keyword, None)
+        return True
+
+    def reload(self, path: pathlib.Path) -> Set[str]:
+        """
+        Register again the command of a module that changed on disk.
+
+        Only this module is imported again. The commands that it no longer
+        defines (because it was removed, or because its keyword changed) are
+        unregistered.
+
+        Parameters
+        ----------
+        path : pathlib.Path
+            Path of the command module.
+
+        Returns
+        -------
+        Set[str]
+            The keywords that the module defines now.
+
+        Raises
+        ------
+        Exception
+            Anything that importing the module raises, in which case the
+            registered commands are left as they were.
+        """
+        key = os.path.realpath(path)
+        previous = {
+            keyword
+            for keyword, entry in self._commands_core.items()
+            if entry.path and os.path.realpath(entry.path) == key
+        }
+
+        command: Optional[Type["CommandMeta"]] = None
+        if path.is_file():
+            module = self.load_module(path=path, reload=True)
+            command = getattr(module, "Command", None)
+            if command is None:
+                self.manifest.add_helper(path)
+            else:
+                self.manifest.get(path)
+        else:
+            self.manifest.discard(path)
+
+        keywords = set() if command is None else {command.keyword}
+        for keyword in previous - keywords:
+            self.unregister(keyword)
+        if command is not None:
+            self.register(command, path=pathlib.Path(key))
+
+        self.manifest.save()
+        return keywords  # type: ignore
+
+    def invalidate(self, keyword: Optional[str] = None) -> None:
+        """
+        Drop cached command instances.
+
+        Parameters
+        ----------
+        keyword : str, optional
+            Keyword (or alias) of the command to invalidate.
+            If not specified, all the cached instances are dropped.
+        """
+        if keyword is None:
+            self._instances.clear()
+            return
+
+        entry = self.commands.get(keyword)
+        if entry is None:
+            return
+        self._instances.pop(entry.keyword, None)
+
+    def root_of(self, path: pathlib.Path) -> Optional[CommandRoot]:
+        """
+        Get the root directory of a command module.
+
+        Returns
+        -------
+        Optional[CommandRoot]
+            `None` if the module is not in any of the roots.
+        """
+        path = pathlib.Path(os.path.realpath(path))
+        for root in reversed(self.roots):
+            if root.contains(path):
+                return root
+        return None
 
-    @staticmethod
     def fetch_modules(
-        file_paths: Iterable[pathlib.Path],
+        self, file_paths: Iterable[pathlib.Path]
     ) -> Iterable["types.ModuleType"]:
         """
         Get all modules from an iterable of file paths.
@@ -81,20 +339,43 @@ class Commands:
 
         Notes
         -----
-        Skipping already loaded modules.
+        Modules that were already imported from the same file are not imported
+        again.
         """
         for path in file_paths:
-            module_name = path.stem
-            if module_name in sys.modules:
-                # TODO:
-                # Do we ever reach here?
-                print(f"Skiping already loaded module {module_name}")
-                continue
+            module = self.load_module(path=path)
+            if hasattr(module, "Command"):
+                yield module
+
+    def load_module(
+        self, path: pathlib.Path, reload: bool = False
+    ) -> "types.ModuleType":
+        """
+        Load a python module from a file path, under its full name.
+
+        Parameters
+        ----------
+        path : pathlib.Path
+            File path of the python module.
+        reload : bool, default False
+            Execute the module again, even if it is already imported.
+
+        Returns
+        -------
+        :class:`types.ModuleType`
+            The loaded module.
+
+        See Also
+        --------
+        _snadra.cmd.loader.load_module
+        """
+        root = self.root_of(path)
+        if root is None:
+            return loader.load_module(path, reload=reload)
 
-            module_spec = importlib.util.spec_from_file_location(module_name, path)
-            module = importlib.util.module_from_spec(module_spec)  # type: ignore
-            module_spec.loader.exec_module(module)  # type: ignore
-            yield module
+        path = pathlib.Path(os.path.realpath(path))
+        root.ensure_packages(path)
+        return loader.load_module(path, name=root.module_name(path), reload=reload)
 
     @property
     def aliases(self) -> Set[str]:
@@ -146,9 +427,53 @@ class Commands:
         Optional[:class:`CommandMeta`]
             The command that is mapped to ``keyword``,
             if ``keyword`` is not mapped to any command, `None` is returned.
+
+        Notes
+        -----
+        The returned instance is cached, calling this twice with the same keyword
+        (or with one of its aliases) returns the same object.
+        """
+        entry = self.commands.get(keyword)
+        if entry is None:
+            return None
+
+        core_keyword = entry.keyword
+        instance = self._instances.get(core_keyword)
+        if instance is None:
+            command = self._classes.get(core_keyword)
+            if command is None:
+                command = self._load(entry)
+            instance = command(commands=self)
+            self._instances[core_keyword] = instance
+
+        return instance
+
+    def get_entry(self, keyword: str) -> Optional[ManifestEntry]:
+        """
+        Get the manifest entry of a command, without importing it.
+
+        Parameters
+        ----------
+        keyword : str
+            Keyword to check.
+
+        Returns
+        -------
+        Optional[:class:`ManifestEntry`]
+            The entry of the command that is mapped to ``keyword``,
+            if ``keyword`` is not mapped to any command, `None` is returned.
         """
         return self.commands.get(keyword)
 
+    def _load(self, entry: ManifestEntry) -> Type["CommandMeta"]:
+        """
+        Import the module of a command, the first time it is needed.
+        """
+        module = self.load_module(path=pathlib.Path(entry.path))
+        command = module.Command
+        self._classes[entry.keyword] = command
+        return command
+
     def is_valid_keyword(self, keyword: str) -> bool:
         """
         Check if a given keyword is mapped to a valid command.
@@ -0,0 +1,96 @@
+"""
+Import scan results into a workspace.
+"""
+import pathlib
+from typing import TYPE_CHECKING, Iterable
+
+from sqlalchemy.exc import DBAPIError
+
+from _snadra.cmd import CommandMeta
+from _snadra.db.bulk import BATCH_SIZE
+from _snadra.db.config import async_session, get_engine
+from _snadra.db.nmap import import_nmap
+from _snadra.db.workspaces import is_workspace_exists, workspace_names
+from _snadra.output import get_output
+from _snadra.state import get_session
+
+if TYPE_CHECKING:
+    import argparse
+
+
+class Command(CommandMeta):
+    """
+    Help message for "db_import".
+    """
+
+    keyword = "db_import"
+    aliases = None
+    description = "Import the hosts and services of Nmap XML results"
+    long_help = (
+        "Add the hosts (that are up) and their ports of 'nmap -oX' results to a"
+        " workspace. Hosts that are already in the workspace are updated."
+    )
+
+    arguments = {
+        "path": {
+            "help": "Path of the Nmap XML file",
+            "metavar": "FILE",
+            "type": pathlib.Path,
+        },
+        "-w,--workspace": {
+            "help": "Workspace to import into (default: the current workspace)",
+        },
+        "--batch-size": {
+            "default": BATCH_SIZE,
+            "help": "Number of hosts that are written together (default: %(default)s)",
+            "type": int,
+        },
+    }
+
+    async def complete(self, dest: str, prefix: str) -> Iterable[str]:
+        if dest != "workspace":
+            return ()
+
+        names = await workspace_names(async_session=async_session)
+        return names.iter_prefix(prefix)
+
+    async def run(self, args: "argparse.Namespace") -> None:
+        """
+        Import the hosts and services of Nmap XML results.
+
+        Parameters
+        ----------
+        args : :class:`argparse.Namespace`
+            The arguments for the command.
+        """
+        output = get_output()
+        workspace = args.workspace or get_session().current_workspace
+        if args.batch_size < 1:
+            output.log("[red]Error[/red]: The batch size must be positive")
+            return
+
+        is_exists = await is_workspace_exists(workspace, async_session=async_session)
+        if not is_exists:
+            output.log(
+                f"[red]Error[/red]: Workspace {repr(workspace)} does not exists!"
+            )
+            return
+
+        try:
+            summary = await import_nmap(
+                args.path,
+                workspace=workspace,
+                engine=get_engine(),
+                batch_size=args.batch_size,
+            )
+        except (OSError, ValueError) as err:
+            output.log(f"[red]Error[/red]: {err}")
+            return
+        except DBAPIError as err:
+            output.log(f"[red]Error[/red]: The import failed: {err.orig}")
+            return
+
+        output.log(
+            f"Imported {summary.hosts} hosts and {summary.services} services"
+            f" from {args.path} into {workspace}"
+        )
@@ -1,10 +1,8 @@
-from typing import TYPE_CHECKING
-
-from rich import box as rich_box
-from rich.table import Table as RichTable
+from typing import TYPE_CHECKING, Any, Dict, Optional
 
 from _snadra.cmd.base import Commands
-from _snadra.cmd.utils import CommandMeta, console
+from _snadra.cmd.utils import CommandMeta
+from _snadra.output import Column, get_output
 
 if TYPE_CHECKING:
     import argparse
@@ -19,14 +17,20 @@ class Command(CommandMeta):
     aliases = {"HELP"}
     description = "List all known commands and print their help message"
     long_help = "THE LONG HELP MESSAGE OF 'help'"
+    concurrent = True
+
+    commands: Commands
 
-    # Skipping "help" so we won't make a circular import
-    __commands = Commands(skip={"help"})
-    available_keywords = __commands.keywords.union({keyword}).union(aliases)
+    def __init__(self, commands: Optional[Commands] = None) -> None:
+        if commands is None:
+            commands = Commands()
+        super().__init__(commands=commands)
 
-    arguments = {
-        "topic": {"choices": sorted(available_keywords), "nargs": "?"},
-    }
+    @property
+    def arguments(self) -> Dict[str, Dict[str, Any]]:
+        return {
+            "topic": {"choices": sorted(self.commands.all_keywords), "nargs": "?"},
+        }
 
     async def run(self, args: "argparse.Namespace") -> None:
         """
@@ -36,26 +40,25 @@ class Command(CommandMeta):
         ----------
         args : :class:`argparse.Namespace`
             The arguments for the command.
+
+        Notes
+        -----
+        The help is built from the commands manifest, so showing it does not
+        import the other command modules.
         """
+        output = get_output()
         if args.topic:
-            if args.topic in self.available_keywords:
-                console.print(self.long_help)
-            else:
-                # Here we are counting on "argparse" choices for validation.
-                target_command = self.__commands.get_command(args.topic)
-                console.print(target_command.long_help)  # type: ignore
-
-        elif args:
-            help_table = RichTable(title="Help menu", box=rich_box.SIMPLE)
-            help_table.add_column("Command")
-            help_table.add_column("Description")
-
-            for keyword in self.available_keywords:
-                if keyword == self.keyword or keyword in self.aliases:
-                    command_description = self.description
-                else:
-                    command_description = self.__commands.get_command(keyword).description  # type: ignore # noqa: E501
-
-                help_table.add_row(keyword, command_description)
-
-            console.print(help_table)
+            # Here we are counting on "argparse" choices for validation.
+            entry = self.commands.get_entry(args.topic)
+            output.text("long_help", entry.long_help)  # type: ignore
+        else:
+            rows = []
+            for keyword in sorted(self.commands.keywords):
+                entry = self.commands.get_entry(keyword)
+                rows.append((keyword, entry.description))  # type: ignore
+
+            output.write_records(
+                "Help menu",
+                [Column("keyword", "Command"), Column("description", "Description")],
+                rows,
+            )
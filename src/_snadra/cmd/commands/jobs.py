@@ -0,0 +1,71 @@
+"""
+Manage background jobs.
+"""
+from typing import TYPE_CHECKING
+
+from _snadra.cmd.utils import CommandMeta
+from _snadra.output import Column, get_output
+from _snadra.state import get_session
+
+if TYPE_CHECKING:
+    import argparse
+
+    from _snadra.cmd.base import Commands
+
+
+class Command(CommandMeta):
+    """
+    Help message for "jobs".
+    """
+
+    keyword = "jobs"
+    aliases = None
+    description = "List and kill background jobs"
+    long_help = (
+        "Run any command in the background by ending its line with '&', "
+        "for example: 'workspace --import workspaces.csv &'"
+    )
+
+    arguments = {
+        "-k,--kill": {
+            "help": "Cancel the job with this id",
+            "metavar": "ID",
+            "type": int,
+        },
+    }
+
+    columns = [
+        Column("id", "Id", justify="right"),
+        Column("command", "Command"),
+        Column("status", "Status"),
+        Column("duration", "Duration", justify="right", format="{:.3f}s".format),
+    ]
+
+    commands: "Commands"
+
+    async def run(self, args: "argparse.Namespace") -> None:
+        """
+        List or kill the background jobs of the current session.
+
+        Parameters
+        ----------
+        args : :class:`argparse.Namespace`
+            The arguments for the command.
+        """
+        jobs = self.commands.jobs
+        session = get_session()
+        output = get_output()
+
+        if args.kill is not None:
+            if not jobs.kill(args.kill, session=session):
+                output.log(f"[red]Error[/red]: No running job with id {args.kill}")
+            return
+
+        output.write_records(
+            "Jobs",
+            self.columns,
+            (
+                (job.job_id, job.name, job.status, job.duration)
+                for job in jobs.owned(session)
+            ),
+        )
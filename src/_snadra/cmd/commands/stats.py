@@ -0,0 +1,118 @@
+"""
+Show the instrumentation of the dispatched commands.
+"""
+import json
+import pathlib
+import tracemalloc
+from typing import TYPE_CHECKING
+
+from _snadra.cmd.utils import CommandMeta
+from _snadra.output import Column, get_output
+from _snadra.stats import PERCENTILES
+
+if TYPE_CHECKING:
+    import argparse
+
+    from _snadra.cmd.base import Commands
+
+
+class Command(CommandMeta):
+    """
+    Help message for "stats".
+    """
+
+    keyword = "stats"
+    aliases = None
+    description = "Show latency and resource statistics of the commands"
+    long_help = (
+        "Show p50/p95/p99 of every dispatch stage (parse, lookup, parse_args, run),"
+        " of the database round-trips and, when enabled, of the allocated memory,"
+        " per command. The allocated memory is measured only for the commands"
+        " that ran while no other command did."
+    )
+
+    arguments = {
+        "keyword": {
+            "help": "Show only the statistics of this command",
+            "metavar": "command",
+            "nargs": "?",
+        },
+        "--json": {
+            "dest": "json_path",
+            "help": "Dump the statistics as JSON to FILE ('-' for stdout)",
+            "metavar": "FILE",
+        },
+        "--reset": {"action": "store_true", "help": "Remove all the samples"},
+        "--allocations": {
+            "choices": ["on", "off"],
+            "help": "Turn memory allocations tracking (slow) on or off",
+        },
+    }
+
+    columns = [
+        Column("keyword", "Command"),
+        Column("metric", "Metric"),
+        Column("count", "Count", justify="right"),
+        *(
+            Column(
+                f"p{percent}", f"p{percent}", justify="right", format="{:.3f}".format
+            )
+            for percent in PERCENTILES
+        ),
+        Column("max", "Max", justify="right", format="{:.3f}".format),
+    ]
+
+    commands: "Commands"
+
+    async def run(self, args: "argparse.Namespace") -> None:
+        """
+        Show the statistics.
+
+        Parameters
+        ----------
+        args : :class:`argparse.Namespace`
+            The arguments for the command.
+        """
+        stats = self.commands.stats
+
+        if args.allocations is not None:
+            stats.track_allocations = args.allocations == "on"
+            if not stats.track_allocations and tracemalloc.is_tracing():
+                tracemalloc.stop()
+            return
+        if args.reset:
+            stats.reset()
+            return
+
+        summary = stats.summary()
+        if args.keyword is not None:
+            summary = {args.keyword: summary.get(args.keyword, {})}
+
+        if args.json_path is not None:
+            if args.json_path == "-":
+                file_obj = get_output().file
+                json.dump(summary, file_obj, indent=2)
+                file_obj.write("\n")
+            else:
+                try:
+                    with pathlib.Path(args.json_path).open("w") as file_obj:
+                        json.dump(summary, file_obj, indent=2)
+                except OSError as err:
+                    get_output().log(f"[red]Error[/red]: {err}")
+            return
+
+        get_output().write_records(
+            "Statistics",
+            self.columns,
+            (
+                (
+                    keyword,
+                    metric,
+                    values["count"],
+                    *(values[f"p{percent}"] for percent in PERCENTILES),
+                    values["max"],
+                )
+                for keyword, metrics in summary.items()
+                for metric, values in metrics.items()
+            ),
+        )
@@ -1,26 +1,46 @@
 """
 Manage workspaces.
 """
-import functools
-from typing import TYPE_CHECKING
+import pathlib
+import shlex
+from typing import TYPE_CHECKING, AsyncIterator, Iterable, List, Optional
 
-from rich import box as rich_box
-from rich.table import Table as RichTable
-from sqlalchemy import delete
 from sqlalchemy.future import select
 
 from _snadra.cmd import CommandMeta
-from _snadra.cmd.utils import console
-from _snadra.db.config import async_session
+from _snadra.db.bulk import batched, export_workspaces, import_workspaces
+from _snadra.db.cache import workspace_cache
+from _snadra.db.config import async_session, get_engine
 from _snadra.db.models import Workspace
-from _snadra.state import state
+from _snadra.db.utils import delete_workspace_stmt, insert_workspace_stmt
+from _snadra.db.workspaces import is_workspace_exists, workspace_names
+from _snadra.output import Column, get_output
+from _snadra.state import get_session
 
 if TYPE_CHECKING:
     import argparse
 
-    from sqlalchemy.engine.result import ChunkedIteratorResult
+    from sqlalchemy.engine import Row
     from sqlalchemy.ext.asyncio import AsyncSession
 
+# Number of workspaces that are fetched and rendered together
+PARTITION_SIZE = 50
+
+DATETIME_FORMAT = "%d/%m/%Y, %H:%M:%S"
+
+
+def prefix_pattern(prefix: str) -> str:
+    """
+    Get the ``LIKE`` pattern of the names that start with a prefix.
+
+    Examples
+    --------
+    >>> prefix_pattern("web_1%")
+    'web/_1/%%'
+    """
+    escaped = prefix.replace("/", "//").replace("%", "/%").replace("_", "/_")
+    return f"{escaped}%"
+
 
 class Command(CommandMeta):
     """
@@ -37,71 +57,203 @@ class Command(CommandMeta):
         "-a,--add": {"action": "store_true", "help": "Add a workspace"},
         "-d,--delete": {"action": "store_true", "help": "Delete a workspace"},
         "--desc,--description": {"help": "Description for the workspace"},
+        "--import": {
+            "dest": "import_path",
+            "help": "Add the workspaces from a CSV or JSONL file",
+            "metavar": "FILE",
+            "type": pathlib.Path,
+        },
+        "--export": {
+            "dest": "export_path",
+            "help": "Write all the workspaces to a CSV or JSONL file",
+            "metavar": "FILE",
+            "type": pathlib.Path,
+        },
+        "--limit": {
+            "default": 100,
+            "help": "Maximum number of workspaces to list, 0 for no limit",
+            "type": int,
+        },
+        "--after": {
+            "help": "List only the workspaces whose name comes after this name",
+            "metavar": "NAME",
+        },
+        "--filter": {
+            "dest": "prefix",
+            "help": "List only the workspaces whose name starts with this prefix",
+            "metavar": "PREFIX",
+        },
     }
 
+    columns = [
+        Column("name", "Name"),
+        Column("description", "Description"),
+        Column(
+            "created_at", "Created at", format=lambda d: d.strftime(DATETIME_FORMAT)
+        ),
+        Column(
+            "updated_at", "Updated at", format=lambda d: d.strftime(DATETIME_FORMAT)
+        ),
+    ]
+
+    async def complete(self, dest: str, prefix: str) -> Iterable[str]:
+        if dest not in {"target", "after"}:
+            return ()
+
+        names = await workspace_names(async_session=async_session)
+        return names.iter_prefix(prefix)
+
     @staticmethod
-    async def is_workspace_exists(
-        target: str, *, async_session: "AsyncSession"
+    async def add_workspace(
+        target: str, desc: Optional[str], *, async_session: "AsyncSession"
     ) -> bool:
+        """
+        Add a workspace, in a single round-trip.
+
+        Returns
+        -------
+        bool
+            Whether the workspace was added, `False` if it already exists.
+        """
         async with async_session() as session:
             async with session.begin():
-                stmt = select(Workspace).where(Workspace.name == target)
+                stmt = insert_workspace_stmt(
+                    target, desc, dialect=session.bind.dialect.name
+                )
                 result = await session.execute(stmt)
-        workspace = result.scalar_one_or_none()
+                is_added = result.rowcount == 1
 
-        return bool(workspace)
+        if is_added:
+            workspace_cache.clear()
+        return is_added
 
     @staticmethod
-    async def add_workspace(
-        target: str, desc: str, *, async_session: "AsyncSession"
-    ) -> None:
-        async with async_session() as session:
-            async with session.begin():
-                workspace = Workspace(name=target, description=desc)
-                session.add(workspace)
-                await session.commit()
+    async def delete_workspace(target: str, *, async_session: "AsyncSession") -> bool:
+        """
+        Delete a workspace, in a single round-trip.
 
-    @staticmethod
-    async def delete_workspace(target: str, *, async_session: "AsyncSession") -> None:
+        Returns
+        -------
+        bool
+            Whether the workspace was deleted, `False` if it does not exist.
+        """
         async with async_session() as session:
             async with session.begin():
-                stmt = delete(Workspace).where(Workspace.name == target)
-                await session.execute(stmt)
+                result = await session.execute(delete_workspace_stmt(target))
+                is_deleted = result.rowcount == 1
+
+        if is_deleted:
+            workspace_cache.clear()
+        return is_deleted
 
     @staticmethod
-    async def all_workspaces(
-        *, async_session: "AsyncSession"
-    ) -> "ChunkedIteratorResult":
+    async def list_workspaces(
+        *,
+        async_session: "AsyncSession",
+        limit: int,
+        after: Optional[str] = None,
+        prefix: Optional[str] = None,
+    ) -> AsyncIterator[List["Row"]]:
+        """
+        Stream a page of workspaces, ordered by name.
+
+        Parameters
+        ----------
+        async_session : AsyncSession
+            Session factory.
+        limit : int
+            Maximum number of workspaces in the page, ``0`` for no limit.
+        after : str, optional
+            Keyset cursor, list only the workspaces whose name is greater than it.
+        prefix : str, optional
+            List only the workspaces whose name starts with it.
+
+        Yields
+        ------
+        List[Row]
+            Consecutive partitions of the page, as soon as they are fetched.
+
+        Notes
+        -----
+        Bounded pages (``limit > 0``) are kept in the workspace cache.
+        """
+        key = ("page", limit, after, prefix)
+        page = workspace_cache.get(key)
+        if page is not None:
+            for partition in batched(page, PARTITION_SIZE):
+                yield partition
+            return
+
+        stmt = select(
+            Workspace.name,
+            Workspace.description,
+            Workspace.created_at,
+            Workspace.updated_at,
+        ).order_by(Workspace.name)
+        if after is not None:
+            stmt = stmt.where(Workspace.name > after)
+        if prefix:
+            # The whole pattern is a single parameter, so that the index on the
+            # name can be used (``startswith`` appends the ``%`` in SQL).
+            stmt = stmt.where(Workspace.name.like(prefix_pattern(prefix), escape="/"))
+        if limit > 0:
+            stmt = stmt.limit(limit)
+
+        generation = workspace_cache.generation
+        page = []
         async with async_session() as session:
-            async with session.begin():
-                stmt = select(Workspace)
-                result = await session.execute(stmt)
+            result = await session.stream(stmt)
+            async for partition in result.partitions(PARTITION_SIZE):
+                if limit > 0:
+                    page.extend(partition)
+                yield partition
 
-        return result
+        if limit > 0:
+            workspace_cache.set(key, page, generation=generation)
 
     @staticmethod
-    @functools.lru_cache
-    def workspace_table(workspaces: "ChunkedIteratorResult") -> RichTable:
-        table = RichTable(title="Workspaces", box=rich_box.SIMPLE)
-        table.add_column("Name")
-        table.add_column("Description")
-        table.add_column("Created at")
-        table.add_column("Updated at")
-
-        for workspace_metadata in workspaces.scalars():
-            name = workspace_metadata.name
-            description = workspace_metadata.description
-            created_at = workspace_metadata.created_at.strftime("%d/%m/%Y, %H:%M:%S")
-            updated_at = workspace_metadata.updated_at
-            updated_at = workspace_metadata.updated_at
-            if updated_at is None:
-                updated_at = "#"
-            else:
-                updated_at = updated_at.strftime("%d/%m/%Y, %H:%M:%S")
+    async def show_workspaces(args: "argparse.Namespace") -> None:
+        """
+        Write a page of workspaces, one partition at a time.
+        """
+        output = get_output()
+        last_name = None
+        partitions = Command.list_workspaces(
+            async_session=async_session,
+            limit=args.limit,
+            after=args.after,
+            prefix=args.prefix,
+        )
+        with output.records("Workspaces", Command.columns, show_empty=False) as writer:
+            async for partition in partitions:
+                writer.write(partition)
+                last_name = partition[-1].name
+                await output.drain()
 
-            table.add_row(name, description, created_at, updated_at)
+        shown = writer.count
+        if shown == 0:
+            output.log("No workspaces found")
+        elif args.limit > 0 and shown == args.limit:
+            output.log(
+                f"Listed {shown} workspaces, for the next page run: "
+                f"workspace --after {shlex.quote(last_name)}"  # type: ignore
+            )
 
-        return table
+    @staticmethod
+    async def bulk(args: "argparse.Namespace") -> None:
+        """
+        Import and/or export workspaces from/to files.
+        """
+        output = get_output()
+        try:
+            if args.import_path is not None:
+                added = await import_workspaces(args.import_path, engine=get_engine())
+                output.log(f"Added {added} workspaces from {args.import_path}")
+            if args.export_path is not None:
+                written = await export_workspaces(args.export_path, engine=get_engine())
+                output.log(f"Wrote {written} workspaces to {args.export_path}")
+        except (OSError, ValueError) as err:
+            output.log(f"[red]Error[/red]: {err}")
 
     async def run(self, args: "argparse.Namespace") -> None:
         """
@@ -112,54 +264,55 @@ class Command(CommandMeta):
         args : :class:`argparse.Namespace`
             The arguments for the command.
         """
+        output = get_output()
         target = args.target
         do_add = args.add
         do_delete = args.delete
 
         if do_add and do_delete:
             # Error: conflicting flags
-            console.log("[red]Error[/red]: Conflicting flags 'add' and 'delete'")
+            output.log("[red]Error[/red]: Conflicting flags 'add' and 'delete'")
+            return
+
+        if args.import_path is not None or args.export_path is not None:
+            await Command.bulk(args)
+            return
 
         if target is not None:
-            is_exists = await self.is_workspace_exists(
-                target=target, async_session=async_session
-            )
             if do_add:
                 # Add workspace
-                if is_exists:
-                    console.log("Workspace already exists!")
-                    return
-                await Command.add_workspace(
+                is_added = await Command.add_workspace(
                     target=target, desc=args.desc, async_session=async_session
                 )
+                if not is_added:
+                    output.log("Workspace already exists!")
             elif do_delete:
                 # Delete workspace
-                if not is_exists:
-                    console.log(
-                        f"[red]Error[/red]: Workspace {repr(target)} does not exists!"
-                    )
-                    return
-                await Command.delete_workspace(
+                is_deleted = await Command.delete_workspace(
                     target=target, async_session=async_session
                 )
+                if not is_deleted:
+                    output.log(
+                        f"[red]Error[/red]: Workspace {repr(target)} does not exists!"
+                    )
             else:
                 # Switch to workspace
+                is_exists = await is_workspace_exists(
+                    target=target, async_session=async_session
+                )
                 if not is_exists:
-                    console.log(
+                    output.log(
                         f"[red]Error[/red]: Workspace {repr(target)} does not exists!"
                     )
                     return
-                state["current_workspace"] = target
+                get_session().current_workspace = target
         else:
             if do_add:
                 # Error: missing argument
-                console.log("Missing argument 'target'")
+                output.log("Missing argument 'target'")
             elif do_delete:
                 # Error: missing argument
-                console.log("Missing argument 'target'")
+                output.log("Missing argument 'target'")
             else:
                 # Show workspaces
-                workspaces = await Command.all_workspaces(async_session=async_session)
-
-                table = Command.workspace_table(workspaces=workspaces)
-                console.print(table)
+                await Command.show_workspaces(args)
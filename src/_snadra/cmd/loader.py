@@ -0,0 +1,163 @@
+"""
+Import the command modules of several roots, under unique module names.
+
+Every root (the core commands directory, and every plugins directory) is
+mapped to a package: the core commands are imported as
+``_snadra.cmd.commands.<name>``, and the plugins as
+``_snadra.plugins.<root>_<hash>.<sub>.<name>``, so modules with the same file
+name in different roots (or in different subdirectories) do not collide, and
+plugin modules can use relative imports.
+"""
+import hashlib
+import importlib.util
+import os
+import pathlib
+import re
+import sys
+import types
+from typing import NamedTuple, Optional
+
+# The package that the plugin roots are imported under
+PLUGINS_PACKAGE = "_snadra.plugins"
+
+_NOT_IDENTIFIER_RE = re.compile(r"\W")
+
+
+def _identifier(name: str) -> str:
+    """
+    Make a valid Python identifier out of a file name.
+
+    Examples
+    --------
+    >>> _identifier("my-plugin"), _identifier("2fa")
+    ('my_plugin', '_2fa')
+    """
+    name = _NOT_IDENTIFIER_RE.sub("_", name)
+    return f"_{name}" if name[:1].isdigit() else name
+
+
+def _new_package(name: str, path: Optional[pathlib.Path]) -> types.ModuleType:
+    package = types.ModuleType(name)
+    package.__path__ = [] if path is None else [str(path)]
+    package.__package__ = name
+    sys.modules[name] = package
+    return package
+
+
+class CommandRoot(NamedTuple):
+    """
+    A directory of command modules, and the package they are imported under.
+    """
+
+    path: pathlib.Path
+    package: str
+
+    @classmethod
+    def plugin(cls, path: pathlib.Path) -> "CommandRoot":
+        """
+        Get the root of a plugins directory.
+
+        The name of the package is derived from the directory name, and from a
+        hash of its full path, so it is stable between runs.
+        """
+        path = path.resolve()
+        digest = hashlib.sha1(str(path).encode()).hexdigest()[:8]
+        return cls(path, f"{PLUGINS_PACKAGE}.{_identifier(path.name)}_{digest}")
+
+    def module_name(self, module_path: pathlib.Path) -> str:
+        """
+        Get the full name of a module in the root.
+
+        Examples
+        --------
+        >>> root = CommandRoot(pathlib.Path("/plugins"), "_snadra.plugins.p")
+        >>> root.module_name(pathlib.Path("/plugins/scan/port-scan.py"))
+        '_snadra.plugins.p.scan.port_scan'
+        """
+        parts = module_path.relative_to(self.path).with_suffix("").parts
+        return ".".join([self.package, *map(_identifier, parts)])
+
+    def ensure_packages(self, module_path: pathlib.Path) -> None:
+        """
+        Make sure the packages of a module are imported, for its relative
+        imports.
+
+        The packages of the plugins do not exist on disk, they are created as
+        namespace packages of their directories.
+        """
+        if PLUGINS_PACKAGE not in sys.modules:
+            _new_package(PLUGINS_PACKAGE, None)
+
+        directory = self.path
+        name = self.package
+        for part in (None, *module_path.relative_to(self.path).parent.parts):
+            if part is not None:
+                directory = directory / part
+                name = f"{name}.{_identifier(part)}"
+            if name not in sys.modules:
+                _new_package(name, directory)
+
+    def contains(self, module_path: pathlib.Path) -> bool:
+        """
+        Check whether a module is in the root.
+        """
+        try:
+            module_path.relative_to(self.path)
+        except ValueError:
+            return False
+        return True
+
+
+def load_module(
+    path: pathlib.Path, name: Optional[str] = None, reload: bool = False
+) -> types.ModuleType:
+    """
+    Import a module from a file path.
+
+    Parameters
+    ----------
+    path : pathlib.Path
+        File path of the module.
+    name : str, optional
+        Full name of the module, which is added to `sys.modules`.
+        If not specified, the module is named after its file, and it is not
+        added to `sys.modules`.
+    reload : bool, default False
+        Execute the module again, even if it is already imported.
+
+    Returns
+    -------
+    :class:`types.ModuleType`
+        The module.
+
+    Notes
+    -----
+    A module that is already imported from the same file is reused. If
+    executing the module fails, any previous module with the same name is
+    restored.
+    """
+    if name is not None and not reload:
+        module = sys.modules.get(name)
+        module_file = getattr(module, "__file__", None)
+        if module_file is not None and os.path.realpath(
+            module_file
+        ) == os.path.realpath(path):
+            return module  # type: ignore
+
+    module_spec = importlib.util.spec_from_file_location(name or path.stem, path)
+    module = importlib.util.module_from_spec(module_spec)  # type: ignore
+    if name is None:
+        module_spec.loader.exec_module(module)  # type: ignore
+        return module
+
+    previous = sys.modules.get(name)
+    sys.modules[name] = module
+    try:
+        module_spec.loader.exec_module(module)  # type: ignore
+    except BaseException:
+        if previous is None:
+            del sys.modules[name]
+        else:
+            sys.modules[name] = previous
+        raise
+    return module
@@ -0,0 +1,365 @@
+"""
+On-disk manifest of the available commands.
+
+The manifest lets :class:`_snadra.cmd.base.Commands` know the keywords, aliases
+and descriptions of every command without importing the command modules.
+"""
+import ast
+import concurrent.futures
+import hashlib
+import json
+import os
+import pathlib
+from typing import Any, Dict, FrozenSet, List, NamedTuple, Optional, Sequence, Tuple
+
+MANIFEST_VERSION = 1
+
+# Attributes of the `Command` class that are stored in the manifest.
+_METADATA_ATTRIBUTES = ("keyword", "aliases", "description", "long_help")
+
+
+class ManifestEntry(NamedTuple):
+    """
+    Metadata of a single command module.
+    """
+
+    keyword: str
+    aliases: FrozenSet[str]
+    description: str
+    long_help: str
+    path: str
+    mtime_ns: int
+    size: int
+    digest: str
+
+    def to_json(self) -> Dict[str, Any]:
+        data = self._asdict()
+        data["aliases"] = sorted(self.aliases)
+        return data
+
+    @classmethod
+    def from_json(cls, data: Dict[str, Any]) -> "ManifestEntry":
+        data = dict(data)
+        data["aliases"] = frozenset(data["aliases"])
+        return cls(**data)
+
+
+def source_digest(source: bytes) -> str:
+    """
+    Get the digest of a module's source code.
+
+    Parameters
+    ----------
+    source : bytes
+        The source code.
+
+    Returns
+    -------
+    str
+        Hex digest of ``source``.
+
+    Examples
+    --------
+    >>> source_digest(b"")
+    'da39a3ee5e6b4b0d3255bfef95601890afd80709'
+    """
+    return hashlib.sha1(source).hexdigest()
+
+
+def _read_source(path: pathlib.Path) -> Tuple[os.stat_result, bytes, str]:
+    # Only I/O and hashing, safe to run in worker threads.
+    stat = path.stat()
+    source = path.read_bytes()
+    return stat, source, source_digest(source)
+
+
+def extract_metadata(source: bytes) -> Optional[Dict[str, Any]]:
+    """
+    Statically extract the metadata of the `Command` class of a module.
+
+    Parameters
+    ----------
+    source : bytes
+        The source code of the module.
+
+    Returns
+    -------
+    Optional[Dict[str, Any]]
+        Mapping of the metadata attributes to their values, or `None` if the
+        module does not define a `Command` class, or if its metadata is not
+        made of literals. Such a module has to be imported to know what it
+        defines (it may get its `Command` from another module).
+
+    Examples
+    --------
+    >>> source = b'''
+    ... class Command:
+    ...     keyword = "exit"
+    ...     aliases = {"quit"}
+    ...     description = "Exit the console"
+    ... '''
+    >>> metadata = extract_metadata(source)
+    >>> metadata["keyword"], metadata["aliases"], metadata["long_help"]
+    ('exit', frozenset({'quit'}), '')
+    """
+    try:
+        tree = ast.parse(source)
+    except (SyntaxError, ValueError, MemoryError, RecursionError):
+        return None
+
+    for node in tree.body:
+        if isinstance(node, ast.ClassDef) and node.name == "Command":
+            break
+    else:
+        return None
+
+    metadata: Dict[str, Any] = {"aliases": None, "long_help": ""}
+    for statement in node.body:
+        if not isinstance(statement, ast.Assign) or len(statement.targets) != 1:
+            continue
+        target = statement.targets[0]
+        if not isinstance(target, ast.Name):
+            continue
+        if target.id not in _METADATA_ATTRIBUTES:
+            continue
+
+        try:
+            metadata[target.id] = ast.literal_eval(statement.value)
+        except (ValueError, TypeError, SyntaxError, MemoryError, RecursionError):
+            return None
+
+    if not isinstance(metadata.get("keyword"), str):
+        return None
+    if not isinstance(metadata.get("description"), str):
+        return None
+
+    metadata["aliases"] = frozenset(metadata["aliases"] or ())
+    return metadata
+
+
+class Manifest:
+    """
+    Cache of :class:`ManifestEntry`, persisted as a JSON file.
+
+    Parameters
+    ----------
+    path : pathlib.Path, optional
+        Path of the manifest file. If not specified, the manifest lives only
+        in memory.
+
+    Notes
+    -----
+    An entry is considered fresh as long as the modification time and the size
+    of its file did not change. When they do, the file is hashed, and only if
+    the hash changed the metadata is extracted again.
+    """
+
+    __slots__ = {
+        "_dirty",
+        "entries",
+        "path",
+    }
+
+    def __init__(self, path: Optional[pathlib.Path] = None) -> None:
+        self.path = path
+        self.entries: Dict[str, ManifestEntry] = {}
+        self._dirty = False
+
+        if path is not None:
+            self.load()
+
+    def load(self) -> None:
+        """
+        Load the manifest file, ignoring it if it is missing or corrupted.
+        """
+        try:
+            with self.path.open() as file_obj:  # type: ignore
+                data = json.load(file_obj)
+            if data["version"] != MANIFEST_VERSION:
+                return
+            entries = {
+                path: ManifestEntry.from_json(entry)
+                for path, entry in data["entries"].items()
+            }
+        except (OSError, ValueError, KeyError, TypeError):
+            return
+
+        self.entries = entries
+
+    def save(self) -> None:
+        """
+        Write the manifest file, if anything changed since it was loaded.
+
+        Notes
+        -----
+        Failing to write the file is not an error, the manifest will be rebuilt
+        the next time.
+        """
+        if self.path is None or not self._dirty:
+            return
+
+        data = {
+            "version": MANIFEST_VERSION,
+            "entries": {path: entry.to_json() for path, entry in self.entries.items()},
+        }
+        tmp_path = self.path.with_name(f"{self.path.name}.{os.getpid()}.tmp")
+        try:
+            self.path.parent.mkdir(parents=True, exist_ok=True)
+            with tmp_path.open("w") as file_obj:
+                json.dump(data, file_obj)
+            os.replace(tmp_path, self.path)
+        except OSError:
+            return
+
+        self._dirty = False
+
+    def _is_fresh(self, path: pathlib.Path) -> bool:
+        entry = self.entries.get(str(path.resolve()))
+        if entry is None:
+            return False
+        stat = path.stat()
+        return entry.mtime_ns == stat.st_mtime_ns and entry.size == stat.st_size
+
+    def get(self, path: pathlib.Path) -> Optional[ManifestEntry]:
+        """
+        Get an up to date entry for a module.
+
+        Parameters
+        ----------
+        path : pathlib.Path
+            Path of the command module.
+
+        Returns
+        -------
+        Optional[ManifestEntry]
+            The entry of the module, or `None` if its metadata can not be
+            extracted statically, and the module has to be imported. The entry
+            of a module that was imported and has no `Command` (see
+            :meth:`Manifest.add_helper`) has an empty keyword.
+        """
+        entry = self.entries.get(str(path.resolve()))
+        stat = path.stat()
+        if entry is not None:
+            if entry.mtime_ns == stat.st_mtime_ns and entry.size == stat.st_size:
+                return entry
+        return self._update(path, *_read_source(path))
+
+    def _update(
+        self, path: pathlib.Path, stat: os.stat_result, source: bytes, digest: str
+    ) -> Optional[ManifestEntry]:
+        key = str(path.resolve())
+        entry = self.entries.get(key)
+
+        if entry is not None and entry.digest == digest:
+            # Also keeps the entries of the helper modules, until they change.
+            entry = entry._replace(mtime_ns=stat.st_mtime_ns, size=stat.st_size)
+        else:
+            metadata = extract_metadata(source)
+            if metadata is None:
+                self.discard(path)
+                return None
+            entry = ManifestEntry(
+                path=key,
+                mtime_ns=stat.st_mtime_ns,
+                size=stat.st_size,
+                digest=digest,
+                **metadata,
+            )
+
+        self.entries[key] = entry
+        self._dirty = True
+        return entry
+
+    def get_many(
+        self, paths: Sequence[pathlib.Path], max_workers: Optional[int] = None
+    ) -> List[Optional[ManifestEntry]]:
+        """
+        Get up to date entries for many modules.
+
+        The modules whose entries are stale are read and hashed in a thread
+        pool, so a large tree of modules that changed (or that was just
+        installed) is not read one file at a time.
+
+        Parameters
+        ----------
+        paths : Sequence[pathlib.Path]
+            Paths of the command modules.
+        max_workers : int, optional
+            Most threads to use, see :class:`concurrent.futures.ThreadPoolExecutor`.
+
+        Returns
+        -------
+        List[Optional[ManifestEntry]]
+            The entry of every module, as returned from :meth:`Manifest.get`.
+
+        Notes
+        -----
+        The sources are parsed in the calling thread: parsing holds the GIL
+        anyway, and :func:`ast.parse` is not safe to call from several threads
+        on every supported Python version.
+        """
+        stale = [path for path in paths if not self._is_fresh(path)]
+        refreshed: Dict[pathlib.Path, Optional[ManifestEntry]] = {}
+        if len(stale) > 1:
+            with concurrent.futures.ThreadPoolExecutor(max_workers) as executor:
+                for path, read in zip(stale, executor.map(_read_source, stale)):
+                    refreshed[path] = self._update(path, *read)
+
+        return [
+            refreshed[path] if path in refreshed else self.get(path) for path in paths
+        ]
+
+    def add_helper(self, path: pathlib.Path) -> ManifestEntry:
+        """
+        Record that a module was imported, and that it has no `Command`.
+
+        The entry has an empty keyword, so the module is not imported again
+        at startup until it changes.
+
+        Parameters
+        ----------
+        path : pathlib.Path
+            Path of the helper module.
+
+        Returns
+        -------
+        ManifestEntry
+            The entry of the module.
+        """
+        stat, _, digest = _read_source(path)
+        key = str(path.resolve())
+        entry = ManifestEntry(
+            keyword="",
+            aliases=frozenset(),
+            description="",
+            long_help="",
+            path=key,
+            mtime_ns=stat.st_mtime_ns,
+            size=stat.st_size,
+            digest=digest,
+        )
+        self.entries[key] = entry
+        self._dirty = True
+        return entry
+
+    def discard(self, path: pathlib.Path) -> None:
+        """
+        Remove the entry of a module, if there is one.
+
+        Parameters
+        ----------
+        path : pathlib.Path
+            Path of the command module.
+        """
+        if self.entries.pop(str(path.resolve()), None) is not None:
+            self._dirty = True
+
+    def prune(self) -> None:
+        """
+        Remove the entries of modules that no longer exist.
+        """
+        for key in list(self.entries):
+            if os.path.exists(key):
+                continue
+            del self.entries[key]
+            self._dirty = True
@@ -1,10 +1,38 @@
+import functools
+import re
 import shlex
-from typing import TYPE_CHECKING, List, Optional
+import time
+from typing import TYPE_CHECKING, List, Optional, Tuple
 
-from _snadra.cmd.utils import console
+from _snadra.output import get_output
+from _snadra.stats import DispatchMetrics
 
 if TYPE_CHECKING:
     from _snadra.cmd.base import Commands
+    from _snadra.jobs import Job
+
+# A line that ends with this token is executed as a background job
+BACKGROUND_TOKEN = "&"
+
+# Number of recently tokenized lines to remember, for replayed scripts
+TOKENIZE_CACHE_SIZE = 1024
+
+# The characters that :func:`shlex.split` treats specially
+_SPECIAL_RE = re.compile(r"[\\'\"]")
+_WORD_RE = re.compile(r"[^ \t\r\n]+")
+_SEGMENT_RE = re.compile(
+    r"""
+    (?P<space>[ \t\r\n]+)
+    | (?P<plain>[^ \t\r\n'"\\]+)
+    | '(?P<single>[^']*)'
+    | "(?P<double>(?:[^"\\]|\\.)*)"
+    | \\(?P<escaped>.)
+    """,
+    re.VERBOSE | re.DOTALL,
+)
+_DOUBLE_QUOTED_ESCAPE_RE = re.compile(r'\\(["\\])')
+# Unclosed double quotes, that end in the middle of an escape
+_UNESCAPED_END_RE = re.compile(r'"(?:[^"\\]|\\.)*\\\Z', re.DOTALL)
 
 
 async def dispatch_line(line: str, *, commands: "Commands") -> None:
@@ -18,28 +46,92 @@ async def dispatch_line(line: str, *, commands: "Commands") -> None:
     commands : Commands
         Commands object.
     """
+    start = time.perf_counter()
     pline = parse_line(line=line)
+    parse_seconds = time.perf_counter() - start
     if pline is None:
         return
 
+    await dispatch(pline, commands=commands, parse_seconds=parse_seconds)
+
+
+async def dispatch(
+    pline: List[str],
+    *,
+    commands: "Commands",
+    parse_seconds: Optional[float] = None,
+) -> None:
+    """
+    Execute a command from an already parsed line.
+
+    Parameters
+    ----------
+    pline : List[str]
+        The line, as returned from :func:`parse_line`.
+    commands : Commands
+        Commands object.
+    parse_seconds : float, optional
+        How long parsing the line took, for the instrumentation.
+
+    Notes
+    -----
+    If the last token of the line is ``&``, the command runs as a background
+    job, see :class:`_snadra.jobs.JobManager`.
+
+    Every stage of the dispatch is measured, see :class:`_snadra.stats.Stats`.
+    """
+    is_background = len(pline) > 1 and pline[-1] == BACKGROUND_TOKEN
+    if is_background:
+        pline = pline[:-1]
+
     target_command = pline[0]
 
-    if commands.is_valid_keyword(target_command):
-        # TODO:
-        # Add memozation
-        command = commands.get_command(target_command)()  # type: ignore
-        parser = command.parser
-    else:
-        console.log(f"[red]Error[/red]: {repr(target_command)} unknown command")
+    start = time.perf_counter()
+    command = commands.get_command(target_command)
+    lookup_seconds = time.perf_counter() - start
+    if command is None:
+        get_output().log(f"[red]Error[/red]: {repr(target_command)} unknown command")
         return
+    parser = command.parser
+
+    metrics = DispatchMetrics(keyword=command.keyword)
+    if parse_seconds is not None:
+        metrics.stages["parse"] = parse_seconds
+    metrics.stages["lookup"] = lookup_seconds
 
     command_arguments = pline[1:]
 
     # TODO:
     # Maybe warn the user if got unknown args?
-    known_args, _ = parser.parse_known_args(command_arguments)
+    with metrics.stage("parse_args"):
+        known_args, _ = parser.parse_known_args(command_arguments)
+
+    run = commands.stats.track(metrics, command.run(known_args))
+    if is_background:
+        job = commands.jobs.submit(run, name=shlex.join(pline), on_done=report_job)
+        get_output().log(f"Started job {job.job_id}: {job.name}")
+        return
+
+    await run
 
-    await command.run(known_args)
+
+def report_job(job: "Job") -> None:
+    """
+    Tell the user that a background job finished.
+
+    Parameters
+    ----------
+    job : Job
+        The finished job.
+    """
+    status = job.status
+    if status == "failed":
+        error = job.task.exception()
+        get_output().log(f"[red]Error[/red]: Job {job.job_id} failed: {repr(error)}")
+    elif status == "cancelled":
+        get_output().log(f"Job {job.job_id} was cancelled")
+    else:
+        get_output().log(f"Job {job.job_id} finished in {job.duration:.3f}s")
 
 
 def parse_line(line: str) -> Optional[List[str]]:
@@ -52,11 +144,11 @@ def parse_line(line: str) -> Optional[List[str]]:
     Returns
     -------
     List[str]
-        Line parsed (with shlex) as a list.
+        Line parsed (with :func:`tokenize`) as a list.
 
     See Also
     --------
-    shlex.split
+    tokenize
 
     Examples
     --------
@@ -69,9 +161,78 @@ def parse_line(line: str) -> Optional[List[str]]:
         return None
 
     try:
-        parsed_line = shlex.split(line)
+        parsed_line = list(tokenize(line))
     except ValueError as err:
-        console.log(f"[red]Error[/red]: {err.args[0]}")
+        get_output().log(f"[red]Error[/red]: {err.args[0]}")
         return None
 
     return parsed_line
+
+
+@functools.lru_cache(maxsize=TOKENIZE_CACHE_SIZE)
+def tokenize(line: str) -> Tuple[str, ...]:
+    """
+    Split a line into tokens, with the quoting rules of :func:`shlex.split`.
+
+    Lines without quotes and backslashes are split on whitespace directly,
+    other lines are scanned with a regular expression rather than the
+    character at a time state machine of :mod:`shlex`. The most recently
+    tokenized lines are cached.
+
+    Parameters
+    ----------
+    line : str
+        The line to split.
+
+    Returns
+    -------
+    Tuple[str, ...]
+        The tokens.
+
+    Raises
+    ------
+    ValueError
+        If a quotation is not closed, or the line ends with a backslash.
+
+    See Also
+    --------
+    shlex.split
+
+    Examples
+    --------
+    >>> tokenize("workspace --desc 'my \\"first\\" one' a\\\\ b")
+    ('workspace', '--desc', 'my "first" one', 'a b')
+    """
+    if _SPECIAL_RE.search(line) is None:
+        return tuple(_WORD_RE.findall(line))
+
+    tokens = []
+    parts: List[str] = []
+    in_token = False
+    position = 0
+    end = len(line)
+    while position < end:
+        match = _SEGMENT_RE.match(line, position)
+        if match is None:
+            if line[position] == "\\" or _UNESCAPED_END_RE.match(line, position):
+                raise ValueError("No escaped character")
+            raise ValueError("No closing quotation")
+
+        kind = match.lastgroup
+        if kind == "space":
+            if in_token:
+                tokens.append("".join(parts))
+                parts.clear()
+                in_token = False
+        else:
+            value = match.group(kind)  # type: ignore
+            if kind == "double":
+                value = _DOUBLE_QUOTED_ESCAPE_RE.sub(r"\1", value)
+            parts.append(value)
+            in_token = True
+        position = match.end()
+
+    if in_token:
+        tokens.append("".join(parts))
+
+    return tuple(tokens)
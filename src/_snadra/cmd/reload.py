@@ -0,0 +1,185 @@
+"""
+Reload the command modules that change while the console is running.
+
+The commands directories (and their subdirectories) are watched with
+:mod:`watchfiles` (inotify on Linux) when it is installed, otherwise they are
+polled. Either way the watcher is an :mod:`asyncio` task, that scans the
+directories in a worker thread, so the prompt is never blocked. Only the
+modules that changed are imported again, see
+:meth:`_snadra.cmd.base.Commands.reload`.
+"""
+import asyncio
+from importlib.machinery import SOURCE_SUFFIXES
+import importlib.util
+import pathlib
+from typing import TYPE_CHECKING, Dict, Iterable, List, Optional, Set, Tuple
+
+from _snadra.cmd.utils import iter_dir
+from _snadra.output import get_output
+
+if TYPE_CHECKING:
+    from _snadra.cmd.base import Commands
+
+# Seconds between two scans of the commands directories, when polling
+POLL_INTERVAL = 1.0
+
+Snapshot = Dict[pathlib.Path, Tuple[int, int]]
+
+
+def snapshot(directories: Iterable[pathlib.Path]) -> Snapshot:
+    """
+    Get the modification time and the size of the modules in directories.
+
+    Parameters
+    ----------
+    directories : Iterable[pathlib.Path]
+        The commands directories, they are scanned recursively.
+
+    Returns
+    -------
+    Snapshot
+        Mapping of the paths of the modules to their modification time (in
+        nanoseconds) and size.
+    """
+    modules = {}
+    for directory in directories:
+        try:
+            paths = list(iter_dir(directory, recursive=True))
+        except OSError:
+            continue
+        for path in paths:
+            try:
+                stat = path.stat()
+            except OSError:
+                # Removed while scanning.
+                continue
+            modules[path] = (stat.st_mtime_ns, stat.st_size)
+    return modules
+
+
+def changed_paths(before: Snapshot, after: Snapshot) -> Set[pathlib.Path]:
+    """
+    Get the modules that were added, modified or removed between two snapshots.
+
+    Examples
+    --------
+    >>> a, b, c = map(pathlib.Path, ["a.py", "b.py", "c.py"])
+    >>> sorted(changed_paths({a: (1, 1), b: (1, 1)}, {b: (2, 1), c: (1, 1)}))
+    [PosixPath('a.py'), PosixPath('b.py'), PosixPath('c.py')]
+    """
+    return {
+        path
+        for path in before.keys() | after.keys()
+        if before.get(path) != after.get(path)
+    }
+
+
+class CommandsWatcher:
+    """
+    Reload the command modules when they change.
+
+    Parameters
+    ----------
+    commands : Commands
+        The commands to update in place.
+    directories : Iterable[pathlib.Path], optional
+        The directories to watch, default to the directories of ``commands``.
+    interval : float, optional
+        Seconds between two scans, when polling.
+    force_polling : bool, default False
+        Poll even if :mod:`watchfiles` is installed.
+    """
+
+    def __init__(
+        self,
+        commands: "Commands",
+        directories: Optional[Iterable[pathlib.Path]] = None,
+        interval: float = POLL_INTERVAL,
+        force_polling: bool = False,
+    ) -> None:
+        self.commands = commands
+        self.directories: List[pathlib.Path] = (
+            [root.path for root in commands.roots]
+            if directories is None
+            else list(directories)
+        )
+        self.interval = interval
+        self.force_polling = force_polling
+        self._task: Optional["asyncio.Task[None]"] = None
+
+    def apply(self, paths: Iterable[pathlib.Path]) -> None:
+        """
+        Reload the modules that changed.
+
+        Parameters
+        ----------
+        paths : Iterable[pathlib.Path]
+            Paths of the modules that were added, modified or removed.
+
+        Notes
+        -----
+        A module that fails to import (for example in the middle of an edit)
+        is reported, and its previous command is kept.
+        """
+        output = get_output()
+        for path in sorted(paths):
+            if path.suffix not in SOURCE_SUFFIXES:
+                continue
+            try:
+                keywords = self.commands.reload(path)
+            except Exception as err:
+                output.log(f"[red]Error[/red]: Failed to reload {path.name}: {err!r}")
+                continue
+
+            if keywords:
+                output.log(f"Reloaded {', '.join(sorted(keywords))} from {path.name}")
+            else:
+                output.log(f"Removed the commands of {path.name}")
+
+    async def _poll(self) -> None:
+        loop = asyncio.get_running_loop()
+        before = await loop.run_in_executor(None, snapshot, self.directories)
+        while True:
+            await asyncio.sleep(self.interval)
+            after = await loop.run_in_executor(None, snapshot, self.directories)
+            paths = changed_paths(before, after)
+            before = after
+            if paths:
+                self.apply(paths)
+
+    async def _watch(self) -> None:
+        import watchfiles
+
+        async for changes in watchfiles.awatch(*self.directories, recursive=True):
+            self.apply({pathlib.Path(path) for _, path in changes})
+
+    async def run(self) -> None:
+        """
+        Watch the directories, until cancelled.
+        """
+        if self.force_polling or importlib.util.find_spec("watchfiles") is None:
+            await self._poll()
+        else:
+            await self._watch()
+
+    def start(self) -> "asyncio.Task[None]":
+        """
+        Start watching in the background.
+        """
+        if self._task is None:
+            self._task = asyncio.ensure_future(self.run())
+        return self._task
+
+    async def stop(self) -> None:
+        """
+        Stop watching.
+        """
+        task, self._task = self._task, None
+        if task is None:
+            return
+
+        task.cancel()
+        try:
+            await task
+        except asyncio.CancelledError:
+            pass
@@ -1,20 +1,65 @@
 import abc
 import argparse
 from importlib.machinery import SOURCE_SUFFIXES
+import sys
 from typing import TYPE_CHECKING, Any, Dict, Iterable, Optional, Set
 
-from rich.console import Console
+from _snadra.output import get_output
 
 if TYPE_CHECKING:
     import pathlib
 
-console = Console(emoji=False)
+    from rich.console import Console
+
+    from _snadra.cmd.base import Commands
+
+
+class LazyConsole:
+    """
+    A :class:`rich.console.Console` that is created the first time it is used.
+
+    Importing :mod:`rich` is a noticeable part of the startup time, and most
+    code paths that import a console never print anything.
+
+    Parameters
+    ----------
+    **kwargs
+        Keyword arguments for :class:`rich.console.Console`.
+    """
+
+    __slots__ = {
+        "_console",
+        "_kwargs",
+    }
+
+    def __init__(self, **kwargs: Any) -> None:
+        object.__setattr__(self, "_kwargs", kwargs)
+        object.__setattr__(self, "_console", None)
+
+    def _get_console(self) -> "Console":
+        if self._console is None:
+            from rich.console import Console
+
+            object.__setattr__(self, "_console", Console(**self._kwargs))
+        return self._console
+
+    def __getattr__(self, name: str) -> Any:
+        return getattr(self._get_console(), name)
+
+    def __setattr__(self, name: str, value: Any) -> None:
+        setattr(self._get_console(), name, value)
+
+
+console = LazyConsole(emoji=False)
+# For diagnostics that should not mix with the output of the commands.
+error_console = LazyConsole(emoji=False, stderr=True)
 
 
 def iter_dir(
     path: "pathlib.Path",
     include_suffixes: Optional[Iterable[str]] = None,
     skip: Optional[Set[str]] = None,
+    recursive: bool = False,
 ) -> Iterable["pathlib.Path"]:
     """
     Iterating over a directory, skipping specified file names.
@@ -27,20 +72,26 @@ def iter_dir(
         Suffixes to include.
     skip : Set[str], optional
         File names to skip.
+    recursive : bool, default False
+        Iterate over the subdirectories too, except for the hidden ones and
+        ``__pycache__``.
 
     Yields
     ------
     pathlib.Path
-        File paths that have not got skipped over.
+        File paths that have not got skipped over, the files of a directory
+        before its subdirectories.
     """
     if include_suffixes is None:
         include_suffixes = SOURCE_SUFFIXES
     if skip is None:
         skip = set()
 
-    # TODO(maybe): Add recursive for dirs?
-    for child in path.iterdir():
+    directories = []
+    for child in sorted(path.iterdir()):
         if child.is_dir():
+            if recursive and not child.name.startswith((".", "__pycache__")):
+                directories.append(child)
             continue
         if child.stem in skip:
             continue
@@ -48,14 +99,43 @@ def iter_dir(
             continue
         yield child
 
+    for directory in directories:
+        yield from iter_dir(directory, include_suffixes, skip, recursive)
+
+
+class CommandParser(argparse.ArgumentParser):
+    """
+    An :class:`argparse.ArgumentParser` that prints to the current output.
+
+    The help (of ``-h``) and the usage errors go to the output of the current
+    context (see :func:`_snadra.output.get_output`), like to the client of the
+    daemon whose line is parsed, instead of the streams of the process. Like
+    any parser, it still raises :class:`SystemExit` after printing them.
+    """
+
+    def _print_message(self, message: str, file: Any = None) -> None:
+        if not message:
+            return
+        output = get_output()
+        if file is sys.stdout:
+            output.file.write(message)
+        else:
+            output.error_console.file.write(message)
+
 
 class CommandMeta(metaclass=abc.ABCMeta):
     """
     Abstract base class for command line commands.
+
+    Parameters
+    ----------
+    commands : Commands, optional
+        The commands registry that this command belongs to.
     """
 
-    def __init__(self) -> None:
-        self.parser = argparse.ArgumentParser(
+    def __init__(self, commands: Optional["Commands"] = None) -> None:
+        self.commands = commands
+        self.parser = CommandParser(
             prog=self.keyword,
             description=self.description,
             formatter_class=argparse.RawDescriptionHelpFormatter,
@@ -163,6 +243,21 @@ class CommandMeta(metaclass=abc.ABCMeta):
         """
         ...
 
+    @property
+    def concurrent(self) -> bool:
+        """
+        Whether the command can run concurrently with other commands.
+
+        Only commands that do not change any shared state (the current workspace,
+        the database, etc.) should set this. In batch mode, consecutive lines of
+        such commands are executed concurrently.
+
+        Returns
+        -------
+        bool
+        """
+        return False
+
     @property
     def arguments(self) -> Optional[Dict[str, Dict[str, Any]]]:
         """
@@ -175,6 +270,28 @@ class CommandMeta(metaclass=abc.ABCMeta):
         """
         ...
 
+    async def complete(self, dest: str, prefix: str) -> Iterable[str]:
+        """
+        Get the values that complete an argument of the command.
+
+        This is called for arguments without ``choices``, while the user types.
+        It should be fast, so values that come from the database should be
+        cached.
+
+        Parameters
+        ----------
+        dest : str
+            The ``dest`` of the argument.
+        prefix : str
+            What was typed of the value so far.
+
+        Returns
+        -------
+        Iterable[str]
+            Values that start with ``prefix``, by default none.
+        """
+        return ()
+
     @abc.abstractmethod
     async def run(self, args: argparse.Namespace) -> None:
         """
@@ -0,0 +1,256 @@
+"""
+Completion of the console lines.
+
+The first word is completed from the keywords and the aliases of the commands,
+the following words from the options of the command (built from its
+``arguments``), their ``choices``, and the values that the command itself
+suggests with :meth:`_snadra.cmd.utils.CommandMeta.complete`.
+"""
+import itertools
+import re
+import shlex
+from typing import (
+    TYPE_CHECKING,
+    AsyncGenerator,
+    Dict,
+    Iterable,
+    List,
+    NamedTuple,
+    Optional,
+    Tuple,
+)
+
+from prompt_toolkit.completion import CompleteEvent, Completer, Completion
+from prompt_toolkit.document import Document
+
+from _snadra.cmd.parsers import tokenize
+from _snadra.trie import Trie
+
+if TYPE_CHECKING:
+    from _snadra.cmd.base import Commands
+    from _snadra.cmd.utils import CommandMeta
+
+# The most completions that are shown at once
+MAX_COMPLETIONS = 200
+
+# Actions that do not consume a value
+_FLAG_ACTIONS = {
+    "count",
+    "help",
+    "store_const",
+    "store_false",
+    "store_true",
+    "version",
+}
+
+_LAST_WORD_RE = re.compile(r"[^ \t\r\n]*\Z")
+
+
+class ArgumentsSpec(NamedTuple):
+    """
+    What can be completed in the arguments of a command.
+    """
+
+    # Option strings, like "-a" and "--add"
+    options: Trie
+    # Option string to the ``dest`` of its value, `None` for flags
+    option_dests: Dict[str, Optional[str]]
+    # ``dest`` of each positional argument, in order
+    positionals: List[str]
+    # Whether the last positional argument takes any number of values
+    is_last_repeated: bool
+    # ``dest`` to its choices
+    choices: Dict[str, List[str]]
+
+    @classmethod
+    def from_command(cls, command: "CommandMeta") -> "ArgumentsSpec":
+        """
+        Build the specification from the ``arguments`` of a command.
+        """
+        options = Trie()
+        option_dests: Dict[str, Optional[str]] = {}
+        positionals: List[str] = []
+        is_last_repeated = False
+        choices: Dict[str, List[str]] = {}
+
+        for arg, param in (command.arguments or {}).items():
+            names = arg.split(",")
+            if names[0].startswith("-"):
+                long_names = [name for name in names if name.startswith("--")]
+                dest = param.get("dest") or (long_names or names)[0].lstrip("-")
+                dest = dest.replace("-", "_")
+                is_flag = param.get("action") in _FLAG_ACTIONS
+                for name in names:
+                    options.add(name)
+                    option_dests[name] = None if is_flag else dest
+            else:
+                dest = param.get("dest", names[0])
+                positionals.append(dest)
+                is_last_repeated = param.get("nargs") in {"*", "+", "..."}
+
+            if param.get("choices") is not None:
+                choices[dest] = [str(choice) for choice in param["choices"]]
+
+        return cls(
+            options=options,
+            option_dests=option_dests,
+            positionals=positionals,
+            is_last_repeated=is_last_repeated,
+            choices=choices,
+        )
+
+    def value_dest(self, words: List[str]) -> Optional[str]:
+        """
+        Get the ``dest`` of the value that follows some arguments.
+
+        Parameters
+        ----------
+        words : List[str]
+            The arguments that were already typed, without the keyword.
+
+        Returns
+        -------
+        Optional[str]
+            `None` if no value can follow.
+        """
+        if words:
+            dest = self.option_dests.get(words[-1])
+            if dest is not None:
+                return dest
+
+        position = 0
+        is_option_value = False
+        for word in words:
+            if is_option_value:
+                is_option_value = False
+            elif word in self.option_dests:
+                is_option_value = self.option_dests[word] is not None
+            elif not word.startswith("-"):
+                position += 1
+
+        if position < len(self.positionals):
+            return self.positionals[position]
+        if self.positionals and self.is_last_repeated:
+            return self.positionals[-1]
+        return None
+
+
+class SnadraCompleter(Completer):
+    """
+    Complete the keywords of the commands and their arguments.
+
+    Parameters
+    ----------
+    commands : Commands
+        The commands to complete.
+    max_completions : int, optional
+        The most completions that are yielded for a single key press.
+
+    Notes
+    -----
+    The keywords and the arguments of every command are kept in prefix trees,
+    which are rebuilt only when the commands are registered again.
+    """
+
+    def __init__(
+        self, commands: "Commands", max_completions: int = MAX_COMPLETIONS
+    ) -> None:
+        self.commands = commands
+        self.max_completions = max_completions
+        self._keywords = Trie()
+        self._keywords_source: Optional[Dict] = None
+        self._specs: Dict[str, Tuple["CommandMeta", ArgumentsSpec]] = {}
+
+    @property
+    def keywords(self) -> Trie:
+        """
+        Get the keywords and the aliases of the commands.
+        """
+        # Registering a command replaces this mapping.
+        if self._keywords_source is not self.commands.commands:
+            self._keywords_source = self.commands.commands
+            self._keywords = Trie(self.commands.all_keywords)
+        return self._keywords
+
+    def spec(self, command: "CommandMeta") -> ArgumentsSpec:
+        """
+        Get the completion specification of a command's arguments.
+        """
+        cached = self._specs.get(command.keyword)
+        if cached is None or cached[0] is not command:
+            cached = (command, ArgumentsSpec.from_command(command))
+            self._specs[command.keyword] = cached
+        return cached[1]
+
+    @staticmethod
+    def split(text: str) -> Tuple[List[str], str]:
+        """
+        Split the text before the cursor into the complete words and the word
+        that is being typed.
+
+        Examples
+        --------
+        >>> SnadraCompleter.split("workspace --add")
+        (['workspace'], '--add')
+        >>> SnadraCompleter.split("workspace 'my workspace' ")
+        (['workspace', 'my workspace'], '')
+        """
+        prefix = _LAST_WORD_RE.search(text).group()  # type: ignore
+        head = text[: len(text) - len(prefix)]
+        try:
+            words = list(tokenize(head))
+        except ValueError:
+            # An open quotation.
+            words = head.split()
+        return words, prefix
+
+    def _candidates(
+        self, text: str
+    ) -> Tuple[str, Iterable[str], Optional["CommandMeta"], Optional[str]]:
+        """
+        Get the prefix that is being completed, the static candidates, and
+        the command and the ``dest`` to ask for dynamic candidates.
+        """
+        words, prefix = self.split(text)
+        if not words:
+            return prefix, self.keywords.iter_prefix(prefix), None, None
+
+        command = self.commands.get_command(words[0])
+        if command is None:
+            return prefix, (), None, None
+
+        spec = self.spec(command)
+        if prefix.startswith("-"):
+            return prefix, spec.options.iter_prefix(prefix), None, None
+
+        dest = spec.value_dest(words[1:])
+        if dest is None:
+            return prefix, (), None, None
+
+        choices = spec.choices.get(dest)
+        if choices is not None:
+            return prefix, (c for c in choices if c.startswith(prefix)), None, None
+
+        return prefix, (), command, dest
+
+    def _completions(self, prefix: str, values: Iterable[str]) -> Iterable[Completion]:
+        for value in itertools.islice(values, self.max_completions):
+            yield Completion(
+                shlex.quote(value), start_position=-len(prefix), display=value
+            )
+
+    def get_completions(
+        self, document: Document, complete_event: CompleteEvent
+    ) -> Iterable[Completion]:
+        prefix, values, _, _ = self._candidates(document.text_before_cursor)
+        yield from self._completions(prefix, values)
+
+    async def get_completions_async(
+        self, document: Document, complete_event: CompleteEvent
+    ) -> AsyncGenerator[Completion, None]:
+        prefix, values, command, dest = self._candidates(document.text_before_cursor)
+        if command is not None:
+            values = await command.complete(dest, prefix)  # type: ignore
+
+        for completion in self._completions(prefix, values):
+            yield completion
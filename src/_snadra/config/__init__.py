@@ -1,8 +1,35 @@
-from _snadra.config.constants import DEFAULT_CONFIG, DEFAULT_CONFIG_FILE_PATH
-from _snadra.config.utils import parse_config_file
+from _snadra.config.constants import (
+    DEFAULT_CACHE_DIR_PATH,
+    DEFAULT_CONFIG,
+    DEFAULT_CONFIG_FILE_PATH,
+    DEFAULT_DATA_DIR_PATH,
+    DEFAULT_HISTORY_DIR_PATH,
+    DEFAULT_MANIFEST_FILE_PATH,
+    DEFAULT_WORKSPACES_CONFIG_DIR_PATH,
+)
+from _snadra.config.service import (
+    ConfigService,
+    get_config,
+    get_config_service,
+    parse_env,
+    set_config_service,
+)
+from _snadra.config.utils import load_config, merge_config, parse_config_file
 
 __all__ = [
+    "DEFAULT_CACHE_DIR_PATH",
     "DEFAULT_CONFIG",
     "DEFAULT_CONFIG_FILE_PATH",
+    "DEFAULT_DATA_DIR_PATH",
+    "DEFAULT_HISTORY_DIR_PATH",
+    "DEFAULT_MANIFEST_FILE_PATH",
+    "DEFAULT_WORKSPACES_CONFIG_DIR_PATH",
+    "ConfigService",
+    "get_config",
+    "get_config_service",
+    "load_config",
+    "merge_config",
     "parse_config_file",
+    "parse_env",
+    "set_config_service",
 ]
@@ -1,15 +1,72 @@
 import pathlib
+from typing import Any, Dict
 
-DEFAULT_CONFIG = {
+DEFAULT_DATA_DIR_PATH = pathlib.Path("~/.local/share/snadra").expanduser()
+
+DEFAULT_CONFIG: Dict[str, Dict[str, Any]] = {
     "database": {
         "db": "snadra",
+        "host": "127.0.0.1",
         "password": "snadra",
         "user": "snadra",
         "port": 5432,
         "type": "postgres",
-    }
+        # Connection pool
+        "pool_size": 5,
+        "max_overflow": 10,
+        "pool_pre_ping": True,
+        "pool_recycle": -1,
+        "pool_timeout": 30,
+        # Driver
+        "statement_cache_size": 100,
+        "command_timeout": 60,
+        "connect_timeout": 60,
+        # SQLite (``type = "sqlite"``), either a file or ":memory:"
+        "path": str(DEFAULT_DATA_DIR_PATH / "snadra.sqlite3"),
+    },
+    # ``snadra --daemon``, the socket is only accessible to its owner by default
+    "daemon": {
+        "socket_path": str(DEFAULT_DATA_DIR_PATH / "snadra.sock"),
+        "socket_mode": 0o600,
+    },
+    "history": {
+        "max_lines": 100_000,
+        "flush_interval": 1.0,
+    },
+    "jobs": {
+        "max_concurrent": 4,
+    },
+    # Format of the results of the commands, see ``_snadra.output.OUTPUT_MODES``
+    "output": {
+        "mode": "rich",
+    },
+    # More directories of command modules, searched recursively after the core
+    # commands, the modules that changed are read by ``max_workers`` threads
+    "plugins": {
+        "paths": [],
+        "max_workers": 4,
+    },
+    # Reload the command modules when they change, for developing commands
+    "reload": {
+        "enabled": False,
+        "interval": 1.0,
+        "force_polling": False,
+    },
+    "stats": {
+        "window": 1024,
+        "track_allocations": False,
+    },
 }
 
 DEFAULT_CONFIG_FILE_PATH = pathlib.Path(
     "~/.config/snadra/snadra_config.toml"
 ).expanduser()
+
+# ``<workspace>.toml``, merged over the user's configuration in that workspace
+DEFAULT_WORKSPACES_CONFIG_DIR_PATH = DEFAULT_CONFIG_FILE_PATH.parent / "workspaces"
+
+DEFAULT_CACHE_DIR_PATH = pathlib.Path("~/.cache/snadra").expanduser()
+
+DEFAULT_MANIFEST_FILE_PATH = DEFAULT_CACHE_DIR_PATH / "commands_manifest.json"
+
+DEFAULT_HISTORY_DIR_PATH = DEFAULT_DATA_DIR_PATH / "history"
@@ -0,0 +1,325 @@
+"""
+The configuration, loaded once and shared by the whole process.
+
+The configuration is made of layers, each one overriding the previous ones:
+
+1. :data:`DEFAULT_CONFIG`.
+2. The user's configuration file.
+3. The configuration file of the current workspace, if there is one.
+4. The ``SNADRA_<SECTION>__<KEY>`` environment variables, like
+   ``SNADRA_DATABASE__PORT=5433``. Their values are parsed as TOML values, and
+   taken as strings if they are not valid TOML.
+5. The overrides of the command line, see :meth:`ConfigService.override`.
+
+The merged configuration is an immutable snapshot, so reading it costs no I/O.
+:meth:`ConfigService.refresh` checks the files (only their modification time
+and size), and re-reads the ones that changed. Only the interactive console
+refreshes the configuration (before every line), and applies the changes of the
+output and of the database; scripts and the daemon keep the one that they
+started with.
+"""
+import os
+import pathlib
+import types
+from typing import Any, Dict, Mapping, MutableMapping, Optional, Tuple
+import urllib.parse
+
+from _snadra.config.constants import (
+    DEFAULT_CONFIG,
+    DEFAULT_CONFIG_FILE_PATH,
+    DEFAULT_WORKSPACES_CONFIG_DIR_PATH,
+)
+from _snadra.config.utils import merge_config, parse_config_file
+from _snadra.state import get_session
+
+# Prefix of the environment variables that override the configuration
+ENV_PREFIX = "SNADRA_"
+
+Config = Mapping[str, Any]
+# Modification time (in nanoseconds) and size of a file, `None` if it is missing
+Stamp = Optional[Tuple[int, int]]
+
+
+def freeze(config: Any) -> Any:
+    """
+    Make an immutable copy of a configuration.
+
+    Examples
+    --------
+    >>> config = freeze({"plugins": {"paths": ["~/plugins"]}})
+    >>> config["plugins"]["paths"]
+    ('~/plugins',)
+    >>> config["plugins"]["paths"] = []
+    Traceback (most recent call last):
+    ...
+    TypeError: 'mappingproxy' object does not support item assignment
+    """
+    if isinstance(config, Mapping):
+        return types.MappingProxyType(
+            {key: freeze(value) for key, value in config.items()}
+        )
+    if isinstance(config, (list, tuple)):
+        return tuple(freeze(value) for value in config)
+    return config
+
+
+def parse_env(environ: Mapping[str, str]) -> Dict[str, Any]:
+    """
+    Get the configuration from the environment variables.
+
+    Parameters
+    ----------
+    environ : Mapping[str, str]
+        The environment variables.
+
+    Returns
+    -------
+    Dict[str, Any]
+        The configuration of the variables that start with :data:`ENV_PREFIX`
+        and name a key of a section.
+
+    Examples
+    --------
+    >>> parse_env({"SNADRA_DATABASE__PORT": "5433", "SNADRA_OTHER": "1"})
+    {'database': {'port': 5433}}
+    >>> parse_env({"SNADRA_DATABASE__HOST": "db.local"})
+    {'database': {'host': 'db.local'}}
+    """
+    import rtoml
+
+    config: Dict[str, Any] = {}
+    for name, raw in environ.items():
+        if not name.startswith(ENV_PREFIX):
+            continue
+
+        *sections, key = name[len(ENV_PREFIX) :].lower().split("__")
+        if not sections or not key or not all(sections):
+            continue
+        try:
+            value = rtoml.loads(f"value = {raw}")["value"]
+        except rtoml.TomlParsingError:
+            value = raw
+
+        table = config
+        for section in sections:
+            table = table.setdefault(section, {})
+        table[key] = value
+
+    return config
+
+
+def _stamp(path: pathlib.Path) -> Stamp:
+    try:
+        stat = path.stat()
+    except OSError:
+        return None
+    return stat.st_mtime_ns, stat.st_size
+
+
+class ConfigService:
+    """
+    Load the configuration once, and re-read it only when its files change.
+
+    Parameters
+    ----------
+    path : pathlib.Path, optional
+        Path of the user's configuration file, defaults to
+        :data:`DEFAULT_CONFIG_FILE_PATH`.
+    workspaces_dir : pathlib.Path, optional
+        Directory of the workspaces' configuration files (``<workspace>.toml``),
+        defaults to :data:`DEFAULT_WORKSPACES_CONFIG_DIR_PATH`.
+    environ : Mapping[str, str], optional
+        The environment variables, defaults to `os.environ`. They are read
+        once.
+
+    Raises
+    ------
+    rtoml.TomlParsingError
+        If the user's configuration file is not valid.
+
+    Notes
+    -----
+    The configuration of a workspace is merged when it is first requested, and
+    cached until its file (or the user's configuration) changes.
+    """
+
+    __slots__ = {
+        "_env",
+        "_files",
+        "_overrides",
+        "_snapshot",
+        "_workspace_snapshots",
+        "path",
+        "workspaces_dir",
+    }
+
+    def __init__(
+        self,
+        path: Optional[pathlib.Path] = None,
+        workspaces_dir: Optional[pathlib.Path] = None,
+        environ: Optional[Mapping[str, str]] = None,
+    ) -> None:
+        self.path = DEFAULT_CONFIG_FILE_PATH if path is None else path
+        self.workspaces_dir = (
+            DEFAULT_WORKSPACES_CONFIG_DIR_PATH
+            if workspaces_dir is None
+            else workspaces_dir
+        )
+        self._env = parse_env(os.environ if environ is None else environ)
+        self._overrides: Dict[str, Any] = {}
+        # The stamp and the content of every file that was read
+        self._files: Dict[pathlib.Path, Tuple[Stamp, Dict[str, Any]]] = {}
+        self._workspace_snapshots: MutableMapping[str, Config] = {}
+        self._snapshot: Config = self._build()
+
+    def _read(self, path: pathlib.Path) -> Dict[str, Any]:
+        """
+        Get the content of a file, parsing it only if it changed.
+
+        A file that fails to parse is not parsed again until it changes, its
+        previous content is kept.
+        """
+        stamp = _stamp(path)
+        cached = self._files.get(path)
+        if cached is not None and cached[0] == stamp:
+            return cached[1]
+
+        previous = {} if cached is None else cached[1]
+        self._files[path] = (stamp, previous)
+        content = {} if stamp is None else parse_config_file(path)
+        self._files[path] = (stamp, content)
+        return content
+
+    def _build(self, workspace: Optional[str] = None) -> Config:
+        layers = [self._read(self.path), self._env, self._overrides]
+        if workspace is not None:
+            layers.insert(1, self._read(self.workspace_path(workspace)))
+
+        config: Mapping[str, Any] = DEFAULT_CONFIG
+        for layer in layers:
+            if layer:
+                config = merge_config(config, layer)
+        return freeze(config)
+
+    def workspace_path(self, workspace: str) -> pathlib.Path:
+        """
+        Get the path of the configuration file of a workspace.
+
+        Examples
+        --------
+        >>> service = ConfigService(
+        ...     path=pathlib.Path("missing.toml"),
+        ...     workspaces_dir=pathlib.Path("workspaces"),
+        ...     environ={},
+        ... )
+        >>> service.workspace_path("../../engagement").name
+        '..%2F..%2Fengagement.toml'
+        """
+        # Workspace names are arbitrary, they must not escape the directory.
+        name = urllib.parse.quote(workspace, safe="")
+        return self.workspaces_dir / f"{name}.toml"
+
+    def get(self, workspace: Optional[str] = None) -> Config:
+        """
+        Get the configuration, without reading any file that was already read.
+
+        Parameters
+        ----------
+        workspace : str, optional
+            Merge the configuration of this workspace. If not specified, only
+            the process-wide configuration is returned.
+
+        Returns
+        -------
+        Config
+            An immutable snapshot of the configuration.
+        """
+        if workspace is None:
+            return self._snapshot
+
+        snapshot = self._workspace_snapshots.get(workspace)
+        if snapshot is None:
+            snapshot = self._build(workspace)
+            self._workspace_snapshots[workspace] = snapshot
+        return snapshot
+
+    def refresh(self) -> bool:
+        """
+        Re-read the configuration files that changed since they were read.
+
+        Returns
+        -------
+        bool
+            Whether any file changed.
+
+        Raises
+        ------
+        rtoml.TomlParsingError
+            If a file that changed is not valid, the previous configuration is
+            kept.
+        """
+        changed = [
+            path for path, (stamp, _) in self._files.items() if _stamp(path) != stamp
+        ]
+        if not changed:
+            return False
+
+        # The workspaces' files are read again on demand.
+        self._workspace_snapshots.clear()
+        if self.path in changed:
+            self._snapshot = self._build()
+        return True
+
+    def override(self, config: Mapping[str, Any]) -> None:
+        """
+        Override the configuration, for the lifetime of the process.
+
+        Parameters
+        ----------
+        config : Mapping[str, Any]
+            The configuration to merge, like the options of the command line.
+        """
+        self._overrides = merge_config(self._overrides, config)
+        self._workspace_snapshots.clear()
+        self._snapshot = self._build()
+
+
+_service: Optional[ConfigService] = None
+
+
+def get_config_service() -> ConfigService:
+    """
+    Get the configuration of the process, loading it on the first call.
+    """
+    global _service
+
+    if _service is None:
+        _service = ConfigService()
+    return _service
+
+
+def set_config_service(service: Optional[ConfigService]) -> None:
+    """
+    Replace the configuration of the process.
+
+    Parameters
+    ----------
+    service : ConfigService, optional
+        The new configuration, `None` loads it again on the next call to
+        :func:`get_config_service`.
+    """
+    global _service
+
+    _service = service
+
+
+def get_config() -> Config:
+    """
+    Get the configuration of the current session's workspace.
+
+    Returns
+    -------
+    Config
+        An immutable snapshot, see :meth:`ConfigService.get`.
+    """
+    return get_config_service().get(get_session().current_workspace)
@@ -1,8 +1,11 @@
+import copy
 import pathlib
-from typing import Any, Dict
+from typing import Any, Dict, Mapping, Optional
 
 import rtoml
 
+from _snadra.config.constants import DEFAULT_CONFIG, DEFAULT_CONFIG_FILE_PATH
+
 
 def parse_config_file(path: pathlib.Path) -> Dict[str, Any]:
     """
@@ -22,3 +25,62 @@ def parse_config_file(path: pathlib.Path) -> Dict[str, Any]:
         config = rtoml.load(file_obj)
 
     return config
+
+
+def merge_config(
+    base: Mapping[str, Any], override: Mapping[str, Any]
+) -> Dict[str, Any]:
+    """
+    Recursively merge two configurations.
+
+    Parameters
+    ----------
+    base : Mapping[str, Any]
+        The configuration to merge into.
+    override : Mapping[str, Any]
+        The configuration that takes precedence.
+
+    Returns
+    -------
+    Dict[str, Any]
+        A new dictionary, neither ``base`` nor ``override`` are modified.
+
+    Examples
+    --------
+    >>> base = {"database": {"user": "snadra", "port": 5432}}
+    >>> override = {"database": {"port": 5433}}
+    >>> merge_config(base, override)
+    {'database': {'user': 'snadra', 'port': 5433}}
+    """
+    merged = copy.deepcopy(dict(base))
+    for key, value in override.items():
+        if isinstance(value, Mapping) and isinstance(merged.get(key), Mapping):
+            merged[key] = merge_config(merged[key], value)
+        else:
+            merged[key] = copy.deepcopy(value)
+
+    return merged
+
+
+def load_config(path: Optional[pathlib.Path] = None) -> Dict[str, Any]:
+    """
+    Get the configuration, with the defaults filled in.
+
+    Parameters
+    ----------
+    path : pathlib.Path, optional
+        Path to the configuration file.
+        If not specified, the default configuration file path is used.
+
+    Returns
+    -------
+    Dict[str, Any]
+        :data:`DEFAULT_CONFIG` merged with the configuration file, if it exists.
+    """
+    if path is None:
+        path = DEFAULT_CONFIG_FILE_PATH
+
+    if not path.is_file():
+        return copy.deepcopy(DEFAULT_CONFIG)
+
+    return merge_config(DEFAULT_CONFIG, parse_config_file(path))
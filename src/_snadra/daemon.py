@@ -0,0 +1,503 @@
+"""
+Serve the console to many clients from a single process.
+
+The daemon (``snadra --daemon``) owns a single :class:`Commands` registry and a
+single database engine, so its clients share the imported command modules, the
+warm caches and a bounded connection pool. The clients (``snadra --connect``)
+are thin, they only send lines over a Unix socket and print what comes back.
+
+Both sides send a JSON object per line:
+
+* The client starts with ``{"hello": {"output": ..., "width": ..., "color":
+  ...}}``, then sends ``{"line": ...}`` for every line.
+* The daemon answers each of them with any number of ``{"out": ...}`` and
+  ``{"err": ...}`` chunks, followed by ``{"done": true, "workspace": ...,
+  "exit": ...}``.
+* A frame that is not valid is answered with ``{"error": ...}``, and the
+  daemon closes the connection.
+"""
+import asyncio
+import io
+import json
+import os
+import pathlib
+import shutil
+import sys
+from typing import IO, TYPE_CHECKING, Any, Dict, List, Optional
+
+from _snadra.cmd.parsers import dispatch_line
+from _snadra.cmd.utils import console
+from _snadra.output import OUTPUT_MODES, Output, get_output, set_output
+from _snadra.state import Session, set_session
+
+if TYPE_CHECKING:
+    from _snadra.cmd.base import Commands
+
+# Longest frame that is accepted, in bytes
+FRAME_LIMIT = 1024 * 1024
+
+
+def encode_frame(**frame: Any) -> bytes:
+    """
+    Encode a frame of the protocol.
+
+    Examples
+    --------
+    >>> encode_frame(line="help")
+    b'{"line": "help"}\\n'
+    """
+    return json.dumps(frame).encode() + b"\n"
+
+
+async def read_frame(reader: asyncio.StreamReader) -> Optional[Dict[str, Any]]:
+    """
+    Read a frame of the protocol.
+
+    Returns
+    -------
+    Optional[Dict[str, Any]]
+        `None` once the other side closed the connection.
+
+    Raises
+    ------
+    ValueError
+        If the frame is not a JSON object.
+    """
+    data = await reader.readline()
+    if not data:
+        return None
+
+    frame = json.loads(data)
+    if not isinstance(frame, dict):
+        raise ValueError(f"Invalid frame: {data!r}")
+    return frame
+
+
+def parse_hello(frame: Dict[str, Any]) -> Dict[str, Any]:
+    """
+    Validate the options of the first frame of a client.
+
+    Returns
+    -------
+    Dict[str, Any]
+        The keyword arguments for :func:`client_output`.
+
+    Raises
+    ------
+    ValueError
+        If an option is unknown, or its value is not valid.
+
+    Examples
+    --------
+    >>> parse_hello({"hello": {"output": "jsonl", "width": 80}})
+    {'output': 'jsonl', 'width': 80}
+    >>> parse_hello({"hello": {"colour": True}})
+    Traceback (most recent call last):
+    ...
+    ValueError: Unknown hello option: 'colour'
+    """
+    hello = frame.get("hello", {})
+    if not isinstance(hello, dict):
+        raise ValueError(f"Invalid hello: {hello!r}")
+
+    for key, value in hello.items():
+        if key == "output":
+            is_valid = value in OUTPUT_MODES
+        elif key == "width":
+            # A bool is an int too.
+            is_valid = value is None or (
+                isinstance(value, int) and not isinstance(value, bool) and value > 0
+            )
+        elif key == "color":
+            is_valid = isinstance(value, bool)
+        else:
+            raise ValueError(f"Unknown hello option: {key!r}")
+        if not is_valid:
+            raise ValueError(f"Invalid hello option {key!r}: {value!r}")
+    return hello
+
+
+class _FrameFile(io.TextIOBase):
+    """
+    A text file, whose writes are sent to the client as frames.
+
+    The text is buffered, and sent at the end of a line (or when flushed). The
+    writes cannot wait for a slow client, :meth:`drain` does, see
+    :meth:`_snadra.output.Output.drain`.
+    """
+
+    def __init__(self, writer: asyncio.StreamWriter, key: str) -> None:
+        super().__init__()
+        self.writer = writer
+        self.key = key
+        self._buffer: List[str] = []
+
+    def writable(self) -> bool:
+        return True
+
+    def write(self, text: str) -> int:
+        if text:
+            self._buffer.append(text)
+            if "\n" in text:
+                self.flush()
+        return len(text)
+
+    def flush(self) -> None:
+        text, self._buffer = "".join(self._buffer), []
+        if text and not self.writer.is_closing():
+            self.writer.write(encode_frame(**{self.key: text}))
+
+    async def drain(self) -> None:
+        """
+        Send the buffered text, and wait until the client can take more.
+        """
+        self.flush()
+        if not self.writer.is_closing():
+            await self.writer.drain()
+
+
+def client_output(
+    writer: asyncio.StreamWriter,
+    output: str = "rich",
+    width: Optional[int] = None,
+    color: bool = False,
+) -> Output:
+    """
+    Get an output that sends everything to a client.
+
+    Parameters
+    ----------
+    writer : :class:`asyncio.StreamWriter`
+        The connection to the client.
+    output : str, default "rich"
+        The output mode of the client.
+    width : int, optional
+        Width of the client's terminal.
+    color : bool, default False
+        Whether the client's terminal supports colors.
+    """
+    from rich.console import Console
+
+    out: IO[str] = _FrameFile(writer, "out")  # type: ignore
+    err: IO[str] = _FrameFile(writer, "err")  # type: ignore
+    options: Dict[str, Any] = {
+        "color_system": "standard" if color else None,
+        "emoji": False,
+        "force_terminal": color,
+        "width": width,
+    }
+    return Output(
+        output,
+        file=out,
+        console=Console(file=out, **options),
+        error_console=Console(file=err, **options),
+    )
+
+
+class SnadraDaemon:
+    """
+    Serve the commands to the clients that connect to a Unix socket.
+
+    Parameters
+    ----------
+    commands : Commands
+        The commands, shared by all the clients.
+    socket_path : pathlib.Path
+        Path of the Unix socket.
+    socket_mode : int, optional
+        Permissions of the socket, only its owner can connect by default.
+
+    Notes
+    -----
+    Every client has its own :class:`_snadra.state.Session` (like the current
+    workspace) and its own output, both set in the context of its connection,
+    so the lines of different clients are dispatched concurrently.
+    """
+
+    def __init__(
+        self,
+        commands: "Commands",
+        socket_path: pathlib.Path,
+        socket_mode: int = 0o600,
+    ) -> None:
+        self.commands = commands
+        self.socket_path = socket_path
+        self.socket_mode = socket_mode
+        self.clients = 0
+        self._server: Optional[asyncio.AbstractServer] = None
+
+    async def _remove_stale_socket(self) -> None:
+        try:
+            _, writer = await asyncio.open_unix_connection(str(self.socket_path))
+        except FileNotFoundError:
+            return
+        except ConnectionRefusedError:
+            # Left behind by a daemon that did not exit cleanly.
+            self.socket_path.unlink()
+            return
+
+        writer.close()
+        await writer.wait_closed()
+        raise RuntimeError(f"A daemon is already listening on {self.socket_path}")
+
+    async def start(self) -> None:
+        """
+        Start listening.
+
+        Raises
+        ------
+        RuntimeError
+            If another daemon listens on the socket.
+        """
+        self.socket_path.parent.mkdir(parents=True, exist_ok=True)
+        await self._remove_stale_socket()
+
+        self._server = await asyncio.start_unix_server(
+            self._handle, path=str(self.socket_path), limit=FRAME_LIMIT
+        )
+        os.chmod(self.socket_path, self.socket_mode)
+
+    async def serve_forever(self) -> None:
+        """
+        Serve the clients until cancelled, then stop listening.
+        """
+        if self._server is None:
+            await self.start()
+        try:
+            await self._server.serve_forever()  # type: ignore
+        finally:
+            await self.close()
+
+    async def close(self) -> None:
+        """
+        Stop listening and remove the socket.
+        """
+        server, self._server = self._server, None
+        if server is None:
+            return
+
+        server.close()
+        await server.wait_closed()
+        try:
+            self.socket_path.unlink()
+        except FileNotFoundError:
+            pass
+
+    async def dispatch(self, line: str) -> bool:
+        """
+        Dispatch a line of a client, in the client's context.
+
+        Returns
+        -------
+        bool
+            Whether the client asked to exit.
+        """
+        try:
+            await dispatch_line(line, commands=self.commands)
+        except EOFError:
+            return True
+        except SystemExit:
+            # The parser of the command exits on a usage error (after sending
+            # it to the client), or after sending the help of ``-h``.
+            pass
+        except Exception:
+            get_output().error_console.print_exception(width=None)
+        return False
+
+    async def _handle(
+        self, reader: asyncio.StreamReader, writer: asyncio.StreamWriter
+    ) -> None:
+        # Every connection is handled in its own task, so the session and the
+        # output that are set here are seen only by the lines (and the jobs) of
+        # this client.
+        self.clients += 1
+        session = Session()
+        set_session(session)
+        try:
+            frame = await read_frame(reader)
+            if frame is None:
+                return
+            set_output(client_output(writer, **parse_hello(frame)))
+            writer.write(encode_frame(done=True, workspace=session.current_workspace))
+
+            while True:
+                frame = await read_frame(reader)
+                if frame is None:
+                    break
+
+                is_exit = await self.dispatch(str(frame.get("line", "")))
+                await get_output().drain()
+                writer.write(
+                    encode_frame(
+                        done=True,
+                        workspace=session.current_workspace,
+                        exit=is_exit,
+                    )
+                )
+                await writer.drain()
+                if is_exit:
+                    break
+        except ValueError as err:
+            console.log(f"[red]Error[/red]: Invalid frame of a client: {err}")
+            if not writer.is_closing():
+                writer.write(encode_frame(error=str(err)))
+        except ConnectionError as err:
+            console.log(f"[red]Error[/red]: Client disconnected: {err!r}")
+        finally:
+            self.clients -= 1
+            writer.close()
+            try:
+                await writer.wait_closed()
+            except ConnectionError:
+                pass
+
+
+class DaemonClient:
+    """
+    A connection to a daemon.
+
+    Use :meth:`DaemonClient.connect` to create it.
+    """
+
+    def __init__(
+        self,
+        reader: asyncio.StreamReader,
+        writer: asyncio.StreamWriter,
+        stdout: Optional[IO[str]] = None,
+        stderr: Optional[IO[str]] = None,
+    ) -> None:
+        self.reader = reader
+        self.writer = writer
+        self.stdout = sys.stdout if stdout is None else stdout
+        self.stderr = sys.stderr if stderr is None else stderr
+        self.workspace = ""
+
+    @classmethod
+    async def connect(
+        cls,
+        socket_path: pathlib.Path,
+        output: str = "rich",
+        stdout: Optional[IO[str]] = None,
+        stderr: Optional[IO[str]] = None,
+    ) -> "DaemonClient":
+        """
+        Connect to a daemon.
+
+        Parameters
+        ----------
+        socket_path : pathlib.Path
+            Path of the daemon's Unix socket.
+        output : str, default "rich"
+            The output mode.
+        stdout, stderr : IO[str], optional
+            Where the output of the commands is written, default to
+            `sys.stdout` and `sys.stderr`.
+        """
+        reader, writer = await asyncio.open_unix_connection(
+            str(socket_path), limit=FRAME_LIMIT
+        )
+        client = cls(reader, writer, stdout=stdout, stderr=stderr)
+
+        is_terminal = client.stdout.isatty()
+        hello = {
+            "output": output,
+            "width": shutil.get_terminal_size().columns if is_terminal else None,
+            "color": is_terminal,
+        }
+        writer.write(encode_frame(hello=hello))
+        try:
+            await client._receive()
+        except BaseException:
+            await client.close()
+            raise
+        return client
+
+    async def _receive(self) -> bool:
+        """
+        Print the frames of the daemon, until a line is done.
+        """
+        while True:
+            frame = await read_frame(self.reader)
+            if frame is None:
+                raise ConnectionError("The daemon closed the connection")
+
+            if "out" in frame:
+                self.stdout.write(frame["out"])
+            elif "err" in frame:
+                self.stderr.write(frame["err"])
+            elif "error" in frame:
+                raise ConnectionError(f"The daemon refused: {frame['error']}")
+            elif frame.get("done"):
+                self.workspace = frame.get("workspace", self.workspace)
+                self.stdout.flush()
+                return bool(frame.get("exit"))
+
+    async def send(self, line: str) -> bool:
+        """
+        Execute a line on the daemon, and print its output.
+
+        Returns
+        -------
+        bool
+            Whether the line ended the session (like ``exit``).
+        """
+        self.writer.write(encode_frame(line=line))
+        return await self._receive()
+
+    async def close(self) -> None:
+        """
+        Close the connection.
+        """
+        self.writer.close()
+        try:
+            await self.writer.wait_closed()
+        except ConnectionError:
+            # The daemon closed it first.
+            pass
+
+
+async def run_client(
+    socket_path: pathlib.Path,
+    script: Optional[IO[str]] = None,
+    output: str = "rich",
+) -> None:  # pragma: no cover
+    """
+    Send lines to a daemon, from a script or from an interactive prompt.
+
+    Parameters
+    ----------
+    socket_path : pathlib.Path
+        Path of the daemon's Unix socket.
+    script : IO[str], optional
+        Send the lines of this file, instead of prompting for them.
+    output : str, default "rich"
+        The output mode.
+    """
+    client = await DaemonClient.connect(socket_path, output=output)
+    try:
+        if script is not None:
+            from _snadra.batch import read_lines
+
+            async for line in read_lines(script):
+                if not line.strip() or line.lstrip().startswith("#"):
+                    continue
+                if await client.send(line):
+                    break
+            return
+
+        from prompt_toolkit import PromptSession
+        from prompt_toolkit.patch_stdout import patch_stdout
+
+        prompt: "PromptSession[str]" = PromptSession()
+        while True:
+            try:
+                with patch_stdout():
+                    line = await prompt.prompt_async(f"({client.workspace}) snadra > ")
+            except KeyboardInterrupt:
+                continue
+            except EOFError:
+                break
+            if await client.send(line):
+                break
+    finally:
+        await client.close()
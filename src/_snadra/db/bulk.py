@@ -0,0 +1,463 @@
+"""
+Bulk import and export of workspaces.
+
+Both directions stream the rows in batches, so the memory usage does not
+depend on the number of workspaces. On PostgreSQL the rows are moved with
+the ``COPY`` protocol of asyncpg, on SQLite with batched ``executemany``.
+
+The imported files are read and parsed in a worker thread, see
+:func:`read_batches`, so the event loop keeps serving other work.
+"""
+import asyncio
+import csv
+import datetime
+import functools
+import itertools
+import json
+import threading
+from typing import (
+    IO,
+    TYPE_CHECKING,
+    Any,
+    AsyncGenerator,
+    Callable,
+    ContextManager,
+    Iterable,
+    Iterator,
+    List,
+    Optional,
+    Tuple,
+    TypeVar,
+)
+
+from sqlalchemy.dialects import sqlite
+from sqlalchemy.future import select
+
+from _snadra.db.cache import workspace_cache
+from _snadra.db.models import Workspace
+
+if TYPE_CHECKING:
+    import pathlib
+
+    from sqlalchemy.ext.asyncio.engine import AsyncEngine
+
+T = TypeVar("T")
+F = TypeVar("F")
+
+BATCH_SIZE = 5_000
+
+# Number of batches that are read ahead of the database
+PREFETCH_BATCHES = 2
+
+FORMATS = {
+    ".csv": "csv",
+    ".jsonl": "jsonl",
+}
+
+_IMPORT_TABLE = "_snadra_workspace_import"
+
+_CREATE_IMPORT_TABLE = (
+    f"CREATE TEMPORARY TABLE {_IMPORT_TABLE} (name TEXT, description TEXT)"
+    " ON COMMIT DROP"
+)
+
+_MERGE_IMPORT_TABLE = (
+    f"INSERT INTO {Workspace.__tablename__} (name, description)"
+    " SELECT DISTINCT ON (name) name, COALESCE(description, '')"
+    f" FROM {_IMPORT_TABLE} WHERE name IS NOT NULL"
+    " ON CONFLICT (name) DO NOTHING"
+)
+
+_EXPORT_COLUMNS = ["name", "description", "created_at", "updated_at"]
+
+# The exported timestamps are in UTC, with microseconds, whatever the backend:
+# the same format for :meth:`datetime.datetime.strftime`, and for ``to_char``
+# of PostgreSQL.
+_TIMESTAMP_FORMAT = "%Y-%m-%dT%H:%M:%S.%f+00:00"
+_PG_TIMESTAMP_FORMAT = 'YYYY-MM-DD"T"HH24:MI:SS.US"+00:00"'
+
+_EXPORT_QUERY = (
+    "SELECT name, description, "
+    + ", ".join(
+        f"to_char({column} AT TIME ZONE 'UTC', '{_PG_TIMESTAMP_FORMAT}') AS {column}"
+        for column in ["created_at", "updated_at"]
+    )
+    + f" FROM {Workspace.__tablename__} ORDER BY name"
+)
+
+
+def file_format(path: "pathlib.Path") -> str:
+    """
+    Get the format of a workspaces file from its suffix.
+
+    Parameters
+    ----------
+    path : pathlib.Path
+        Path of the file.
+
+    Returns
+    -------
+    str
+        Either ``"csv"`` or ``"jsonl"``.
+
+    Raises
+    ------
+    ValueError
+        If the suffix is not of a supported format.
+
+    Examples
+    --------
+    >>> import pathlib
+    >>> file_format(pathlib.Path("workspaces.jsonl"))
+    'jsonl'
+    """
+    try:
+        return FORMATS[path.suffix.lower()]
+    except KeyError:
+        supported = ", ".join(sorted(FORMATS))
+        raise ValueError(
+            f"Unsupported file format {repr(path.suffix)}, expected one of: {supported}"
+        ) from None
+
+
+def format_timestamp(value: Optional[datetime.datetime]) -> Optional[str]:
+    """
+    Format an exported timestamp, see :data:`_TIMESTAMP_FORMAT`.
+
+    Naive timestamps (like the ones of SQLite) are in UTC.
+
+    Examples
+    --------
+    >>> format_timestamp(datetime.datetime(2021, 7, 3, 12, 30))
+    '2021-07-03T12:30:00.000000+00:00'
+    >>> tz = datetime.timezone(datetime.timedelta(hours=2))
+    >>> format_timestamp(datetime.datetime(2021, 7, 3, 14, 30, tzinfo=tz))
+    '2021-07-03T12:30:00.000000+00:00'
+    """
+    if value is None:
+        return None
+    if value.tzinfo is not None:
+        value = value.astimezone(datetime.timezone.utc)
+    return value.strftime(_TIMESTAMP_FORMAT)
+
+
+def batched(iterable: Iterable[T], size: int) -> Iterator[List[T]]:
+    """
+    Split an iterable into lists of (at most) ``size`` items.
+
+    Examples
+    --------
+    >>> list(batched(range(5), 2))
+    [[0, 1], [2, 3], [4]]
+    """
+    iterator = iter(iterable)
+    while True:
+        batch = list(itertools.islice(iterator, size))
+        if not batch:
+            return
+        yield batch
+
+
+async def read_batches(
+    open_file: Callable[[], ContextManager[F]],
+    read: Callable[[F], Iterable[T]],
+    batch_size: int,
+    prefetch: int = PREFETCH_BATCHES,
+) -> AsyncGenerator[List[T], None]:
+    """
+    Read the records of a file in batches, in a worker thread.
+
+    A single worker thread opens the file, reads it, and closes it, and it
+    hands the batches over through a queue. It reads at most ``prefetch``
+    batches ahead of the consumer.
+
+    Parameters
+    ----------
+    open_file : Callable[[], ContextManager]
+        Opens the file, in the worker thread.
+        For example ``functools.partial(path.open, "rb")``.
+    read : Callable[[F], Iterable[T]]
+        Lazily reads the records of the open file, in the worker thread.
+    batch_size : int
+        Number of records in a batch.
+    prefetch : int, optional
+        Most batches that are read but not consumed yet.
+
+    Yields
+    ------
+    List[T]
+        The next batch of records.
+
+    Raises
+    ------
+    Exception
+        Anything that opening or reading the file raises.
+
+    Notes
+    -----
+    Call ``aclose()`` of the generator when the consumer stops early (like on
+    an error, or when it is cancelled): it stops the worker, and waits for it
+    to close the file.
+    """
+    loop = asyncio.get_running_loop()
+    batches: "asyncio.Queue[Optional[List[T]]]" = asyncio.Queue()
+    slots = threading.Semaphore(prefetch)
+    stop = threading.Event()
+
+    def work() -> None:
+        try:
+            with open_file() as file_obj:
+                for batch in batched(read(file_obj), batch_size):
+                    slots.acquire()
+                    if stop.is_set():
+                        return
+                    loop.call_soon_threadsafe(batches.put_nowait, batch)
+        finally:
+            loop.call_soon_threadsafe(batches.put_nowait, None)
+
+    worker = loop.run_in_executor(None, work)
+    try:
+        while True:
+            batch = await batches.get()
+            if batch is None:
+                break
+            slots.release()
+            yield batch
+        # Raises what the worker raised.
+        await worker
+    finally:
+        stop.set()
+        slots.release()
+        await asyncio.wait({worker})
+
+
+def _parse_records(file_obj: IO[str], fmt: str) -> Iterator[Tuple[int, Any]]:
+    if fmt == "csv":
+        reader = csv.DictReader(file_obj)
+        while True:
+            try:
+                record = next(reader)
+            except StopIteration:
+                return
+            except csv.Error as err:
+                # The line number of the DictReader is updated only on success.
+                raise ValueError(
+                    f"Invalid CSV on line {reader.reader.line_num}: {err}"
+                ) from None
+            yield reader.line_num, record
+
+    for line_number, line in enumerate(file_obj, start=1):
+        if not line.strip():
+            continue
+        try:
+            record = json.loads(line)
+        except ValueError as err:
+            raise ValueError(f"Invalid JSON on line {line_number}: {err}") from None
+        yield line_number, record
+
+
+def read_workspaces(file_obj: IO[str], fmt: str) -> Iterator[Tuple[str, str]]:
+    """
+    Lazily read workspaces from a file.
+
+    Parameters
+    ----------
+    file_obj : IO[str]
+        The file to read.
+        CSV files must have a header with a ``name`` column, and may have
+        a ``description`` column. JSONL files have an object per line, with the
+        same keys.
+    fmt : str
+        Format of the file, see :func:`file_format`.
+
+    Yields
+    ------
+    Tuple[str, str]
+        The name and the description of a workspace.
+
+    Raises
+    ------
+    ValueError
+        If the file is not valid, or a record has no name. The message names
+        the line of the record.
+    """
+    for line_number, record in _parse_records(file_obj, fmt):
+        if not isinstance(record, dict):
+            raise ValueError(f"The record on line {line_number} is not an object")
+        name = record.get("name")
+        description = record.get("description") or ""
+        if not name:
+            raise ValueError(f"The record on line {line_number} has no workspace name")
+        if not isinstance(name, str) or not isinstance(description, str):
+            raise ValueError(
+                f"The name and the description on line {line_number} must be strings"
+            )
+        yield name, description
+
+
+def _read_workspace_batches(
+    path: "pathlib.Path", fmt: str, batch_size: int
+) -> AsyncGenerator[List[Tuple[str, str]], None]:
+    return read_batches(
+        functools.partial(path.open, newline=""),
+        functools.partial(read_workspaces, fmt=fmt),
+        batch_size,
+    )
+
+
+async def import_workspaces(
+    path: "pathlib.Path",
+    *,
+    engine: "AsyncEngine",
+    batch_size: int = BATCH_SIZE,
+) -> int:
+    """
+    Add the workspaces from a file, skipping the ones that already exist.
+
+    Parameters
+    ----------
+    path : pathlib.Path
+        Path of a CSV or a JSONL file, see :func:`read_workspaces`.
+    engine : :class:`sqlalchemy.ext.asyncio.engine.AsyncEngine`
+        The database engine.
+    batch_size : int, optional
+        Number of records that are read and sent together.
+
+    Returns
+    -------
+    int
+        Number of workspaces that were added.
+
+    Notes
+    -----
+    On PostgreSQL each batch is copied into a temporary table, and merged from
+    there with ``INSERT ... ON CONFLICT DO NOTHING``. On SQLite each batch is
+    inserted with ``executemany`` of the same statement. The whole file is imported in a
+    single transaction.
+    """
+    fmt = file_format(path)
+    if engine.dialect.name == "postgresql":
+        added = await _copy_workspaces_in(path, fmt, engine, batch_size)
+    else:
+        added = await _insert_workspaces(path, fmt, engine, batch_size)
+
+    if added:
+        workspace_cache.clear()
+    return added
+
+
+async def _insert_workspaces(
+    path: "pathlib.Path", fmt: str, engine: "AsyncEngine", batch_size: int
+) -> int:
+    stmt = sqlite.insert(Workspace).on_conflict_do_nothing(
+        index_elements=[Workspace.name]
+    )
+    added = 0
+
+    async with engine.begin() as conn:
+        batches = _read_workspace_batches(path, fmt, batch_size)
+        try:
+            async for batch in batches:
+                result = await conn.execute(
+                    stmt,
+                    [
+                        {"name": name, "description": description}
+                        for name, description in batch
+                    ],
+                )
+                added += result.rowcount
+        finally:
+            await batches.aclose()
+
+    return added
+
+
+async def _copy_workspaces_in(
+    path: "pathlib.Path", fmt: str, engine: "AsyncEngine", batch_size: int
+) -> int:
+    added = 0
+
+    async with engine.connect() as conn:
+        raw_connection = await conn.get_raw_connection()
+        driver_connection = raw_connection.driver_connection
+
+        async with driver_connection.transaction():
+            await driver_connection.execute(_CREATE_IMPORT_TABLE)
+            batches = _read_workspace_batches(path, fmt, batch_size)
+            try:
+                async for batch in batches:
+                    await driver_connection.copy_records_to_table(
+                        _IMPORT_TABLE, records=batch, columns=["name", "description"]
+                    )
+                    status = await driver_connection.execute(_MERGE_IMPORT_TABLE)
+                    added += int(status.rsplit(" ", 1)[-1])
+                    await driver_connection.execute(f"TRUNCATE {_IMPORT_TABLE}")
+            finally:
+                await batches.aclose()
+
+    return added
+
+
+async def export_workspaces(
+    path: "pathlib.Path",
+    *,
+    engine: "AsyncEngine",
+    batch_size: int = BATCH_SIZE,
+) -> int:
+    """
+    Write all the workspaces to a file.
+
+    Parameters
+    ----------
+    path : pathlib.Path
+        Path of the CSV or JSONL file to write.
+    engine : :class:`sqlalchemy.ext.asyncio.engine.AsyncEngine`
+        The database engine.
+    batch_size : int, optional
+        Number of rows that are fetched together.
+
+    Returns
+    -------
+    int
+        Number of workspaces that were written.
+    """
+    fmt = file_format(path)
+
+    async with engine.connect() as conn:
+        if fmt == "csv" and engine.dialect.name == "postgresql":
+            raw_connection = await conn.get_raw_connection()
+            with path.open("wb") as binary_file_obj:
+                status = await raw_connection.driver_connection.copy_from_query(
+                    _EXPORT_QUERY, output=binary_file_obj, format="csv", header=True
+                )
+            return int(status.rsplit(" ", 1)[-1])
+
+        stmt = select(
+            Workspace.name,
+            Workspace.description,
+            Workspace.created_at,
+            Workspace.updated_at,
+        ).order_by(Workspace.name)
+        result = await conn.stream(stmt)
+
+        written = 0
+        with path.open("w", newline="") as file_obj:
+            if fmt == "csv":
+                writer = csv.DictWriter(file_obj, fieldnames=_EXPORT_COLUMNS)
+                writer.writeheader()
+
+            async for rows in result.partitions(batch_size):
+                for row in rows:
+                    record = {
+                        "name": row.name,
+                        "description": row.description,
+                        "created_at": format_timestamp(row.created_at),
+                        "updated_at": format_timestamp(row.updated_at),
+                    }
+                    if fmt == "csv":
+                        writer.writerow(record)
+                    else:
+                        file_obj.write(json.dumps(record) + "\n")
+                written += len(rows)
+
+    return written
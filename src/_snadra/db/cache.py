@@ -0,0 +1,12 @@
+"""
+Caches of database query results.
+
+Code that changes the cached tables is responsible for invalidating the
+relevant cache.
+"""
+from _snadra.cache import TTLCache
+
+WORKSPACE_CACHE_MAXSIZE = 1024
+WORKSPACE_CACHE_TTL = 60.0
+
+workspace_cache = TTLCache(maxsize=WORKSPACE_CACHE_MAXSIZE, ttl=WORKSPACE_CACHE_TTL)
@@ -1,17 +1,370 @@
-from sqlalchemy.ext.asyncio import AsyncSession, create_async_engine
-from sqlalchemy.orm import declarative_base, sessionmaker
-
-# TODO: Integrate with the config system
-__db_user = "snadra"
-__db_password = "snadra"
-__db_host = "127.0.0.1"
-__db_database = "snadra"
-engine = create_async_engine(
-    f"postgresql+asyncpg://{__db_user}:{__db_password}@{__db_host}/{__db_database}",
-    echo=False,
-    future=True,
-)
-
-
-async_session = sessionmaker(engine, expire_on_commit=False, class_=AsyncSession)
-Base = declarative_base()
+"""
+Database engine and sessions.
+
+The engine is created lazily, the first time it is needed, from the
+``[database]`` section of the configuration (of the current workspace).
+SQLAlchemy itself is only imported then, too. When that section changes,
+:func:`update_engine` migrates the new database, then replaces the engine,
+and the connections of the previous one are closed in the background.
+
+Two backends are supported: PostgreSQL (through asyncpg), and an embedded
+SQLite database (through aiosqlite), which needs no server.
+"""
+import asyncio
+import pathlib
+import time
+from typing import TYPE_CHECKING, Any, Dict, Mapping, Optional, Set
+
+from _snadra.config import get_config
+from _snadra.db.cache import workspace_cache
+from _snadra.stats import current_dispatch
+
+if TYPE_CHECKING:
+    from sqlalchemy.engine import URL
+    from sqlalchemy.ext.asyncio import AsyncSession
+    from sqlalchemy.ext.asyncio.engine import AsyncEngine
+    from sqlalchemy.orm import sessionmaker
+
+DRIVERS = {
+    "postgres": "postgresql+asyncpg",
+    "sqlite": "sqlite+aiosqlite",
+}
+
+SQLITE_MEMORY = ":memory:"
+
+# Set on every new SQLite connection.
+SQLITE_PRAGMAS = {
+    # Readers don't block the writer, and the writer doesn't block readers.
+    "journal_mode": "WAL",
+    # Safe with WAL, a commit doesn't wait for the disk.
+    "synchronous": "NORMAL",
+    "foreign_keys": "ON",
+    # Like PostgreSQL. Also lets ``name LIKE ?`` use the index on the column,
+    # when the bound pattern is a prefix (see
+    # :func:`_snadra.cmd.commands.workspace.prefix_pattern`).
+    "case_sensitive_like": "ON",
+    "temp_store": "MEMORY",
+    # In KiB when negative.
+    "cache_size": -16_000,
+    "mmap_size": 64 * 1024 * 1024,
+}
+
+_engine: Optional["AsyncEngine"] = None
+# The ``[database]`` section that the engine was created with
+_engine_config: Optional[Mapping[str, Any]] = None
+_async_session: Optional["sessionmaker"] = None
+# The engines that are being disposed of in the background
+_retired: Set["asyncio.Task[None]"] = set()
+
+
+def engine_url(database_config: Mapping[str, Any]) -> "URL":
+    """
+    Build the database URL.
+
+    Parameters
+    ----------
+    database_config : Mapping[str, Any]
+        The ``[database]`` section of the configuration.
+
+    Returns
+    -------
+    :class:`sqlalchemy.engine.URL`
+        URL of the database.
+
+    Raises
+    ------
+    ValueError
+        If the database type is not supported.
+    """
+    from sqlalchemy.engine import URL
+
+    db_type = database_config["type"]
+    try:
+        drivername = DRIVERS[db_type]
+    except KeyError:
+        raise ValueError(f"Unsupported database type: {repr(db_type)}") from None
+
+    if db_type == "sqlite":
+        path = database_config["path"]
+        if path != SQLITE_MEMORY:
+            path = str(pathlib.Path(path).expanduser())
+        return URL.create(drivername=drivername, database=path)
+
+    return URL.create(
+        drivername=drivername,
+        username=database_config["user"],
+        password=database_config["password"],
+        host=database_config["host"],
+        port=database_config["port"],
+        database=database_config["db"],
+    )
+
+
+def engine_options(database_config: Mapping[str, Any]) -> Dict[str, Any]:
+    """
+    Get the keyword arguments for creating the engine.
+
+    Parameters
+    ----------
+    database_config : Mapping[str, Any]
+        The ``[database]`` section of the configuration.
+
+    Returns
+    -------
+    Dict[str, Any]
+        Keyword arguments for :func:`sqlalchemy.ext.asyncio.create_async_engine`.
+    """
+    if database_config["type"] == "sqlite":
+        return _sqlite_engine_options(database_config)
+
+    return {
+        "echo": False,
+        "future": True,
+        "pool_size": database_config["pool_size"],
+        "max_overflow": database_config["max_overflow"],
+        "pool_pre_ping": database_config["pool_pre_ping"],
+        "pool_recycle": database_config["pool_recycle"],
+        "pool_timeout": database_config["pool_timeout"],
+        "connect_args": {
+            "statement_cache_size": database_config["statement_cache_size"],
+            "command_timeout": database_config["command_timeout"],
+            "timeout": database_config["connect_timeout"],
+        },
+    }
+
+
+def _sqlite_engine_options(database_config: Mapping[str, Any]) -> Dict[str, Any]:
+    options: Dict[str, Any] = {
+        "echo": False,
+        "future": True,
+        "connect_args": {"timeout": database_config["connect_timeout"]},
+    }
+    if database_config["path"] == SQLITE_MEMORY:
+        # The dialect keeps a single connection, or the database would be lost.
+        return options
+
+    from sqlalchemy.pool import AsyncAdaptedQueuePool
+
+    # Opening a file and setting the pragmas on every checkout (the default
+    # of the dialect is to not pool connections to files) is not free.
+    options.update(
+        poolclass=AsyncAdaptedQueuePool,
+        pool_size=database_config["pool_size"],
+        max_overflow=database_config["max_overflow"],
+        pool_pre_ping=database_config["pool_pre_ping"],
+        pool_recycle=database_config["pool_recycle"],
+        pool_timeout=database_config["pool_timeout"],
+    )
+    return options
+
+
+def get_engine(database_config: Optional[Mapping[str, Any]] = None) -> "AsyncEngine":
+    """
+    Get the database engine, creating it on the first call.
+
+    Parameters
+    ----------
+    database_config : Mapping[str, Any], optional
+        The ``[database]`` section of the configuration to create the engine
+        with. If not specified, it is read from the configuration of the
+        current workspace, see :func:`_snadra.config.get_config`.
+        Ignored if the engine was already created.
+
+    Returns
+    -------
+    :class:`sqlalchemy.ext.asyncio.engine.AsyncEngine`
+        The database engine.
+
+    See Also
+    --------
+    update_engine
+    """
+    global _engine, _engine_config
+
+    if _engine is None:
+        if database_config is None:
+            database_config = get_config()["database"]
+        _engine = _create_engine(database_config)
+        _engine_config = database_config
+
+    return _engine
+
+
+def _create_engine(database_config: Mapping[str, Any]) -> "AsyncEngine":
+    from sqlalchemy.ext.asyncio import create_async_engine
+
+    url = engine_url(database_config)
+    if url.get_backend_name() == "sqlite" and url.database != SQLITE_MEMORY:
+        pathlib.Path(url.database).parent.mkdir(parents=True, exist_ok=True)
+
+    engine = create_async_engine(url, **engine_options(database_config))
+    if url.get_backend_name() == "sqlite":
+        configure_sqlite(engine)
+    instrument_engine(engine)
+    return engine
+
+
+async def update_engine(database_config: Optional[Mapping[str, Any]] = None) -> bool:
+    """
+    Replace the engine, if the ``[database]`` section changed since it was
+    created.
+
+    The new database is prepared (migrated, with its default rows) before it
+    replaces the engine, so the commands never see a database without the
+    schema. The workspace cache is cleared, and the connections of the
+    previous engine are closed in the background.
+
+    Parameters
+    ----------
+    database_config : Mapping[str, Any], optional
+        The new ``[database]`` section. If not specified, it is read from the
+        configuration of the current workspace.
+
+    Returns
+    -------
+    bool
+        Whether the engine was replaced, `False` if the section did not change
+        or if the engine was not created yet.
+
+    Raises
+    ------
+    Exception
+        Anything that connecting to the new database, or migrating it, raises.
+        The previous engine is kept then.
+    """
+    global _engine, _engine_config, _async_session
+
+    if _engine is None:
+        return False
+    if database_config is None:
+        database_config = get_config()["database"]
+    if database_config == _engine_config:
+        return False
+
+    from sqlalchemy.ext.asyncio import AsyncSession
+    from sqlalchemy.orm import sessionmaker
+
+    from _snadra.db.utils import insert_default_rows, start_db
+
+    engine = _create_engine(database_config)
+    try:
+        await start_db(engine=engine)
+        await insert_default_rows(
+            session=sessionmaker(engine, expire_on_commit=False, class_=AsyncSession)
+        )
+    except BaseException:
+        await engine.dispose()
+        raise
+
+    previous, _engine, _engine_config, _async_session = (
+        _engine,
+        engine,
+        database_config,
+        None,
+    )
+    # The cached query results are the previous database's.
+    workspace_cache.clear()
+    task = asyncio.get_running_loop().create_task(previous.dispose())
+    _retired.add(task)
+    task.add_done_callback(_retired.discard)
+    return True
+
+
+def configure_sqlite(engine: "AsyncEngine") -> None:
+    """
+    Set :data:`SQLITE_PRAGMAS` on every new connection of a SQLite engine.
+
+    Parameters
+    ----------
+    engine : :class:`sqlalchemy.ext.asyncio.engine.AsyncEngine`
+        The engine to configure.
+    """
+    from sqlalchemy import event
+
+    event.listen(engine.sync_engine, "connect", _set_sqlite_pragmas)
+
+
+def _set_sqlite_pragmas(dbapi_connection, connection_record):
+    cursor = dbapi_connection.cursor()
+    try:
+        for name, value in SQLITE_PRAGMAS.items():
+            cursor.execute(f"PRAGMA {name} = {value}")
+    finally:
+        cursor.close()
+
+
+def instrument_engine(engine: "AsyncEngine") -> None:
+    """
+    Attribute the queries of an engine to the dispatch that made them.
+
+    Parameters
+    ----------
+    engine : :class:`sqlalchemy.ext.asyncio.engine.AsyncEngine`
+        The engine to instrument.
+
+    Notes
+    -----
+    Only statements that go through SQLAlchemy are counted, work that is done
+    directly on the driver connection (like ``COPY``) is not.
+
+    See Also
+    --------
+    _snadra.stats.current_dispatch
+    """
+    from sqlalchemy import event
+
+    event.listen(engine.sync_engine, "before_cursor_execute", _before_cursor_execute)
+    event.listen(engine.sync_engine, "after_cursor_execute", _after_cursor_execute)
+
+
+def _before_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+    conn.info.setdefault("query_start_time", []).append(time.perf_counter())
+
+
+def _after_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+    start = conn.info["query_start_time"].pop()
+    metrics = current_dispatch()
+    if metrics is not None:
+        metrics.db_queries += 1
+        metrics.db_seconds += time.perf_counter() - start
+
+
+def async_session() -> "AsyncSession":
+    """
+    Create a new database session.
+
+    Returns
+    -------
+    :class:`sqlalchemy.ext.asyncio.AsyncSession`
+        A new session, bound to the engine from :func:`get_engine`.
+    """
+    global _async_session
+
+    if _async_session is None:
+        from sqlalchemy.ext.asyncio import AsyncSession
+        from sqlalchemy.orm import sessionmaker
+
+        _async_session = sessionmaker(
+            get_engine(), expire_on_commit=False, class_=AsyncSession
+        )
+
+    return _async_session()
+
+
+async def dispose_engine() -> None:
+    """
+    Close all the connections of the engine, if it was ever created.
+
+    The next call to :func:`get_engine` creates a new engine. The workspace
+    cache is cleared, too.
+    """
+    global _engine, _engine_config, _async_session
+
+    if _retired:
+        await asyncio.gather(*_retired)
+    if _engine is None:
+        return
+
+    engine, _engine, _engine_config, _async_session = _engine, None, None, None
+    workspace_cache.clear()
+    await engine.dispose()
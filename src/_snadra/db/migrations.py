@@ -0,0 +1,338 @@
+"""
+Versioned, incremental schema migrations.
+
+Every migration has a version number, the versions that were applied are
+recorded in the ``schema_version`` table. On startup only the migrations with
+a version higher than the recorded one are applied.
+
+Migrations must be idempotent, so running one against a schema that already
+has its changes (for example a database that was created by an older snadra,
+before the version table existed) is harmless.
+
+Every migration declares the tables it creates as they were when it was
+written, never through the ORM models: a later change to a model must come
+with a new migration, and must not change what the older ones create.
+"""
+from typing import TYPE_CHECKING, Callable, List, NamedTuple
+
+from sqlalchemy import (
+    Column,
+    DateTime,
+    ForeignKey,
+    Index,
+    Integer,
+    MetaData,
+    String,
+    Table,
+    Text,
+    UniqueConstraint,
+    func,
+    insert,
+    text,
+)
+from sqlalchemy.exc import DBAPIError, IntegrityError
+from sqlalchemy.future import select
+
+from _snadra.db.models.base import Base
+
+if TYPE_CHECKING:
+    from sqlalchemy.engine import Connection
+    from sqlalchemy.ext.asyncio.engine import AsyncEngine
+
+
+class Migration(NamedTuple):
+    version: int
+    description: str
+    upgrade: Callable[["Connection"], None]
+
+
+MIGRATIONS: List[Migration] = []
+
+# Key of the PostgreSQL advisory lock that serializes the migrations of
+# several processes, which start on the same database at the same time.
+_LOCK_KEY = 0x736E61647261
+
+_schema_version = Table(
+    "schema_version",
+    MetaData(),
+    Column("version", Integer, primary_key=True, autoincrement=False, nullable=False),
+    Column("description", Text, nullable=False, server_default=""),
+    Column(
+        "applied_at", DateTime(timezone=True), server_default=func.now(), nullable=False
+    ),
+)
+
+
+def migration(
+    version: int, description: str
+) -> Callable[[Callable[["Connection"], None]], Callable[["Connection"], None]]:
+    """
+    Register a function as a migration.
+
+    Parameters
+    ----------
+    version : int
+        Version of the schema after the migration is applied.
+        Must be higher than the version of every registered migration.
+    description : str
+        What the migration does.
+
+    Returns
+    -------
+    Callable
+        Decorator that registers the migration.
+    """
+
+    def decorator(
+        upgrade: Callable[["Connection"], None]
+    ) -> Callable[["Connection"], None]:
+        if MIGRATIONS and MIGRATIONS[-1].version >= version:
+            raise ValueError(f"Migration version {version} is out of order")
+        MIGRATIONS.append(Migration(version, description, upgrade))
+        return upgrade
+
+    return decorator
+
+
+def latest_version() -> int:
+    """
+    Get the schema version that the code expects.
+
+    Returns
+    -------
+    int
+        Version of the last migration.
+    """
+    return MIGRATIONS[-1].version if MIGRATIONS else 0
+
+
+def current_version(connection: "Connection") -> int:
+    """
+    Get the schema version of the database.
+
+    Parameters
+    ----------
+    connection : :class:`sqlalchemy.engine.Connection`
+        Connection to the database.
+
+    Returns
+    -------
+    int
+        The highest applied version, ``0`` for an empty database.
+    """
+    _schema_version.create(connection, checkfirst=True)
+    version = connection.scalar(select(func.max(_schema_version.c.version)))
+    return version or 0
+
+
+def upgrade(connection: "Connection") -> List[int]:
+    """
+    Apply the pending migrations.
+
+    Parameters
+    ----------
+    connection : :class:`sqlalchemy.engine.Connection`
+        Connection to the database, the caller is responsible for the transaction.
+
+    Returns
+    -------
+    List[int]
+        Versions of the applied migrations.
+
+    Notes
+    -----
+    On PostgreSQL, a transaction level advisory lock is taken first, so a
+    process that migrates the database at the same time waits, and then finds
+    the schema up to date.
+    """
+    if connection.dialect.name == "postgresql":
+        connection.execute(
+            text("SELECT pg_advisory_xact_lock(:key)"), {"key": _LOCK_KEY}
+        )
+    version = current_version(connection)
+
+    applied = []
+    for pending in MIGRATIONS:
+        if pending.version <= version:
+            continue
+        pending.upgrade(connection)
+        connection.execute(
+            insert(_schema_version).values(
+                version=pending.version, description=pending.description
+            )
+        )
+        applied.append(pending.version)
+
+    return applied
+
+
+async def migrate(engine: "AsyncEngine") -> List[int]:
+    """
+    Bring the database schema up to date.
+
+    When the schema is already up to date, this costs a single query.
+
+    Parameters
+    ----------
+    engine : :class:`sqlalchemy.ext.asyncio.engine.AsyncEngine`
+        The database engine.
+
+    Returns
+    -------
+    List[int]
+        Versions of the applied migrations.
+
+    Notes
+    -----
+    When another process applies the same migrations at the same time (which
+    the advisory lock prevents only on PostgreSQL), recording their versions
+    conflicts. The version is then checked again, and it is not an error if
+    the other process brought the schema up to date.
+    """
+    if await _schema_version_of(engine) >= latest_version():
+        return []
+
+    try:
+        async with engine.begin() as conn:
+            return await conn.run_sync(upgrade)
+    except IntegrityError:
+        if await _schema_version_of(engine) >= latest_version():
+            return []
+        raise
+
+
+async def _schema_version_of(engine: "AsyncEngine") -> int:
+    try:
+        async with engine.connect() as conn:
+            version = await conn.scalar(select(func.max(_schema_version.c.version)))
+    except DBAPIError:
+        # The version table does not exist yet.
+        version = None
+    return version or 0
+
+
+async def reset(engine: "AsyncEngine") -> List[int]:
+    """
+    Drop every table, and recreate the schema from scratch.
+
+    Parameters
+    ----------
+    engine : :class:`sqlalchemy.ext.asyncio.engine.AsyncEngine`
+        The database engine.
+
+    Returns
+    -------
+    List[int]
+        Versions of the applied migrations.
+
+    Warnings
+    --------
+    All the data in the database is lost.
+    """
+    async with engine.begin() as conn:
+        await conn.run_sync(Base.metadata.drop_all)
+
+    return await migrate(engine)
+
+
+@migration(1, "Create the workspaces table")
+def _create_workspaces(connection: "Connection") -> None:
+    workspaces = Table(
+        "workspaces",
+        MetaData(),
+        Column("name", Text, primary_key=True, nullable=False),
+        Column("description", String(length=4096), nullable=False, server_default=""),
+        Column(
+            "created_at",
+            DateTime(timezone=True),
+            server_default=func.now(),
+            nullable=False,
+        ),
+        Column("updated_at", DateTime(timezone=True), nullable=True),
+    )
+    workspaces.create(connection, checkfirst=True)
+
+
+@migration(2, "Index the workspaces for paginated listing")
+def _index_workspaces(connection: "Connection") -> None:
+    workspaces = Table(
+        "workspaces",
+        MetaData(),
+        Column("name", Text, primary_key=True),
+        Column("created_at", DateTime(timezone=True)),
+    )
+    indexes = [
+        Index(
+            "ix_workspaces_name_prefix",
+            workspaces.c.name,
+            postgresql_ops={"name": "text_pattern_ops"},
+        ),
+        Index("ix_workspaces_created_at", workspaces.c.created_at),
+    ]
+    for index in indexes:
+        index.create(connection, checkfirst=True)
+
+
+@migration(3, "Create the hosts and services tables")
+def _create_hosts_and_services(connection: "Connection") -> None:
+    metadata = MetaData()
+    # Only referenced by the foreign keys, it is not created.
+    Table("workspaces", metadata, Column("name", Text, primary_key=True))
+    hosts = Table(
+        "hosts",
+        metadata,
+        Column("id", Integer, primary_key=True),
+        Column(
+            "workspace",
+            Text,
+            ForeignKey("workspaces.name", ondelete="CASCADE", onupdate="CASCADE"),
+            nullable=False,
+        ),
+        Column("address", Text, nullable=False),
+        Column("mac", Text, nullable=True),
+        Column("name", Text, nullable=True),
+        Column("os_name", Text, nullable=True),
+        Column("state", Text, nullable=False, server_default="up"),
+        Column(
+            "created_at",
+            DateTime(timezone=True),
+            server_default=func.now(),
+            nullable=False,
+        ),
+        Column("updated_at", DateTime(timezone=True), nullable=True),
+        UniqueConstraint("workspace", "address", name="uq_hosts_workspace_address"),
+        Index("ix_hosts_workspace_name", "workspace", "name"),
+    )
+    services = Table(
+        "services",
+        metadata,
+        Column("id", Integer, primary_key=True),
+        Column(
+            "host_id",
+            Integer,
+            ForeignKey("hosts.id", ondelete="CASCADE"),
+            nullable=False,
+        ),
+        Column("protocol", Text, nullable=False),
+        Column("port", Integer, nullable=False),
+        Column("state", Text, nullable=False, server_default="open"),
+        Column("name", Text, nullable=True),
+        Column("product", Text, nullable=True),
+        Column("version", Text, nullable=True),
+        Column(
+            "created_at",
+            DateTime(timezone=True),
+            server_default=func.now(),
+            nullable=False,
+        ),
+        Column("updated_at", DateTime(timezone=True), nullable=True),
+        UniqueConstraint(
+            "host_id", "protocol", "port", name="uq_services_host_protocol_port"
+        ),
+        Index("ix_services_port_protocol", "port", "protocol"),
+        Index("ix_services_name", "name"),
+    )
+    for table in (hosts, services):
+        table.create(connection, checkfirst=True)
+        for index in table.indexes:
+            index.create(connection, checkfirst=True)
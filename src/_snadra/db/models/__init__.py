@@ -1,3 +1,11 @@
+from _snadra.db.models.host import Host
+from _snadra.db.models.schema_version import SchemaVersion
+from _snadra.db.models.service import Service
 from _snadra.db.models.workspace import Workspace
 
-__all__ = ["Workspace"]
+__all__ = [
+    "Host",
+    "SchemaVersion",
+    "Service",
+    "Workspace",
+]
@@ -0,0 +1,40 @@
+from sqlalchemy import (
+    Column,
+    DateTime,
+    ForeignKey,
+    Index,
+    Integer,
+    Text,
+    UniqueConstraint,
+)
+from sqlalchemy.sql import func
+
+from _snadra.db.models.base import Base
+
+
+class Host(Base):  # type: ignore
+    __tablename__ = "hosts"
+
+    id = Column(Integer, primary_key=True)
+    workspace = Column(
+        Text,
+        ForeignKey("workspaces.name", ondelete="CASCADE", onupdate="CASCADE"),
+        nullable=False,
+    )
+    address = Column(Text, nullable=False)
+    mac = Column(Text, nullable=True)
+    name = Column(Text, nullable=True)
+    os_name = Column(Text, nullable=True)
+    state = Column(Text, nullable=False, server_default="up")
+    created_at = Column(
+        DateTime(timezone=True), server_default=func.now(), nullable=False
+    )
+    updated_at = Column(DateTime(timezone=True), onupdate=func.now(), nullable=True)
+
+    __mapper_args__ = {"eager_defaults": True}
+    __table_args__ = (
+        # The upserts of the imports conflict on it, and it serves the lookups
+        # (and the listing) of the hosts of a workspace.
+        UniqueConstraint("workspace", "address", name="uq_hosts_workspace_address"),
+        Index("ix_hosts_workspace_name", "workspace", "name"),
+    )
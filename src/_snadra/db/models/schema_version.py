@@ -0,0 +1,14 @@
+from sqlalchemy import Column, DateTime, Integer, Text
+from sqlalchemy.sql import func
+
+from _snadra.db.models.base import Base
+
+
+class SchemaVersion(Base):  # type: ignore
+    __tablename__ = "schema_version"
+
+    version = Column(Integer, primary_key=True, autoincrement=False, nullable=False)
+    description = Column(Text, nullable=False, server_default="")
+    applied_at = Column(
+        DateTime(timezone=True), server_default=func.now(), nullable=False
+    )
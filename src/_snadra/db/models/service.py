@@ -0,0 +1,43 @@
+from sqlalchemy import (
+    Column,
+    DateTime,
+    ForeignKey,
+    Index,
+    Integer,
+    Text,
+    UniqueConstraint,
+)
+from sqlalchemy.sql import func
+
+from _snadra.db.models.base import Base
+
+
+class Service(Base):  # type: ignore
+    __tablename__ = "services"
+
+    id = Column(Integer, primary_key=True)
+    host_id = Column(
+        Integer, ForeignKey("hosts.id", ondelete="CASCADE"), nullable=False
+    )
+    protocol = Column(Text, nullable=False)
+    port = Column(Integer, nullable=False)
+    state = Column(Text, nullable=False, server_default="open")
+    name = Column(Text, nullable=True)
+    product = Column(Text, nullable=True)
+    version = Column(Text, nullable=True)
+    created_at = Column(
+        DateTime(timezone=True), server_default=func.now(), nullable=False
+    )
+    updated_at = Column(DateTime(timezone=True), onupdate=func.now(), nullable=True)
+
+    __mapper_args__ = {"eager_defaults": True}
+    __table_args__ = (
+        # The upserts of the imports conflict on it, and it serves the lookups
+        # of the services of a host.
+        UniqueConstraint(
+            "host_id", "protocol", "port", name="uq_services_host_protocol_port"
+        ),
+        # Finding the hosts that run a service (like every open 445/tcp).
+        Index("ix_services_port_protocol", "port", "protocol"),
+        Index("ix_services_name", "name"),
+    )
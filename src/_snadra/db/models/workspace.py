@@ -1,7 +1,7 @@
-from sqlalchemy import Column, DateTime, String, Text
+from sqlalchemy import Column, DateTime, Index, String, Text
 from sqlalchemy.sql import func
 
-from _snadra.db.config import Base
+from _snadra.db.models.base import Base
 
 
 class Workspace(Base):  # type: ignore
@@ -15,3 +15,14 @@ class Workspace(Base):  # type: ignore
     updated_at = Column(DateTime(timezone=True), onupdate=func.now(), nullable=True)
 
     __mapper_args__ = {"eager_defaults": True}
+    __table_args__ = (
+        # Prefix filtering (``name LIKE ?``, with a bound ``'prefix%'``) on
+        # PostgreSQL can use an index only if it is built with the pattern
+        # operators.
+        Index(
+            "ix_workspaces_name_prefix",
+            "name",
+            postgresql_ops={"name": "text_pattern_ops"},
+        ),
+        Index("ix_workspaces_created_at", "created_at"),
+    )
@@ -0,0 +1,295 @@
+"""
+Import the hosts and the services of Nmap XML results.
+
+The XML file is parsed incrementally, a ``<host>`` element at a time, and every
+element is dropped once it is read, so the memory usage does not depend on the
+size of the scan. The hosts are upserted in batches with ``INSERT ... ON
+CONFLICT DO UPDATE``, followed by the services of the batch.
+"""
+from typing import IO, TYPE_CHECKING, Dict, Iterator, List, NamedTuple, Optional
+from xml.etree import ElementTree
+
+from sqlalchemy import func
+from sqlalchemy.future import select
+
+from _snadra.db.bulk import BATCH_SIZE, batched, read_batches
+from _snadra.db.models import Host, Service
+from _snadra.db.utils import _INSERTS
+
+if TYPE_CHECKING:
+    import pathlib
+
+    from sqlalchemy.ext.asyncio import AsyncConnection
+    from sqlalchemy.ext.asyncio.engine import AsyncEngine
+
+# Number of addresses that are looked up together, well below the limit of the
+# parameters of a statement (32766 on SQLite, 32767 on PostgreSQL). The upserts
+# are sent with executemany, a row of parameters at a time.
+LOOKUP_SIZE = 5_000
+
+
+class NmapService(NamedTuple):
+    protocol: str
+    port: int
+    state: str
+    name: Optional[str] = None
+    product: Optional[str] = None
+    version: Optional[str] = None
+
+
+class NmapHost(NamedTuple):
+    address: str
+    state: str
+    mac: Optional[str] = None
+    name: Optional[str] = None
+    os_name: Optional[str] = None
+    services: List[NmapService] = []
+
+
+class ImportSummary(NamedTuple):
+    hosts: int
+    services: int
+
+
+def parse_host(element: ElementTree.Element) -> Optional[NmapHost]:
+    """
+    Read a ``<host>`` element.
+
+    Parameters
+    ----------
+    element : :class:`xml.etree.ElementTree.Element`
+        The element of the host.
+
+    Returns
+    -------
+    Optional[NmapHost]
+        The host, or `None` if it has no IP address.
+
+    Examples
+    --------
+    >>> element = ElementTree.fromstring(
+    ...     '<host><status state="up"/><address addr="10.0.0.1" addrtype="ipv4"/>'
+    ...     '<ports><port protocol="tcp" portid="22"><state state="open"/>'
+    ...     '<service name="ssh" product="OpenSSH" version="9.6"/></port></ports>'
+    ...     '</host>'
+    ... )
+    >>> host = parse_host(element)
+    >>> host.address, host.state
+    ('10.0.0.1', 'up')
+    >>> [(service.port, service.name, service.version) for service in host.services]
+    [(22, 'ssh', '9.6')]
+    """
+    address = mac = None
+    for address_element in element.iterfind("address"):
+        if address_element.get("addrtype") == "mac":
+            mac = address_element.get("addr")
+        elif address is None:
+            address = address_element.get("addr")
+    if address is None:
+        return None
+
+    status = element.find("status")
+    state = "unknown" if status is None else status.get("state", "unknown")
+
+    # Prefer the name that the user scanned, over the reverse DNS one.
+    names = {
+        hostname.get("type"): hostname.get("name")
+        for hostname in element.iterfind("hostnames/hostname")
+    }
+    name = names.get("user") or next(iter(names.values()), None)
+
+    osmatch = element.find("os/osmatch")
+    os_name = None if osmatch is None else osmatch.get("name")
+
+    services = []
+    for port in element.iterfind("ports/port"):
+        port_state = port.find("state")
+        service = port.find("service")
+        if service is None:
+            service = ElementTree.Element("service")
+        services.append(
+            NmapService(
+                protocol=port.get("protocol", "tcp"),
+                port=int(port.get("portid", 0)),
+                state="unknown"
+                if port_state is None
+                else port_state.get("state", "unknown"),
+                name=service.get("name"),
+                product=service.get("product"),
+                version=service.get("version"),
+            )
+        )
+
+    return NmapHost(
+        address=address,
+        state=state,
+        mac=mac,
+        name=name,
+        os_name=os_name,
+        services=services,
+    )
+
+
+def read_nmap_xml(file_obj: IO[bytes], only_up: bool = True) -> Iterator[NmapHost]:
+    """
+    Lazily read the hosts of an Nmap XML file.
+
+    Parameters
+    ----------
+    file_obj : IO[bytes]
+        The output of ``nmap -oX``.
+    only_up : bool, default True
+        Skip the hosts that are not up (which are reported with ``-v``).
+
+    Yields
+    ------
+    NmapHost
+        A host, with its services.
+
+    Raises
+    ------
+    ValueError
+        If the file is not valid XML.
+    """
+    root = None
+    try:
+        for event, element in ElementTree.iterparse(file_obj, events=("start", "end")):
+            if root is None:
+                root = element
+            if event != "end" or element.tag != "host":
+                continue
+
+            host = parse_host(element)
+            # The hosts are children of the root, which would otherwise keep
+            # all of them.
+            element.clear()
+            root.clear()
+            if host is not None and (host.state == "up" or not only_up):
+                yield host
+    except ElementTree.ParseError as err:
+        raise ValueError(f"Invalid Nmap XML: {err}") from None
+
+
+async def import_nmap(
+    path: "pathlib.Path",
+    *,
+    workspace: str,
+    engine: "AsyncEngine",
+    batch_size: int = BATCH_SIZE,
+) -> ImportSummary:
+    """
+    Add (or update) the hosts and the services of Nmap XML results.
+
+    Parameters
+    ----------
+    path : pathlib.Path
+        Path of the output of ``nmap -oX``.
+    workspace : str
+        Name of the workspace to add the hosts to.
+    engine : :class:`sqlalchemy.ext.asyncio.engine.AsyncEngine`
+        The database engine.
+    batch_size : int, optional
+        Number of hosts that are read and sent together.
+
+    Returns
+    -------
+    ImportSummary
+        Number of hosts and of services that were imported.
+
+    Notes
+    -----
+    A host that is already in the workspace (by its address) is updated, the
+    values that the scan does not report (like its name) are kept. The whole
+    file is imported in a single transaction.
+
+    The file is parsed in a worker thread, see
+    :func:`_snadra.db.bulk.read_batches`, so the event loop keeps serving other
+    work while a large file is imported.
+    """
+    hosts = services = 0
+
+    async with engine.begin() as conn:
+        batches = read_batches(lambda: path.open("rb"), read_nmap_xml, batch_size)
+        try:
+            async for batch in batches:
+                hosts_count, services_count = await _upsert_batch(
+                    conn, workspace, batch
+                )
+                hosts += hosts_count
+                services += services_count
+        finally:
+            await batches.aclose()
+
+    return ImportSummary(hosts, services)
+
+
+async def _upsert_batch(
+    conn: "AsyncConnection", workspace: str, batch: List[NmapHost]
+) -> ImportSummary:
+    insert = _INSERTS[conn.dialect.name]
+    # A host that is reported twice in a batch is upserted once, with its last
+    # report.
+    by_address: Dict[str, NmapHost] = {host.address: host for host in batch}
+
+    host_stmt = insert(Host)
+    host_stmt = host_stmt.on_conflict_do_update(
+        index_elements=[Host.workspace, Host.address],
+        set_={
+            "state": host_stmt.excluded.state,
+            "mac": func.coalesce(host_stmt.excluded.mac, Host.mac),
+            "name": func.coalesce(host_stmt.excluded.name, Host.name),
+            "os_name": func.coalesce(host_stmt.excluded.os_name, Host.os_name),
+            "updated_at": func.now(),
+        },
+    )
+    await conn.execute(
+        host_stmt,
+        [
+            {
+                "workspace": workspace,
+                "address": host.address,
+                "state": host.state,
+                "mac": host.mac,
+                "name": host.name,
+                "os_name": host.os_name,
+            }
+            for host in by_address.values()
+        ],
+    )
+
+    host_ids: Dict[str, int] = {}
+    for addresses in batched(by_address, LOOKUP_SIZE):
+        result = await conn.execute(
+            select(Host.address, Host.id).where(
+                Host.workspace == workspace, Host.address.in_(addresses)
+            )
+        )
+        host_ids.update(result.all())
+
+    service_rows = {
+        (host_ids[host.address], service.protocol, service.port): {
+            "host_id": host_ids[host.address],
+            **service._asdict(),
+        }
+        for host in by_address.values()
+        for service in host.services
+    }
+    if service_rows:
+        service_stmt = insert(Service)
+        service_stmt = service_stmt.on_conflict_do_update(
+            index_elements=[Service.host_id, Service.protocol, Service.port],
+            set_={
+                "state": service_stmt.excluded.state,
+                "name": func.coalesce(service_stmt.excluded.name, Service.name),
+                "product": func.coalesce(
+                    service_stmt.excluded.product, Service.product
+                ),
+                "version": func.coalesce(
+                    service_stmt.excluded.version, Service.version
+                ),
+                "updated_at": func.now(),
+            },
+        )
+        await conn.execute(service_stmt, list(service_rows.values()))
+
+    return ImportSummary(len(by_address), len(service_rows))
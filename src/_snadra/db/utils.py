@@ -1,34 +1,117 @@
-from typing import TYPE_CHECKING
+from typing import TYPE_CHECKING, Callable, Optional
 
-from sqlalchemy.future import select
+from sqlalchemy import delete
+from sqlalchemy.dialects import postgresql, sqlite
 
 from _snadra.cmd.utils import console
-from _snadra.db.config import Base, async_session
+from _snadra.db.cache import workspace_cache
+from _snadra.db.config import async_session
+from _snadra.db.migrations import migrate, reset
 from _snadra.db.models import Workspace
 
 if TYPE_CHECKING:
     from sqlalchemy.ext.asyncio import AsyncSession
     from sqlalchemy.ext.asyncio.engine import AsyncEngine
+    from sqlalchemy.sql.dml import Delete, Insert
 
+# ``INSERT ... ON CONFLICT`` constructs, per dialect name
+_INSERTS = {
+    "postgresql": postgresql.insert,
+    "sqlite": sqlite.insert,
+}
 
-async def start_db(engine: "AsyncEngine"):
-    async with engine.begin() as conn:
-        await conn.run_sync(Base.metadata.drop_all)
-        await conn.run_sync(Base.metadata.create_all)
 
+async def start_db(engine: "AsyncEngine", *, reset_db: bool = False) -> None:
+    """
+    Prepare the database schema.
 
-async def insert_default_rows(session: "AsyncSession") -> None:
-    async with async_session() as session:
-        async with session.begin():
-            stmt = select(Workspace).where(Workspace.name == "default")
-            result = await session.execute(stmt)
-            workspace = result.scalar_one_or_none()
+    Parameters
+    ----------
+    engine : :class:`sqlalchemy.ext.asyncio.engine.AsyncEngine`
+        The database engine.
+    reset_db : bool, default False
+        Drop all the tables (and their data!) before creating the schema.
+    """
+    if reset_db:
+        applied = await reset(engine)
+    else:
+        applied = await migrate(engine)
 
-            if not workspace:
-                default_workspace = Workspace(
-                    name="default", description="Default workspace"
-                )
-                session.add(default_workspace)
-                await session.commit()
-            else:
-                console.log("Found default workspace, skipping")
+    if applied:
+        console.log(f"Applied database migrations: {applied}")
+
+
+def insert_workspace_stmt(
+    name: str, description: Optional[str] = None, *, dialect: str = "postgresql"
+) -> "Insert":
+    """
+    Build a statement that adds a workspace, unless it already exists.
+
+    Parameters
+    ----------
+    name : str
+        Name of the workspace.
+    description : str, optional
+        Description of the workspace.
+    dialect : str, default "postgresql"
+        Name of the database dialect, either ``"postgresql"`` or ``"sqlite"``.
+
+    Returns
+    -------
+    :class:`sqlalchemy.sql.dml.Insert`
+        ``INSERT ... ON CONFLICT DO NOTHING``, the row count of the statement is
+        1 only if the workspace was added.
+    """
+    values = {"name": name}
+    if description is not None:
+        values["description"] = description
+
+    return (
+        _INSERTS[dialect](Workspace)
+        .values(**values)
+        .on_conflict_do_nothing(index_elements=[Workspace.name])
+    )
+
+
+def delete_workspace_stmt(name: str) -> "Delete":
+    """
+    Build a statement that deletes a workspace.
+
+    Parameters
+    ----------
+    name : str
+        Name of the workspace.
+
+    Returns
+    -------
+    :class:`sqlalchemy.sql.dml.Delete`
+        The row count of the statement is 1 only if the workspace existed.
+    """
+    return delete(Workspace).where(Workspace.name == name)
+
+
+async def insert_default_rows(
+    session: Optional[Callable[[], "AsyncSession"]] = None
+) -> None:
+    """
+    Add the rows that every database has, like the default workspace.
+
+    Parameters
+    ----------
+    session : Callable[[], :class:`sqlalchemy.ext.asyncio.AsyncSession`], optional
+        Creates the session to add them with, defaults to
+        :func:`_snadra.db.config.async_session`.
+    """
+    make_session = async_session if session is None else session
+    async with make_session() as db_session:
+        async with db_session.begin():
+            stmt = insert_workspace_stmt(
+                "default", "Default workspace", dialect=db_session.bind.dialect.name
+            )
+            result = await db_session.execute(stmt)
+            is_added = result.rowcount == 1
+
+    if is_added:
+        workspace_cache.clear()
+    else:
+        console.log("Found default workspace, skipping")
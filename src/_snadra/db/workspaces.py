@@ -0,0 +1,88 @@
+"""
+Queries of the workspaces that many commands share.
+
+The results are cached in :data:`_snadra.db.cache.workspace_cache`. A result
+is cached only if the cache was not invalidated while it was queried, see
+:attr:`_snadra.cache.TTLCache.generation`.
+"""
+from typing import TYPE_CHECKING, Callable
+
+from sqlalchemy.future import select
+
+from _snadra.db.cache import workspace_cache
+from _snadra.db.models import Workspace
+from _snadra.trie import Trie
+
+if TYPE_CHECKING:
+    from sqlalchemy.ext.asyncio import AsyncSession
+
+# Number of names that are fetched together
+PARTITION_SIZE = 1_000
+
+
+async def is_workspace_exists(
+    target: str, *, async_session: Callable[[], "AsyncSession"]
+) -> bool:
+    """
+    Check if a workspace exists, preferring the workspace cache.
+
+    Parameters
+    ----------
+    target : str
+        Name of the workspace.
+    async_session : Callable[[], :class:`sqlalchemy.ext.asyncio.AsyncSession`]
+        Creates the database session, if the answer is not cached.
+
+    Returns
+    -------
+    bool
+        Whether the workspace exists.
+    """
+    key = ("exists", target)
+    is_exists = workspace_cache.get(key)
+    if is_exists is not None:
+        return is_exists
+
+    generation = workspace_cache.generation
+    async with async_session() as session:
+        stmt = select(Workspace.name).where(Workspace.name == target)
+        result = await session.execute(stmt)
+        is_exists = result.scalar_one_or_none() is not None
+
+    workspace_cache.set(key, is_exists, generation=generation)
+    return is_exists
+
+
+async def workspace_names(*, async_session: Callable[[], "AsyncSession"]) -> Trie:
+    """
+    Get the names of all the workspaces, for completion.
+
+    The names are cached until a workspace is added or deleted (or the cache
+    entry expires), so completing does not query the database on every key
+    press.
+
+    Parameters
+    ----------
+    async_session : Callable[[], :class:`sqlalchemy.ext.asyncio.AsyncSession`]
+        Creates the database session, if the names are not cached.
+
+    Returns
+    -------
+    :class:`_snadra.trie.Trie`
+        The names of the workspaces.
+    """
+    key = ("names",)
+    names = workspace_cache.get(key)
+    if names is not None:
+        return names
+
+    generation = workspace_cache.generation
+    names = Trie()
+    async with async_session() as session:
+        result = await session.stream(select(Workspace.name))
+        async for partition in result.partitions(PARTITION_SIZE):
+            for row in partition:
+                names.add(row.name)
+
+    workspace_cache.set(key, names, generation=generation)
+    return names
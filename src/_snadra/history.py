@@ -0,0 +1,366 @@
+"""
+Persistent command history, per workspace.
+
+Every workspace has its own history file, with an entry per line (encoded as
+JSON, so entries can span lines). New entries are appended in batches, in a
+worker thread, and the file is compacted back to the size limit once it grows
+well past it.
+
+Suggestions come from :class:`SuggestionIndex`, so they do not scan the
+history.
+"""
+import asyncio
+import json
+import os
+import pathlib
+from typing import (
+    TYPE_CHECKING,
+    AsyncGenerator,
+    Dict,
+    Iterable,
+    List,
+    Optional,
+    Tuple,
+)
+import urllib.parse
+
+from prompt_toolkit.auto_suggest import AutoSuggest, Suggestion
+from prompt_toolkit.history import History
+
+if TYPE_CHECKING:
+    from prompt_toolkit.buffer import Buffer
+    from prompt_toolkit.document import Document
+
+# Most entries that are kept per workspace
+MAX_LINES = 100_000
+
+# Seconds to wait for more entries before appending them to the file
+FLUSH_INTERVAL = 1.0
+
+# The file is compacted once it has this many times the maximum entries
+COMPACT_RATIO = 1.5
+
+HISTORY_SUFFIX = ".history"
+
+
+class _Node:
+    __slots__ = {
+        "children",
+        "label",
+        "latest",
+    }
+
+    def __init__(self, label: str, latest: str) -> None:
+        self.label = label
+        self.latest = latest
+        self.children: Optional[Dict[str, "_Node"]] = None
+
+
+class SuggestionIndex:
+    """
+    Index of the most recent line that starts with any prefix.
+
+    This is a radix tree (a prefix tree whose chains of single children are
+    merged into a single node), where every node knows the most recent line
+    that passes through it. Both adding a line and looking a prefix up cost
+    the length of the string, regardless of the number of lines.
+
+    Examples
+    --------
+    >>> index = SuggestionIndex()
+    >>> for line in ["workspace --add a", "help", "workspace --add b"]:
+    ...     index.add(line)
+    >>> index.latest("work")
+    'workspace --add b'
+    >>> index.latest("he"), index.latest("x")
+    ('help', None)
+    """
+
+    __slots__ = {"_root"}
+
+    def __init__(self) -> None:
+        self._root: Optional[_Node] = None
+
+    def add(self, line: str) -> None:
+        """
+        Add a line, which becomes the most recent line of all its prefixes.
+        """
+        if self._root is None:
+            self._root = _Node("", line)
+
+        node = self._root
+        node.latest = line
+        position = 0
+        while position < len(line):
+            if node.children is None:
+                node.children = {}
+
+            child = node.children.get(line[position])
+            if child is None:
+                node.children[line[position]] = _Node(line[position:], line)
+                return
+
+            label = child.label
+            if line.startswith(label, position):
+                common = len(label)
+            else:
+                common = 1
+                limit = min(len(label), len(line) - position)
+                while common < limit and line[position + common] == label[common]:
+                    common += 1
+
+            if common < len(label):
+                # Split the edge where the line leaves it.
+                middle = _Node(label[:common], line)
+                child.label = label[common:]
+                middle.children = {child.label[0]: child}
+                node.children[line[position]] = middle
+                child = middle
+
+            child.latest = line
+            node = child
+            position += common
+
+    def latest(self, prefix: str) -> Optional[str]:
+        """
+        Get the most recent line that starts with a prefix.
+
+        Returns
+        -------
+        Optional[str]
+            `None` if no line starts with ``prefix``.
+        """
+        node = self._root
+        position = 0
+        while node is not None and position < len(prefix):
+            child = (node.children or {}).get(prefix[position])
+            if child is None:
+                return None
+
+            rest = prefix[position:]
+            if rest.startswith(child.label):
+                position += len(child.label)
+                node = child
+            elif child.label.startswith(rest):
+                return child.latest
+            else:
+                return None
+
+        return None if node is None else node.latest
+
+
+class WorkspaceHistory(History):
+    """
+    History of the prompt, that is kept in a file per workspace.
+
+    Parameters
+    ----------
+    directory : pathlib.Path
+        Directory of the history files.
+    workspace : str, optional
+        The initial workspace.
+    max_lines : int, optional
+        Most entries that are kept per workspace.
+    flush_interval : float, optional
+        Seconds to batch new entries for, before appending them to the file.
+    """
+
+    def __init__(
+        self,
+        directory: pathlib.Path,
+        workspace: str = "default",
+        max_lines: int = MAX_LINES,
+        flush_interval: float = FLUSH_INTERVAL,
+    ) -> None:
+        super().__init__()
+        self.directory = directory
+        self.max_lines = max_lines
+        self.flush_interval = flush_interval
+        self.index = SuggestionIndex()
+        self._workspace = workspace
+        self._pending: List[Tuple[pathlib.Path, str]] = []
+        self._line_counts: Dict[pathlib.Path, int] = {}
+        self._flush_handle: Optional[asyncio.TimerHandle] = None
+        self._flush_task: Optional["asyncio.Task[None]"] = None
+        self._write_lock: Optional[asyncio.Lock] = None
+
+    @property
+    def workspace(self) -> str:
+        """
+        The workspace whose history is used.
+
+        Setting a different workspace reloads the history on the next prompt.
+        """
+        return self._workspace
+
+    @workspace.setter
+    def workspace(self, workspace: str) -> None:
+        if workspace == self._workspace:
+            return
+
+        self._workspace = workspace
+        self._loaded = False
+        self._loaded_strings = []
+        self.index = SuggestionIndex()
+
+    @property
+    def path(self) -> pathlib.Path:
+        """
+        Path of the history file of the current workspace.
+        """
+        return self.path_of(self._workspace)
+
+    def path_of(self, workspace: str) -> pathlib.Path:
+        # Workspace names are arbitrary, they must not escape the directory.
+        name = urllib.parse.quote(workspace, safe="")
+        return self.directory / f"{name}{HISTORY_SUFFIX}"
+
+    async def load(self) -> AsyncGenerator[str, None]:
+        """
+        Load the history (in a worker thread), most recent entry first.
+        """
+        if not self._loaded:
+            loop = asyncio.get_running_loop()
+            workspace = self._workspace
+            strings, index = await loop.run_in_executor(
+                None, self._read_indexed, self.path
+            )
+            if workspace != self._workspace:
+                # Switched while reading, the next prompt loads again.
+                return
+
+            # Entries that were added while the file was read, are newer.
+            for string in reversed(self._loaded_strings):
+                strings.append(string)
+                for line in string.splitlines():
+                    index.add(line)
+
+            self.index = index
+            self._loaded_strings = strings[::-1]
+            self._loaded = True
+
+        for item in self._loaded_strings:
+            yield item
+
+    def load_history_strings(self) -> Iterable[str]:
+        return reversed(self._read(self.path))
+
+    def _read_indexed(self, path: pathlib.Path) -> Tuple[List[str], SuggestionIndex]:
+        """
+        Read the most recent entries of a history file, and index them.
+        """
+        strings = self._read(path)
+        index = SuggestionIndex()
+        for string in strings:
+            for line in string.splitlines():
+                index.add(line)
+        return strings, index
+
+    def _read(self, path: pathlib.Path) -> List[str]:
+        """
+        Read the most recent entries of a history file, oldest first.
+        """
+        try:
+            with path.open(encoding="utf-8") as file_obj:
+                lines = file_obj.readlines()
+        except FileNotFoundError:
+            lines = []
+
+        self._line_counts[path] = len(lines)
+        strings = []
+        for line in lines[-self.max_lines :]:
+            try:
+                strings.append(json.loads(line))
+            except ValueError:
+                # A partially written line.
+                continue
+        return strings
+
+    def store_string(self, string: str) -> None:
+        for line in string.splitlines():
+            self.index.add(line)
+
+        self._pending.append((self.path, string))
+        if self._flush_handle is None:
+            loop = asyncio.get_event_loop()
+            self._flush_handle = loop.call_later(self.flush_interval, self._start_flush)
+
+    def _start_flush(self) -> None:
+        self._flush_handle = None
+        self._flush_task = asyncio.ensure_future(self.flush())
+
+    async def flush(self) -> None:
+        """
+        Append the pending entries to their files now.
+        """
+        if self._flush_handle is not None:
+            self._flush_handle.cancel()
+            self._flush_handle = None
+        if self._write_lock is None:
+            self._write_lock = asyncio.Lock()
+
+        async with self._write_lock:
+            batch, self._pending = self._pending, []
+            if batch:
+                loop = asyncio.get_running_loop()
+                await loop.run_in_executor(None, self._write, batch)
+
+    def _write(self, batch: List[Tuple[pathlib.Path, str]]) -> None:
+        """
+        Append entries to their history files, and compact the files that grew
+        too large.
+        """
+        by_path: Dict[pathlib.Path, List[str]] = {}
+        for path, string in batch:
+            by_path.setdefault(path, []).append(json.dumps(string) + "\n")
+
+        self.directory.mkdir(parents=True, exist_ok=True)
+        for path, lines in by_path.items():
+            if path not in self._line_counts:
+                self._read(path)
+            with path.open("a", encoding="utf-8") as file_obj:
+                file_obj.writelines(lines)
+
+            self._line_counts[path] += len(lines)
+            if self._line_counts[path] > self.max_lines * COMPACT_RATIO:
+                self._compact(path)
+
+    def _compact(self, path: pathlib.Path) -> None:
+        """
+        Rewrite a history file with only its most recent entries.
+        """
+        with path.open(encoding="utf-8") as file_obj:
+            lines = file_obj.readlines()[-self.max_lines :]
+
+        tmp_path = path.with_name(f"{path.name}.tmp")
+        with tmp_path.open("w", encoding="utf-8") as file_obj:
+            file_obj.writelines(lines)
+        os.replace(tmp_path, path)
+        self._line_counts[path] = len(lines)
+
+
+class IndexedAutoSuggest(AutoSuggest):
+    """
+    Suggest the most recent history entry that starts with the current line.
+
+    Parameters
+    ----------
+    history : WorkspaceHistory
+        The history, whose index is looked up.
+    """
+
+    def __init__(self, history: WorkspaceHistory) -> None:
+        self.history = history
+
+    def get_suggestion(
+        self, buffer: "Buffer", document: "Document"
+    ) -> Optional[Suggestion]:
+        # Consider only the last line for the suggestion.
+        text = document.text.rsplit("\n", 1)[-1]
+        if not text.strip():
+            return None
+
+        line = self.history.index.latest(text)
+        if line is None:
+            return None
+        return Suggestion(line[len(text) :])
@@ -0,0 +1,267 @@
+"""
+Background jobs.
+
+A job is a command (or any awaitable) that runs as an :class:`asyncio.Task`,
+so it does not block the console. Every job belongs to the session that
+submitted it (see :mod:`_snadra.state`), so the clients of the daemon only see
+and kill their own jobs. CPU-bound work can be offloaded to a thread
+or a process pool with :meth:`JobManager.run_in_executor`.
+"""
+import asyncio
+import concurrent.futures
+import functools
+import itertools
+import time
+from typing import Any, Awaitable, Callable, Dict, List, Optional
+
+from _snadra.state import Session, get_session
+
+# Number of finished jobs that are kept for listing
+FINISHED_JOBS_HISTORY = 100
+
+
+class Job:
+    """
+    A single background job.
+
+    Parameters
+    ----------
+    job_id : int
+        Identifier of the job.
+    name : str
+        Human readable name, usually the line that started the job.
+    session : :class:`_snadra.state.Session`, optional
+        The session that owns the job.
+    """
+
+    __slots__ = {
+        "created_at",
+        "finished_at",
+        "job_id",
+        "name",
+        "session",
+        "started_at",
+        "task",
+    }
+
+    def __init__(
+        self, job_id: int, name: str, session: Optional[Session] = None
+    ) -> None:
+        self.job_id = job_id
+        self.name = name
+        self.session = session
+        # Set by the job manager when the job is submitted
+        self.task: "asyncio.Task[Any]"
+        self.created_at = time.monotonic()
+        self.started_at: Optional[float] = None
+        self.finished_at: Optional[float] = None
+
+    @property
+    def status(self) -> str:
+        """
+        One of ``"queued"``, ``"running"``, ``"done"``, ``"failed"`` or
+        ``"cancelled"``.
+        """
+        if self.task.done():
+            if self.task.cancelled():
+                return "cancelled"
+            if self.task.exception() is not None:
+                return "failed"
+            return "done"
+        if self.started_at is None:
+            return "queued"
+        return "running"
+
+    @property
+    def duration(self) -> Optional[float]:
+        """
+        Seconds the job has been running (or ran), `None` if it never started.
+        """
+        if self.started_at is None:
+            return None
+        end = time.monotonic() if self.finished_at is None else self.finished_at
+        return end - self.started_at
+
+
+class JobManager:
+    """
+    Runs and keeps track of background jobs.
+
+    Parameters
+    ----------
+    max_concurrent : int
+        Maximum number of jobs that run at the same time, the rest are queued.
+    max_workers : int, optional
+        Maximum number of workers in each of the executor pools.
+    """
+
+    def __init__(self, max_concurrent: int = 4, max_workers: Optional[int] = None):
+        if max_concurrent < 1:
+            raise ValueError("max_concurrent must be at least 1")
+
+        self.max_concurrent = max_concurrent
+        self.max_workers = max_workers
+        self.jobs: Dict[int, Job] = {}
+        self._ids = itertools.count(1)
+        self._semaphore: Optional[asyncio.Semaphore] = None
+        self._thread_pool: Optional[concurrent.futures.ThreadPoolExecutor] = None
+        self._process_pool: Optional[concurrent.futures.ProcessPoolExecutor] = None
+
+    def submit(
+        self,
+        awaitable: Awaitable[Any],
+        name: str,
+        on_done: Optional[Callable[[Job], None]] = None,
+    ) -> Job:
+        """
+        Run an awaitable as a background job.
+
+        Parameters
+        ----------
+        awaitable : Awaitable[Any]
+            The work of the job.
+        name : str
+            Human readable name of the job.
+        on_done : Callable[[Job], None], optional
+            Called when the job finishes, for any reason.
+
+        Returns
+        -------
+        Job
+            The submitted job, owned by the current session.
+        """
+        if self._semaphore is None:
+            self._semaphore = asyncio.Semaphore(self.max_concurrent)
+
+        job = Job(job_id=next(self._ids), name=name, session=get_session())
+        job.task = asyncio.ensure_future(self._run(job, awaitable))
+        job.task.add_done_callback(lambda _: self._close_unstarted(job, awaitable))
+        if on_done is not None:
+            job.task.add_done_callback(lambda _: on_done(job))
+
+        self.jobs[job.job_id] = job
+        self._prune()
+        return job
+
+    async def _run(self, job: Job, awaitable: Awaitable[Any]) -> Any:
+        try:
+            async with self._semaphore:  # type: ignore
+                job.started_at = time.monotonic()
+                return await awaitable
+        finally:
+            if job.started_at is not None:
+                job.finished_at = time.monotonic()
+
+    @staticmethod
+    def _close_unstarted(job: Job, awaitable: Awaitable[Any]) -> None:
+        """
+        Close the coroutine of a job that was cancelled before it started.
+        """
+        if job.started_at is None and asyncio.iscoroutine(awaitable):
+            awaitable.close()
+
+    def _prune(self) -> None:
+        finished = [job for job in self.jobs.values() if job.task.done()]
+        for job in finished[:-FINISHED_JOBS_HISTORY]:
+            del self.jobs[job.job_id]
+
+    def get(self, job_id: int) -> Optional[Job]:
+        """
+        Get a job by its identifier.
+        """
+        return self.jobs.get(job_id)
+
+    def owned(self, session: Session) -> List[Job]:
+        """
+        Get the jobs of a session, including the finished ones.
+        """
+        return [job for job in self.jobs.values() if job.session is session]
+
+    def active(self) -> List[Job]:
+        """
+        Get the jobs that did not finish yet.
+        """
+        return [job for job in self.jobs.values() if not job.task.done()]
+
+    def kill(self, job_id: int, session: Optional[Session] = None) -> bool:
+        """
+        Cancel a job.
+
+        Parameters
+        ----------
+        job_id : int
+            Identifier of the job.
+        session : :class:`_snadra.state.Session`, optional
+            Cancel the job only if this session owns it.
+
+        Returns
+        -------
+        bool
+            Whether the job was cancelled, `False` if there is no such job
+            (of the session) or it already finished.
+        """
+        job = self.jobs.get(job_id)
+        if job is None or job.task.done():
+            return False
+        if session is not None and job.session is not session:
+            return False
+        return job.task.cancel()
+
+    async def run_in_executor(
+        self, func: Callable[..., Any], *args: Any, process: bool = False
+    ) -> Any:
+        """
+        Run a blocking function in a pool, without blocking the event loop.
+
+        Parameters
+        ----------
+        func : Callable[..., Any]
+            The function to run, must be picklable if ``process`` is set.
+        *args : Any
+            Arguments for ``func``.
+        process : bool, default False
+            Use a process pool (for CPU-bound work) instead of a thread pool.
+
+        Returns
+        -------
+        Any
+            What ``func`` returned.
+        """
+        executor: concurrent.futures.Executor
+        if process:
+            if self._process_pool is None:
+                self._process_pool = concurrent.futures.ProcessPoolExecutor(
+                    max_workers=self.max_workers
+                )
+            executor = self._process_pool
+        else:
+            if self._thread_pool is None:
+                self._thread_pool = concurrent.futures.ThreadPoolExecutor(
+                    max_workers=self.max_workers, thread_name_prefix="snadra-job"
+                )
+            executor = self._thread_pool
+
+        loop = asyncio.get_running_loop()
+        return await loop.run_in_executor(executor, functools.partial(func, *args))
+
+    async def join(self) -> None:
+        """
+        Wait until all the jobs finish.
+        """
+        active = self.active()
+        while active:
+            await asyncio.wait([job.task for job in active])
+            active = self.active()
+
+    async def shutdown(self) -> None:
+        """
+        Cancel all the jobs and shut the executor pools down.
+        """
+        for job in self.active():
+            job.task.cancel()
+        await self.join()
+
+        for pool in (self._thread_pool, self._process_pool):
+            if pool is not None:
+                pool.shutdown(wait=False)
+        self._thread_pool = self._process_pool = None
@@ -0,0 +1,423 @@
+"""
+The results of the commands, in the output mode that was chosen.
+
+Commands hand their results to :func:`get_output` as records (rows of named
+columns) instead of rendering them. In the ``rich`` mode they are rendered as
+tables, in the other modes they are streamed as they come, without any table
+layout:
+
+* ``json``: a single array of objects.
+* ``jsonl``: an object per line.
+* ``tsv``: a header line with the column keys, then a line per record.
+
+In the machine-readable modes, diagnostics go to stderr, so that stdout has
+only the records. Rich is imported only to render tables and diagnostics.
+"""
+import abc
+import contextvars
+import datetime
+import json
+import sys
+from typing import (
+    IO,
+    TYPE_CHECKING,
+    Any,
+    Callable,
+    Dict,
+    Iterable,
+    NamedTuple,
+    Optional,
+    Sequence,
+    Type,
+)
+
+if TYPE_CHECKING:
+    from rich.console import Console
+    from rich.table import Table
+
+OUTPUT_MODES = ("rich", "json", "jsonl", "tsv")
+
+# How a missing value is shown in tables
+MISSING = "#"
+
+_TSV_ESCAPES = str.maketrans({"\\": "\\\\", "\t": "\\t", "\n": "\\n", "\r": "\\r"})
+
+
+class Column(NamedTuple):
+    """
+    A column of records.
+
+    Parameters
+    ----------
+    key : str
+        Key of the value in the machine-readable modes.
+    title : str
+        Header of the column in tables.
+    justify : str, default "left"
+        Justification of the column in tables.
+    format : Callable[[Any], str], optional
+        Formats a (non-missing) value for tables, defaults to `str`.
+    """
+
+    key: str
+    title: str
+    justify: str = "left"
+    format: Optional[Callable[[Any], str]] = None
+
+
+def _json_default(value: Any) -> Any:
+    if isinstance(value, (datetime.date, datetime.time)):
+        return value.isoformat()
+    return str(value)
+
+
+def _tsv_value(value: Any) -> str:
+    if value is None:
+        return ""
+    if isinstance(value, (datetime.date, datetime.time)):
+        return value.isoformat()
+    return str(value).translate(_TSV_ESCAPES)
+
+
+class RecordWriter(metaclass=abc.ABCMeta):
+    """
+    Writes the records of a single result.
+
+    Use it as a context manager, records can be written in any number of
+    batches.
+
+    Parameters
+    ----------
+    output : Output
+        Where, and in which format, to write.
+    title : str
+        Title of the result.
+    columns : Sequence[Column]
+        The columns of the records.
+    show_empty : bool, default True
+        Whether to show a result without records, in the ``rich`` mode.
+    """
+
+    def __init__(
+        self,
+        output: "Output",
+        title: str,
+        columns: Sequence[Column],
+        show_empty: bool = True,
+    ) -> None:
+        self.output = output
+        self.file = output.file
+        self.title = title
+        self.columns = columns
+        self.show_empty = show_empty
+        self.count = 0
+
+    @abc.abstractmethod
+    def write(self, rows: Iterable[Sequence[Any]]) -> None:
+        """
+        Write a batch of records.
+
+        Parameters
+        ----------
+        rows : Iterable[Sequence[Any]]
+            The records, with a value per column.
+        """
+        ...
+
+    def close(self) -> None:
+        """
+        Finish the result.
+        """
+        self.file.flush()
+
+    def __enter__(self) -> "RecordWriter":
+        return self
+
+    def __exit__(self, *exc_info: Any) -> None:
+        self.close()
+
+
+class _RichWriter(RecordWriter):
+    def _table(self, rows: Iterable[Sequence[Any]]) -> "Table":
+        from rich import box as rich_box
+        from rich.table import Table as RichTable
+
+        is_first = self.count == 0
+        table = RichTable(
+            title=self.title if is_first else None,
+            box=rich_box.SIMPLE,
+            show_header=is_first,
+        )
+        for column in self.columns:
+            table.add_column(column.title, justify=column.justify)  # type: ignore
+
+        formats = [column.format or str for column in self.columns]
+        for row in rows:
+            table.add_row(
+                *(
+                    MISSING if value is None else format_value(value)
+                    for format_value, value in zip(formats, row)
+                )
+            )
+        return table
+
+    def write(self, rows: Iterable[Sequence[Any]]) -> None:
+        table = self._table(rows)
+        if table.row_count:
+            self.output.console.print(table)
+            self.count += table.row_count
+
+    def close(self) -> None:
+        if self.count == 0 and self.show_empty:
+            self.output.console.print(self._table(()))
+        super().close()
+
+
+class _JsonWriter(RecordWriter):
+    def write(self, rows: Iterable[Sequence[Any]]) -> None:
+        keys = [column.key for column in self.columns]
+        for row in rows:
+            self.file.write("[\n" if self.count == 0 else ",\n")
+            json.dump(dict(zip(keys, row)), self.file, default=_json_default)
+            self.count += 1
+
+    def close(self) -> None:
+        self.file.write("[]\n" if self.count == 0 else "\n]\n")
+        super().close()
+
+
+class _JsonLinesWriter(RecordWriter):
+    def write(self, rows: Iterable[Sequence[Any]]) -> None:
+        keys = [column.key for column in self.columns]
+        lines = [
+            json.dumps(dict(zip(keys, row)), default=_json_default) + "\n"
+            for row in rows
+        ]
+        self.file.writelines(lines)
+        self.count += len(lines)
+
+
+class _TsvWriter(RecordWriter):
+    def _write_header(self) -> None:
+        self.file.write("\t".join(column.key for column in self.columns) + "\n")
+
+    def write(self, rows: Iterable[Sequence[Any]]) -> None:
+        lines = ["\t".join(map(_tsv_value, row)) + "\n" for row in rows]
+        if lines and self.count == 0:
+            self._write_header()
+        self.file.writelines(lines)
+        self.count += len(lines)
+
+    def close(self) -> None:
+        if self.count == 0:
+            self._write_header()
+        super().close()
+
+
+_WRITERS: Dict[str, Type[RecordWriter]] = {
+    "rich": _RichWriter,
+    "json": _JsonWriter,
+    "jsonl": _JsonLinesWriter,
+    "tsv": _TsvWriter,
+}
+
+
+class Output:
+    """
+    Where the results of the commands go, and in which format.
+
+    Parameters
+    ----------
+    mode : str, default "rich"
+        One of :data:`OUTPUT_MODES`.
+    file : IO[str], optional
+        Where the records are written in the machine-readable modes,
+        defaults to `sys.stdout` (at the time of writing).
+    console : :class:`rich.console.Console`, optional
+        Where the tables and the messages are printed in the ``rich`` mode,
+        defaults to :data:`_snadra.cmd.utils.console`.
+    error_console : :class:`rich.console.Console`, optional
+        Where the messages are printed in the machine-readable modes,
+        defaults to :data:`_snadra.cmd.utils.error_console`.
+
+    Raises
+    ------
+    ValueError
+        If the mode is not supported.
+    """
+
+    __slots__ = {
+        "_console",
+        "_error_console",
+        "_file",
+        "mode",
+    }
+
+    def __init__(
+        self,
+        mode: str = "rich",
+        file: Optional[IO[str]] = None,
+        console: Optional["Console"] = None,
+        error_console: Optional["Console"] = None,
+    ) -> None:
+        if mode not in OUTPUT_MODES:
+            raise ValueError(f"Unsupported output mode: {repr(mode)}")
+
+        self.mode = mode
+        self._file = file
+        self._console = console
+        self._error_console = error_console
+
+    @property
+    def file(self) -> IO[str]:
+        return sys.stdout if self._file is None else self._file
+
+    @property
+    def console(self) -> "Console":
+        if self._console is None:
+            from _snadra.cmd.utils import console
+
+            return console  # type: ignore
+        return self._console
+
+    @property
+    def error_console(self) -> "Console":
+        if self._error_console is None:
+            from _snadra.cmd.utils import error_console
+
+            return error_console  # type: ignore
+        return self._error_console
+
+    @property
+    def is_rich(self) -> bool:
+        return self.mode == "rich"
+
+    def records(
+        self, title: str, columns: Sequence[Column], show_empty: bool = True
+    ) -> RecordWriter:
+        """
+        Start a result made of records.
+
+        Parameters
+        ----------
+        title : str
+            Title of the result.
+        columns : Sequence[Column]
+            The columns of the records.
+        show_empty : bool, default True
+            Whether to show a result without records, in the ``rich`` mode.
+
+        Returns
+        -------
+        RecordWriter
+            Writer of the records, to use as a context manager.
+
+        Examples
+        --------
+        >>> import io
+        >>> output = Output("jsonl", file=io.StringIO())
+        >>> with output.records("Numbers", [Column("n", "N")]) as writer:
+        ...     writer.write([(1,), (2,)])
+        >>> output.file.getvalue()
+        '{"n": 1}\\n{"n": 2}\\n'
+        """
+        return _WRITERS[self.mode](self, title, columns, show_empty)
+
+    def write_records(
+        self,
+        title: str,
+        columns: Sequence[Column],
+        rows: Iterable[Sequence[Any]],
+    ) -> None:
+        """
+        Write a result made of records, all at once.
+
+        See Also
+        --------
+        records
+        """
+        with self.records(title, columns) as writer:
+            writer.write(rows)
+
+    def text(self, key: str, text: str) -> None:
+        """
+        Write a free-form result, like a help message.
+
+        Parameters
+        ----------
+        key : str
+            Key of the text in the JSON modes.
+        text : str
+            The text.
+        """
+        if self.is_rich:
+            self.console.print(text)
+        elif self.mode == "tsv":
+            self.file.write(text + "\n")
+        else:
+            self.file.write(json.dumps({key: text}) + "\n")
+
+    def log(self, message: str) -> None:
+        """
+        Tell the user something that is not a result, like an error.
+
+        Parameters
+        ----------
+        message : str
+            The message, with console markup.
+        """
+        if self.is_rich:
+            self.console.log(message)
+        else:
+            self.error_console.log(message)
+
+    async def drain(self) -> None:
+        """
+        Flush the files of the output, and wait until they can take more.
+
+        Writing never waits, so a command that writes a long result in parts
+        calls it between them: then a slow reader (like a client of
+        :mod:`_snadra.daemon`) slows the command down, instead of the output
+        piling up in memory. Only the files with a ``drain`` coroutine method
+        are waited for.
+        """
+        files = [self.file, self.console.file, self.error_console.file]
+        for file_obj in {id(file_obj): file_obj for file_obj in files}.values():
+            file_obj.flush()
+            drain = getattr(file_obj, "drain", None)
+            if drain is not None:
+                await drain()
+
+
+_current_output: contextvars.ContextVar[Output] = contextvars.ContextVar(
+    "current_output", default=Output()
+)
+
+
+def get_output() -> Output:
+    """
+    Get the output of the current context.
+
+    Returns
+    -------
+    Output
+        By default, the ``rich`` mode to stdout.
+    """
+    return _current_output.get()
+
+
+def set_output(output: Output) -> contextvars.Token:
+    """
+    Set the output of the current context (and of the tasks it creates).
+
+    Parameters
+    ----------
+    output : Output
+        The new output.
+
+    Returns
+    -------
+    :class:`contextvars.Token`
+        Token to restore the previous output with.
+    """
+    return _current_output.set(output)
@@ -1,3 +1,70 @@
-state = {
-    "current_workspace": "default",
-}
+"""
+State of the operator's session, like the current workspace.
+
+The session is carried in a :mod:`contextvars` context instead of a global, so
+several sessions (like the clients of :mod:`_snadra.daemon`) can run in the
+same event loop. Tasks inherit the session of the context they are created in,
+so the background jobs of a session share its state.
+"""
+import contextvars
+
+
+class Session:
+    """
+    State of a single session.
+
+    Parameters
+    ----------
+    current_workspace : str, default "default"
+        Name of the workspace the session works in.
+
+    Examples
+    --------
+    >>> Session()
+    Session(current_workspace='default')
+    >>> Session("internal").current_workspace
+    'internal'
+    """
+
+    __slots__ = {"current_workspace"}
+
+    def __init__(self, current_workspace: str = "default") -> None:
+        self.current_workspace = current_workspace
+
+    def __repr__(self) -> str:
+        return f"{type(self).__name__}(current_workspace={self.current_workspace!r})"
+
+
+# The session of a process that serves a single operator
+_current_session: contextvars.ContextVar[Session] = contextvars.ContextVar(
+    "current_session", default=Session()
+)
+
+
+def get_session() -> Session:
+    """
+    Get the session of the current context.
+
+    Returns
+    -------
+    Session
+        By default, the single session of the process.
+    """
+    return _current_session.get()
+
+
+def set_session(session: Session) -> contextvars.Token:
+    """
+    Set the session of the current context (and of the tasks it creates).
+
+    Parameters
+    ----------
+    session : Session
+        The new session.
+
+    Returns
+    -------
+    :class:`contextvars.Token`
+        Token to restore the previous session with.
+    """
+    return _current_session.set(session)
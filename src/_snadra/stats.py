@@ -0,0 +1,273 @@
+"""
+Per-command latency and resource instrumentation.
+
+Every dispatch is split into stages (parsing the line, looking the command up,
+parsing its arguments and running it), each stage is timed and kept in a
+rolling :class:`Histogram` per command keyword. Database round-trips are
+attributed to the dispatch that made them, through a context variable.
+"""
+import collections
+import contextlib
+import contextvars
+import math
+import time
+import tracemalloc
+from typing import Any, Awaitable, Deque, Dict, Iterator, Optional, TypeVar
+
+T = TypeVar("T")
+
+# Number of samples that each histogram keeps
+WINDOW_SIZE = 1024
+
+PERCENTILES = (50, 95, 99)
+
+
+class Histogram:
+    """
+    Rolling window of samples, with percentiles.
+
+    Parameters
+    ----------
+    size : int
+        Number of most recent samples to keep.
+
+    Examples
+    --------
+    >>> histogram = Histogram(size=100)
+    >>> for value in range(1, 101):
+    ...     histogram.record(value)
+    >>> histogram.percentile(50), histogram.percentile(99)
+    (50, 99)
+    """
+
+    __slots__ = {
+        "_samples",
+        "count",
+        "total",
+    }
+
+    def __init__(self, size: int = WINDOW_SIZE) -> None:
+        self._samples: Deque[float] = collections.deque(maxlen=size)
+        self.count = 0
+        self.total = 0.0
+
+    def record(self, value: float) -> None:
+        """
+        Add a sample.
+        """
+        self._samples.append(value)
+        self.count += 1
+        self.total += value
+
+    def percentile(self, percent: float) -> float:
+        """
+        Get a percentile of the samples in the window (nearest-rank method).
+
+        Parameters
+        ----------
+        percent : float
+            The percentile, between 0 and 100.
+
+        Returns
+        -------
+        float
+            The percentile, or ``0`` if there are no samples.
+        """
+        if not self._samples:
+            return 0.0
+
+        samples = sorted(self._samples)
+        index = math.ceil(percent / 100 * len(samples)) - 1
+        return samples[min(max(index, 0), len(samples) - 1)]
+
+    def summary(self) -> Dict[str, float]:
+        """
+        Get the count, mean, maximum and percentiles of the samples.
+        """
+        summary = {
+            "count": self.count,
+            "mean": self.total / self.count if self.count else 0.0,
+            "max": max(self._samples, default=0.0),
+        }
+        for percent in PERCENTILES:
+            summary[f"p{percent}"] = self.percentile(percent)
+        return summary
+
+
+class DispatchMetrics:
+    """
+    Measurements of a single dispatch.
+
+    Parameters
+    ----------
+    keyword : str
+        Core keyword of the dispatched command.
+    """
+
+    __slots__ = {
+        "allocated",
+        "db_queries",
+        "db_seconds",
+        "keyword",
+        "stages",
+    }
+
+    def __init__(self, keyword: str) -> None:
+        self.keyword = keyword
+        self.stages: Dict[str, float] = {}
+        self.db_queries = 0
+        self.db_seconds = 0.0
+        self.allocated: Optional[int] = None
+
+    @contextlib.contextmanager
+    def stage(self, name: str) -> Iterator[None]:
+        """
+        Time a stage of the dispatch.
+
+        Parameters
+        ----------
+        name : str
+            Name of the stage.
+        """
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.stages[name] = time.perf_counter() - start
+
+
+_current_dispatch: contextvars.ContextVar[
+    Optional[DispatchMetrics]
+] = contextvars.ContextVar("current_dispatch", default=None)
+
+
+def current_dispatch() -> Optional[DispatchMetrics]:
+    """
+    Get the metrics of the dispatch that is running in the current context.
+
+    Returns
+    -------
+    Optional[DispatchMetrics]
+        `None` outside of a dispatch.
+    """
+    return _current_dispatch.get()
+
+
+class Stats:
+    """
+    Histograms of the dispatch metrics, per command keyword.
+
+    Parameters
+    ----------
+    window : int
+        Number of samples kept by each histogram.
+    track_allocations : bool
+        Whether to measure the memory that each command allocates, with
+        :mod:`tracemalloc`. This slows every command down considerably.
+
+    Notes
+    -----
+    :mod:`tracemalloc` only measures the whole process, so the allocations of
+    a dispatch are recorded only if no other dispatch (like a background job,
+    or the line of another daemon client) ran at any time during it. They
+    still include what the event loop does meanwhile outside of any dispatch
+    (like flushing the history).
+    """
+
+    def __init__(
+        self, window: int = WINDOW_SIZE, track_allocations: bool = False
+    ) -> None:
+        self.window = window
+        self.track_allocations = track_allocations
+        self.histograms: Dict[str, Dict[str, Histogram]] = {}
+        # The dispatches that are running, and that were ever started
+        self._running = 0
+        self._started = 0
+
+    def record(self, keyword: str, metric: str, value: float) -> None:
+        """
+        Add a sample to the histogram of a command's metric.
+        """
+        histograms = self.histograms.setdefault(keyword, {})
+        histogram = histograms.get(metric)
+        if histogram is None:
+            histogram = histograms[metric] = Histogram(size=self.window)
+        histogram.record(value)
+
+    def finish(self, metrics: DispatchMetrics) -> None:
+        """
+        Record the measurements of a finished dispatch.
+        """
+        keyword = metrics.keyword
+        for stage, seconds in metrics.stages.items():
+            self.record(keyword, f"{stage}_ms", seconds * 1_000)
+        self.record(keyword, "total_ms", sum(metrics.stages.values()) * 1_000)
+        self.record(keyword, "db_queries", metrics.db_queries)
+        self.record(keyword, "db_ms", metrics.db_seconds * 1_000)
+        if metrics.allocated is not None:
+            self.record(keyword, "allocated_kib", metrics.allocated / 1024)
+
+    async def track(self, metrics: DispatchMetrics, awaitable: Awaitable[T]) -> T:
+        """
+        Await the run stage of a dispatch, and record the dispatch.
+
+        The database queries that are made while ``awaitable`` runs are
+        attributed to ``metrics``.
+
+        Parameters
+        ----------
+        metrics : DispatchMetrics
+            Metrics of the dispatch.
+        awaitable : Awaitable[T]
+            The run stage.
+
+        Returns
+        -------
+        T
+            What ``awaitable`` returned.
+        """
+        token = _current_dispatch.set(metrics)
+        is_alone = self._running == 0
+        self._running += 1
+        self._started += 1
+        started = self._started
+        track_allocations = self.track_allocations
+        if track_allocations:
+            if not tracemalloc.is_tracing():
+                tracemalloc.start()
+            allocated_before = tracemalloc.get_traced_memory()[0]
+
+        try:
+            with metrics.stage("run"):
+                return await awaitable
+        finally:
+            self._running -= 1
+            # Another dispatch that started meanwhile allocated too.
+            if track_allocations and is_alone and self._started == started:
+                allocated_after = tracemalloc.get_traced_memory()[0]
+                metrics.allocated = max(allocated_after - allocated_before, 0)
+            _current_dispatch.reset(token)
+            self.finish(metrics)
+
+    def reset(self) -> None:
+        """
+        Remove all the samples.
+        """
+        self.histograms.clear()
+
+    def summary(self) -> Dict[str, Dict[str, Dict[str, Any]]]:
+        """
+        Get the summary of every histogram.
+
+        Returns
+        -------
+        Dict[str, Dict[str, Dict[str, Any]]]
+            Mapping of keyword to metric to the :meth:`Histogram.summary`.
+        """
+        return {
+            keyword: {
+                metric: histogram.summary()
+                for metric, histogram in sorted(histograms.items())
+            }
+            for keyword, histograms in sorted(self.histograms.items())
+        }
@@ -0,0 +1,385 @@
+"""
+Sets of target addresses, like the RHOSTS of the commands.
+
+A :class:`TargetSet` stores sorted, merged ranges of addresses, never the
+addresses themselves, so ``10.0.0.0/8`` costs as much memory as a single
+address. The addresses are generated only while iterating.
+
+The specs of the targets are separated by whitespace, and each one is either:
+
+* An address, like ``10.0.0.1`` or ``fe80::1``.
+* A network, like ``10.0.0.0/8``.
+* A range of addresses, like ``10.0.0.1-10.0.0.50``.
+* An IPv4 address with ranges (or lists) of octets, like ``192.168.1-20.1-254``
+  or ``10.0.0,2.*``. Such a spec can be made of at most :data:`MAX_INTERVALS`
+  ranges of addresses (``*.*.*.1`` is made of ``256 ** 3``).
+* ``file:<path>``, the specs in a file, separated by whitespace, with ``#``
+  comments.
+
+Use :func:`target_set` as the type of an argument of a command::
+
+    arguments = {
+        "rhosts": {"help": "The targets", "type": target_set},
+    }
+"""
+import argparse
+import bisect
+import ipaddress
+import itertools
+import pathlib
+import re
+from typing import Iterable, Iterator, List, Sequence, Tuple, Union
+
+Address = Union[ipaddress.IPv4Address, ipaddress.IPv6Address]
+
+# The IPv6 addresses are stored after all the IPv4 addresses, so both fit in
+# a single sorted sequence.
+_IPV6_OFFSET = 1 << 32
+
+_OCTET_RE = re.compile(r"^(\*|\d{1,3}(-\d{1,3})?(,\d{1,3}(-\d{1,3})?)*)$")
+
+_FILE_PREFIX = "file:"
+
+# Most ranges of addresses that a spec with octet ranges may expand to
+MAX_INTERVALS = 1 << 16
+
+# An inclusive range of keys
+Interval = Tuple[int, int]
+
+
+def _key(address: Address) -> int:
+    if address.version == 4:
+        return int(address)
+    return int(address) + _IPV6_OFFSET
+
+
+def _address(key: int) -> Address:
+    if key < _IPV6_OFFSET:
+        return ipaddress.IPv4Address(key)
+    return ipaddress.IPv6Address(key - _IPV6_OFFSET)
+
+
+def _split(intervals: Iterable[Interval]) -> Iterator[Interval]:
+    # A range never mixes IPv4 and IPv6 addresses.
+    for start, end in intervals:
+        if start < _IPV6_OFFSET <= end:
+            yield start, _IPV6_OFFSET - 1
+            yield _IPV6_OFFSET, end
+        else:
+            yield start, end
+
+
+def _merge(intervals: Iterable[Interval]) -> List[Interval]:
+    """
+    Sort intervals, merging the overlapping and the adjacent ones.
+
+    Examples
+    --------
+    >>> _merge([(5, 9), (0, 2), (3, 3), (8, 12)])
+    [(0, 3), (5, 12)]
+    """
+    merged: List[Interval] = []
+    for start, end in sorted(_split(intervals)):
+        if (
+            merged
+            and start <= merged[-1][1] + 1
+            # The first IPv6 address is not adjacent to the last IPv4 one.
+            and not merged[-1][1] < start == _IPV6_OFFSET
+        ):
+            if end > merged[-1][1]:
+                merged[-1] = (merged[-1][0], end)
+        else:
+            merged.append((start, end))
+    return merged
+
+
+def _parse_octets(spec: str) -> List[Interval]:
+    parts = spec.split(".")
+    if len(parts) != 4 or not all(_OCTET_RE.match(part) for part in parts):
+        raise ValueError(f"Invalid target: {spec!r}")
+
+    octets: List[List[Interval]] = []
+    for part in parts:
+        ranges = []
+        for item in ("0-255" if part == "*" else part).split(","):
+            low, _, high = item.partition("-")
+            first, last = int(low), int(high or low)
+            if not first <= last <= 255:
+                raise ValueError(f"Invalid octet range {item!r} in target {spec!r}")
+            ranges.append((first, last))
+        octets.append(_merge(ranges))
+
+    # The octets after the last partial one are whole, so each range of the
+    # last partial octet is a single interval of addresses.
+    partial = [index for index, ranges in enumerate(octets) if ranges != [(0, 255)]]
+    if not partial:
+        return [(0, _IPV6_OFFSET - 1)]
+    last = partial[-1]
+    shift = 8 * (3 - last)
+
+    count = len(octets[last])
+    for ranges in octets[:last]:
+        count *= sum(end - first + 1 for first, end in ranges)
+    if count > MAX_INTERVALS:
+        raise ValueError(
+            f"The target {spec!r} is made of too many ranges of addresses"
+            f" ({count}, at most {MAX_INTERVALS})"
+        )
+
+    intervals = []
+    prefixes = itertools.product(
+        *(
+            [value for first, end in ranges for value in range(first, end + 1)]
+            for ranges in octets[:last]
+        )
+    )
+    for prefix in prefixes:
+        base = 0
+        for index, value in enumerate(prefix):
+            base |= value << 8 * (3 - index)
+        for first, end in octets[last]:
+            intervals.append(
+                (base | first << shift, base | end << shift | ((1 << shift) - 1))
+            )
+    return intervals
+
+
+def _parse_spec(spec: str, allow_files: bool = True) -> List[Interval]:
+    if spec.startswith(_FILE_PREFIX) and allow_files:
+        path = pathlib.Path(spec[len(_FILE_PREFIX) :]).expanduser()
+        intervals = []
+        with path.open() as file_obj:
+            for line in file_obj:
+                for item in line.partition("#")[0].split():
+                    intervals.extend(_parse_spec(item, allow_files=False))
+        return intervals
+
+    if "/" in spec:
+        network = ipaddress.ip_network(spec, strict=False)
+        return [(_key(network.network_address), _key(network.broadcast_address))]
+
+    try:
+        address = ipaddress.ip_address(spec)
+    except ValueError:
+        pass
+    else:
+        return [(_key(address), _key(address))]
+
+    low, _, high = spec.partition("-")
+    try:
+        first, last = ipaddress.ip_address(low), ipaddress.ip_address(high)
+    except ValueError:
+        return _parse_octets(spec)
+    if first.version != last.version or first > last:  # type: ignore
+        raise ValueError(f"Invalid range of addresses: {spec!r}")
+    return [(_key(first), _key(last))]
+
+
+class TargetSet:
+    """
+    Set of IPv4 and IPv6 addresses, stored as ranges.
+
+    Parameters
+    ----------
+    intervals : Iterable[Tuple[int, int]], optional
+        Inclusive ranges of keys, IPv6 addresses are offset by ``2 ** 32``.
+        Use :meth:`TargetSet.parse` to build a set from specs.
+
+    Notes
+    -----
+    Checking whether an address is in the set, and getting an address by its
+    index, cost a binary search over the ranges. ``len()`` raises
+    `OverflowError` for sets that are too large for it (like an IPv6 ``/64``),
+    use :attr:`TargetSet.size` for those.
+
+    Examples
+    --------
+    >>> targets = TargetSet.parse("10.0.0.0/30 10.0.0.2-10.0.0.5 fe80::1")
+    >>> len(targets), "10.0.0.4" in targets, "10.0.0.6" in targets
+    (7, True, False)
+    >>> str(targets)
+    '10.0.0.0/30 10.0.0.4/31 fe80::1'
+    >>> [str(address) for address in targets.shard(3)[2]]
+    ['10.0.0.4', '10.0.0.5', 'fe80::1']
+    """
+
+    __slots__ = {
+        "_counts",
+        "_ends",
+        "_starts",
+    }
+
+    def __init__(self, intervals: Iterable[Interval] = ()) -> None:
+        merged = _merge(intervals)
+        self._starts = [start for start, _ in merged]
+        self._ends = [end for _, end in merged]
+        # The number of addresses before every range, and in total
+        self._counts = [0]
+        for start, end in merged:
+            self._counts.append(self._counts[-1] + end - start + 1)
+
+    @classmethod
+    def parse(cls, specs: Union[str, Iterable[str]]) -> "TargetSet":
+        """
+        Build a set from specs of targets.
+
+        Parameters
+        ----------
+        specs : Union[str, Iterable[str]]
+            Specs that are separated by whitespace, or an iterable of them.
+
+        Raises
+        ------
+        ValueError
+            If a spec is not valid.
+        OSError
+            If a file of specs can not be read.
+        """
+        if isinstance(specs, str):
+            specs = specs.split()
+        return cls(interval for spec in specs for interval in _parse_spec(spec))
+
+    @property
+    def size(self) -> int:
+        """
+        The number of addresses.
+        """
+        return self._counts[-1]
+
+    def __len__(self) -> int:
+        return self.size
+
+    def __bool__(self) -> bool:
+        return bool(self._starts)
+
+    def __contains__(self, address: object) -> bool:
+        if isinstance(address, str):
+            try:
+                address = ipaddress.ip_address(address)
+            except ValueError:
+                return False
+        if not isinstance(address, (ipaddress.IPv4Address, ipaddress.IPv6Address)):
+            return False
+
+        key = _key(address)
+        index = bisect.bisect_right(self._starts, key) - 1
+        return index >= 0 and key <= self._ends[index]
+
+    def __iter__(self) -> Iterator[Address]:
+        for start, end in zip(self._starts, self._ends):
+            for key in range(start, end + 1):
+                yield _address(key)
+
+    def __getitem__(self, index: int) -> Address:
+        if index < 0:
+            index += self.size
+        if not 0 <= index < self.size:
+            raise IndexError("TargetSet index out of range")
+
+        position = bisect.bisect_right(self._counts, index) - 1
+        return _address(self._starts[position] + index - self._counts[position])
+
+    def __eq__(self, other: object) -> bool:
+        if not isinstance(other, TargetSet):
+            return NotImplemented
+        return self._starts == other._starts and self._ends == other._ends
+
+    def __or__(self, other: "TargetSet") -> "TargetSet":
+        return self.union(other)
+
+    def __str__(self) -> str:
+        specs = []
+        for first, last in self.ranges():
+            for network in ipaddress.summarize_address_range(first, last):
+                specs.append(
+                    str(network.network_address)
+                    if network.num_addresses == 1
+                    else str(network)
+                )
+        return " ".join(specs)
+
+    def __repr__(self) -> str:
+        return f"{self.__class__.__name__}.parse({str(self)!r})"
+
+    def ranges(self) -> Iterator[Tuple[Address, Address]]:
+        """
+        Iterate over the ranges of the set.
+
+        Yields
+        ------
+        Tuple[Address, Address]
+            The first and the last address of a range, by order.
+        """
+        for start, end in zip(self._starts, self._ends):
+            yield _address(start), _address(end)
+
+    def union(self, *others: "TargetSet") -> "TargetSet":
+        """
+        Get the addresses that are in this set, or in any of ``others``.
+        """
+        return TargetSet(
+            interval
+            for targets in (self, *others)
+            for interval in zip(targets._starts, targets._ends)
+        )
+
+    def slice(self, start: int, stop: int) -> "TargetSet":
+        """
+        Get the addresses from index ``start`` up to (excluding) ``stop``.
+        """
+        start, stop = max(start, 0), min(stop, self.size)
+        intervals = []
+        position = bisect.bisect_right(self._counts, start) - 1
+        while start < stop:
+            offset = start - self._counts[position]
+            first = self._starts[position] + offset
+            last = min(self._ends[position], first + stop - start - 1)
+            intervals.append((first, last))
+            start += last - first + 1
+            position += 1
+        return TargetSet(intervals)
+
+    def shard(self, count: int) -> List["TargetSet"]:
+        """
+        Split the set into sets of (almost) the same size, for parallel workers.
+
+        Parameters
+        ----------
+        count : int
+            Number of shards.
+
+        Returns
+        -------
+        List[TargetSet]
+            ``count`` disjoint sets, by order, some are empty if the set has
+            less than ``count`` addresses.
+
+        Raises
+        ------
+        ValueError
+            If ``count`` is not positive.
+        """
+        if count < 1:
+            raise ValueError(f"Invalid number of shards: {count}")
+        bounds: Sequence[int] = [
+            self.size * index // count for index in range(count + 1)
+        ]
+        return [self.slice(start, stop) for start, stop in zip(bounds, bounds[1:])]
+
+
+def target_set(value: str) -> TargetSet:
+    """
+    Parse the targets of a command argument, see :meth:`TargetSet.parse`.
+
+    Raises
+    ------
+    argparse.ArgumentTypeError
+        If the targets are not valid, or their file can not be read.
+    """
+    try:
+        targets = TargetSet.parse(value)
+    except (OSError, ValueError) as err:
+        raise argparse.ArgumentTypeError(str(err)) from None
+    if not targets:
+        raise argparse.ArgumentTypeError("No targets")
+    return targets
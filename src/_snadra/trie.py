@@ -0,0 +1,151 @@
+"""
+Prefix tree of strings.
+"""
+from typing import Dict, Iterable, Iterator, List, Tuple
+
+
+class _Node:
+    __slots__ = {
+        "children",
+        "is_word",
+    }
+
+    def __init__(self) -> None:
+        self.children: Dict[str, "_Node"] = {}
+        self.is_word = False
+
+
+class Trie:
+    """
+    Set of strings, that can be searched by prefix.
+
+    Finding the words with a prefix costs the length of the prefix plus the
+    number of words that are yielded, regardless of the size of the set.
+
+    Parameters
+    ----------
+    words : Iterable[str], optional
+        Initial words.
+
+    Examples
+    --------
+    >>> trie = Trie(["workspace", "workspaces", "help"])
+    >>> list(trie.iter_prefix("work"))
+    ['workspace', 'workspaces']
+    >>> "help" in trie, "hel" in trie
+    (True, False)
+    """
+
+    __slots__ = {
+        "_root",
+        "_size",
+    }
+
+    def __init__(self, words: Iterable[str] = ()) -> None:
+        self._root = _Node()
+        self._size = 0
+        for word in words:
+            self.add(word)
+
+    def add(self, word: str) -> bool:
+        """
+        Add a word.
+
+        Returns
+        -------
+        bool
+            Whether the word was added, `False` if it was already in the trie.
+        """
+        node = self._root
+        for char in word:
+            child = node.children.get(char)
+            if child is None:
+                child = node.children[char] = _Node()
+            node = child
+
+        if node.is_word:
+            return False
+        node.is_word = True
+        self._size += 1
+        return True
+
+    def discard(self, word: str) -> bool:
+        """
+        Remove a word, if it is in the trie.
+
+        Returns
+        -------
+        bool
+            Whether the word was removed.
+        """
+        path: List[Tuple[_Node, str]] = []
+        node = self._root
+        for char in word:
+            child = node.children.get(char)
+            if child is None:
+                return False
+            path.append((node, char))
+            node = child
+
+        if not node.is_word:
+            return False
+        node.is_word = False
+        self._size -= 1
+
+        # Prune the branch that leads only to the removed word.
+        for parent, char in reversed(path):
+            child = parent.children[char]
+            if child.is_word or child.children:
+                break
+            del parent.children[char]
+
+        return True
+
+    def iter_prefix(self, prefix: str = "") -> Iterator[str]:
+        """
+        Lazily iterate over the words that start with a prefix, in sorted order.
+
+        Parameters
+        ----------
+        prefix : str, optional
+            The prefix, every word starts with the empty prefix.
+
+        Yields
+        ------
+        str
+            Words that start with ``prefix``.
+        """
+        node = self._root
+        for char in prefix:
+            child = node.children.get(char)
+            if child is None:
+                return
+            node = child
+
+        stack = [(prefix, node)]
+        while stack:
+            word, node = stack.pop()
+            if node.is_word:
+                yield word
+            stack.extend(
+                (word + char, node.children[char])
+                for char in sorted(node.children, reverse=True)
+            )
+
+    def __contains__(self, word: object) -> bool:
+        if not isinstance(word, str):
+            return False
+
+        node = self._root
+        for char in word:
+            child = node.children.get(char)
+            if child is None:
+                return False
+            node = child
+        return node.is_word
+
+    def __iter__(self) -> Iterator[str]:
+        return self.iter_prefix()
+
+    def __len__(self) -> int:
+        return self._size
@@ -8,25 +8,183 @@ $ snadra
 or
 
 $ python -m snadra
+
+Scripts can be executed without the interactive prompt with:
+
+$ snadra -r script.rc
+
+or by piping them:
+
+$ snadra < script.rc
+
+The exit status of a script is 1 if any of its lines failed.
+
+The results can be written as JSON, JSON lines or TSV instead of tables, for
+other programs to read:
+
+$ snadra --output jsonl -r script.rc
+
+A single daemon can serve many operators, who share its commands, caches and
+database connections:
+
+$ snadra --daemon
+$ snadra --connect
 """
+import argparse
 import asyncio
+import pathlib
 import sys
+from typing import Any, Dict, List, Optional
+
+from _snadra import __version__
+from _snadra.output import OUTPUT_MODES
+
+
+def parse_args(argv: Optional[List[str]] = None) -> argparse.Namespace:
+    """
+    Parse the command line arguments.
+
+    Parameters
+    ----------
+    argv : List[str], optional
+        The arguments to parse, defaults to `sys.argv`.
+
+    Returns
+    -------
+    :class:`argparse.Namespace`
+        The parsed arguments.
+    """
+    parser = argparse.ArgumentParser(prog="snadra")
+    parser.add_argument("--version", action="version", version=__version__)
+    parser.add_argument(
+        "--reset-db",
+        action="store_true",
+        help="Drop all the database tables (and data!) and recreate them",
+    )
+    parser.add_argument(
+        "-r",
+        "--resource",
+        metavar="FILE",
+        type=argparse.FileType("r"),
+        help="Execute the commands in FILE ('-' for stdin) instead of the prompt",
+    )
+    mode = parser.add_mutually_exclusive_group()
+    mode.add_argument(
+        "--daemon",
+        action="store_true",
+        help="Serve the commands to the clients of a Unix socket",
+    )
+    mode.add_argument(
+        "--connect",
+        action="store_true",
+        help="Send the commands to a running daemon",
+    )
+    parser.add_argument(
+        "--socket",
+        metavar="PATH",
+        type=pathlib.Path,
+        help="Path of the daemon's socket (default: from the configuration)",
+    )
+    parser.add_argument(
+        "--reload",
+        action="store_true",
+        help="Reload the command modules when they change, while the prompt runs",
+    )
+    parser.add_argument(
+        "-o",
+        "--output",
+        choices=OUTPUT_MODES,
+        help="Format of the results of the commands (default: from the configuration)",
+    )
+    return parser.parse_args(argv)
+
 
-from _snadra.app import SnadraApplication
-from _snadra.db.config import async_session, engine
-from _snadra.db.utils import insert_default_rows, start_db
+def config_overrides(args: argparse.Namespace) -> Dict[str, Any]:
+    """
+    Get the configuration that the command line arguments override.
 
+    Examples
+    --------
+    >>> config_overrides(parse_args(["--reload", "-o", "json"]))
+    {'output': {'mode': 'json'}, 'reload': {'enabled': True}}
+    >>> config_overrides(parse_args([]))
+    {}
+    """
+    config: Dict[str, Any] = {}
+    if args.output is not None:
+        config["output"] = {"mode": args.output}
+    if args.reload:
+        config["reload"] = {"enabled": True}
+    return config
 
-async def main():
+
+async def main(args: argparse.Namespace):
+    if args.connect:
+        await connect(args)
+        return
+
+    # Imported here, so the arguments (like '--version') are handled before
+    # the heavy dependencies are loaded.
+    from _snadra.app import SnadraApplication
+    from _snadra.batch import print_report
+    from _snadra.config import get_config_service
+    from _snadra.db.config import async_session, get_engine
+    from _snadra.db.utils import insert_default_rows, start_db
+
+    get_config_service().override(config_overrides(args))
     app = SnadraApplication()
-    app._setup_prompt()
 
-    await asyncio.create_task(start_db(engine=engine))
+    await asyncio.create_task(start_db(engine=get_engine(), reset_db=args.reset_db))
     await asyncio.create_task(insert_default_rows(session=async_session))
+
+    if args.daemon:
+        await app.run_daemon(args.socket)
+        return
+
+    script = args.resource
+    if script is None and not sys.stdin.isatty():
+        script = sys.stdin
+
+    if script is not None:
+        with script:
+            report = await app.run_script(script)
+        print_report(report)
+        if report.errors:
+            sys.exit(1)
+        return
+
+    app._setup_prompt()
     await app.run()
 
 
+async def connect(args: argparse.Namespace) -> None:
+    """
+    Run as a thin client of a daemon, without loading the commands or the
+    database.
+    """
+    from _snadra.config import get_config_service
+    from _snadra.daemon import run_client
+
+    service = get_config_service()
+    service.override(config_overrides(args))
+    config = service.get()
+    socket_path = args.socket
+    if socket_path is None:
+        socket_path = pathlib.Path(config["daemon"]["socket_path"])
+
+    script = args.resource
+    if script is None and not sys.stdin.isatty():
+        script = sys.stdin
+
+    try:
+        await run_client(
+            socket_path.expanduser(), script=script, output=config["output"]["mode"]
+        )
+    except (ConnectionError, FileNotFoundError) as err:
+        sys.exit(f"Could not talk to the daemon on {socket_path}: {err}")
+
+
 if __name__ == "__main__":
     if sys.platform == "win32":
         asyncio.set_event_loop_policy(asyncio.WindowsSelectorEventLoopPolicy())
-    asyncio.run(main())
+    asyncio.run(main(parse_args()))
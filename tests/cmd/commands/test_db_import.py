@@ -0,0 +1,57 @@
+import argparse
+import pathlib
+
+import pytest
+from sqlalchemy.exc import DBAPIError
+
+import _snadra.cmd.commands.db_import as module
+from _snadra.db.cache import workspace_cache
+
+
+@pytest.fixture
+def no_import(monkeypatch):
+    async def import_nmap(*args, **kwargs):
+        pytest.fail("Nothing should be imported")
+
+    monkeypatch.setattr(module, "import_nmap", import_nmap)
+
+
+@pytest.mark.asyncio
+@pytest.mark.usefixtures("no_import")
+async def test_run_missing_workspace(capfd):
+    workspace_cache.set(("exists", "missing"), False)
+    args = argparse.Namespace(
+        path=pathlib.Path("scan.xml"), workspace="missing", batch_size=10
+    )
+    await module.Command().run(args)
+
+    assert "Workspace 'missing' does not exists!" in capfd.readouterr().out
+
+
+@pytest.mark.asyncio
+@pytest.mark.usefixtures("no_import")
+async def test_run_invalid_batch_size(capfd):
+    args = argparse.Namespace(
+        path=pathlib.Path("scan.xml"), workspace="default", batch_size=0
+    )
+    await module.Command().run(args)
+
+    assert "batch size must be positive" in capfd.readouterr().out
+
+
+@pytest.mark.asyncio
+async def test_run_database_error(capfd, monkeypatch):
+    async def import_nmap(*args, **kwargs):
+        raise DBAPIError("INSERT", {}, Exception("too many SQL variables"))
+
+    monkeypatch.setattr(module, "import_nmap", import_nmap)
+    monkeypatch.setattr(module, "get_engine", lambda: None)
+    workspace_cache.set(("exists", "default"), True)
+    args = argparse.Namespace(
+        path=pathlib.Path("scan.xml"), workspace="default", batch_size=10
+    )
+    await module.Command().run(args)
+
+    captured = capfd.readouterr()
+    assert "The import failed: too many SQL variables" in captured.out
+    assert "Traceback" not in captured.out + captured.err
@@ -0,0 +1,48 @@
+import argparse
+import json
+
+import pytest
+
+import _snadra.cmd.commands.help as module
+from _snadra.output import Output, set_output
+
+
+@pytest.fixture
+def command(commands):
+    """
+    Return the tested command.
+    """
+    return module.Command(commands=commands)
+
+
+class TestHelpCommand:
+    @pytest.mark.asyncio
+    async def test_run(self, capfd, command, commands):
+        args = argparse.Namespace(topic=None)
+        await command.run(args)
+
+        captured_out = capfd.readouterr().out
+        for keyword in commands.keywords:
+            assert keyword in captured_out
+
+    @pytest.mark.asyncio
+    async def test_run_topic(self, capfd, command):
+        args = argparse.Namespace(topic="quit")
+        await command.run(args)
+
+        assert "LONG HELP FOR EXIT COMMAND" in capfd.readouterr().out
+
+    @pytest.mark.asyncio
+    async def test_run_json(self, capfd, command, commands):
+        set_output(Output("json"))
+        await command.run(argparse.Namespace(topic=None))
+
+        records = json.loads(capfd.readouterr().out)
+        assert [record["keyword"] for record in records] == sorted(commands.keywords)
+
+    def test_topic_choices(self, command):
+        args = command.parser.parse_args(["workspaces"])
+        assert args.topic == "workspaces"
+
+        with pytest.raises(SystemExit):
+            command.parser.parse_args(["not_a_command"])
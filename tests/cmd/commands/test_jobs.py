@@ -0,0 +1,41 @@
+import argparse
+import asyncio
+
+import pytest
+
+from _snadra.cmd.base import Commands
+import _snadra.cmd.commands.jobs as module
+
+
+@pytest.fixture
+def command(tmp_path):
+    """
+    Return the tested command, with its own job manager.
+    """
+    commands = Commands(manifest_path=tmp_path / "manifest.json")
+    return module.Command(commands=commands)
+
+
+@pytest.mark.asyncio
+class TestJobsCommand:
+    async def test_run_list(self, capfd, command):
+        job = command.commands.jobs.submit(asyncio.sleep(60), name="sleepy")
+        await asyncio.sleep(0)
+        await command.run(argparse.Namespace(kill=None))
+
+        captured_out = capfd.readouterr().out
+        assert "sleepy" in captured_out
+        assert "running" in captured_out
+        await command.commands.jobs.shutdown()
+        assert job.status == "cancelled"
+
+    async def test_run_kill(self, command):
+        job = command.commands.jobs.submit(asyncio.sleep(60), name="sleepy")
+        await command.run(argparse.Namespace(kill=job.job_id))
+        await command.commands.jobs.join()
+
+        assert job.status == "cancelled"
+
+    async def test_run_kill_missing(self, capfd, command):
+        await command.run(argparse.Namespace(kill=1))
+        assert "No running job with id 1" in capfd.readouterr().out
@@ -0,0 +1,80 @@
+import argparse
+import io
+import json
+import tracemalloc
+
+import pytest
+
+from _snadra.cmd.base import Commands
+import _snadra.cmd.commands.stats as module
+from _snadra.output import Output, set_output
+
+
+@pytest.fixture
+def command(tmp_path):
+    """
+    Return the tested command, with a few samples.
+    """
+    commands = Commands(manifest_path=tmp_path / "manifest.json")
+    commands.stats.record("help", "total_ms", 1.5)
+    commands.stats.record("workspace", "total_ms", 2.5)
+    return module.Command(commands=commands)
+
+
+def namespace(**kwargs):
+    defaults = {"keyword": None, "json_path": None, "reset": False, "allocations": None}
+    defaults.update(kwargs)
+    return argparse.Namespace(**defaults)
+
+
+@pytest.mark.asyncio
+class TestStatsCommand:
+    async def test_run_table(self, capfd, command):
+        await command.run(namespace())
+        captured_out = capfd.readouterr().out
+        assert "help" in captured_out
+        assert "workspace" in captured_out
+        assert "total_ms" in captured_out
+
+    async def test_run_tsv(self, capfd, command):
+        set_output(Output("tsv"))
+        await command.run(namespace())
+
+        lines = capfd.readouterr().out.splitlines()
+        assert lines[0] == "keyword\tmetric\tcount\tp50\tp95\tp99\tmax"
+        assert "help\ttotal_ms\t1\t1.5\t1.5\t1.5\t1.5" in lines
+
+    async def test_run_json(self, tmp_path, command):
+        path = tmp_path / "stats.json"
+        await command.run(namespace(keyword="help", json_path=str(path)))
+
+        summary = json.loads(path.read_text())
+        assert list(summary) == ["help"]
+        assert summary["help"]["total_ms"]["max"] == 1.5
+
+    async def test_run_json_error(self, tmp_path, capfd, command):
+        # A directory cannot be written to.
+        await command.run(namespace(json_path=str(tmp_path)))
+
+        captured = capfd.readouterr()
+        assert "Error" in captured.out
+        assert "Traceback" not in captured.out + captured.err
+
+    async def test_run_json_output(self, capfd, command):
+        file_obj = io.StringIO()
+        set_output(Output("rich", file=file_obj))
+        await command.run(namespace(json_path="-"))
+
+        assert json.loads(file_obj.getvalue())["workspace"]["total_ms"]["count"] == 1
+        assert capfd.readouterr().out == ""
+
+    async def test_run_reset(self, command):
+        await command.run(namespace(reset=True))
+        assert command.commands.stats.summary() == {}
+
+    async def test_run_allocations(self, command):
+        await command.run(namespace(allocations="on"))
+        assert command.commands.stats.track_allocations
+        await command.run(namespace(allocations="off"))
+        assert not command.commands.stats.track_allocations
+        assert not tracemalloc.is_tracing()
@@ -0,0 +1,76 @@
+import argparse
+import collections
+import datetime
+import json
+
+import pytest
+
+import _snadra.cmd.commands.workspace as module
+from _snadra.db.cache import workspace_cache
+from _snadra.output import Output, set_output
+
+WorkspaceRow = collections.namedtuple(
+    "WorkspaceRow", ["name", "description", "created_at", "updated_at"]
+)
+
+
+@pytest.fixture
+def workspaces():
+    """
+    Fill the workspace cache with a page.
+    """
+    created_at = datetime.datetime(2021, 7, 3, tzinfo=datetime.timezone.utc)
+    rows = [
+        WorkspaceRow(f"workspace_{i:03}", "", created_at, None)
+        for i in range(module.PARTITION_SIZE + 1)
+    ]
+    workspace_cache.set(("page", 100, None, None), rows)
+    return rows
+
+
+class TestWorkspaceCache:
+    @pytest.mark.asyncio
+    async def test_list_workspaces_cached(self, workspaces, no_session):
+        partitions = module.Command.list_workspaces(async_session=no_session, limit=100)
+        result = [partition async for partition in partitions]
+
+        assert [len(partition) for partition in result] == [module.PARTITION_SIZE, 1]
+        assert sum(result, []) == workspaces
+
+    @pytest.mark.asyncio
+    async def test_show_workspaces_next_page_hint(self, capfd, workspaces):
+        args = argparse.Namespace(limit=len(workspaces), after=None, prefix=None)
+        workspace_cache.set(("page", len(workspaces), None, None), workspaces)
+        await module.Command.show_workspaces(args)
+
+        captured_out = capfd.readouterr().out
+        assert f"--after {workspaces[-1].name}" in captured_out
+
+
+@pytest.mark.asyncio
+async def test_show_workspaces_rich(capfd, workspaces):
+    args = argparse.Namespace(limit=100, after=None, prefix=None)
+    await module.Command.show_workspaces(args)
+
+    captured_out = capfd.readouterr().out
+    # The partitions continue the first table.
+    assert captured_out.count("Workspaces") == 1
+    assert captured_out.count("Created at") == 1
+    assert "03/07/2021, 00:00:00" in captured_out
+
+
+@pytest.mark.asyncio
+async def test_show_workspaces_jsonl(capfd, workspaces):
+    args = argparse.Namespace(limit=len(workspaces), after=None, prefix=None)
+    workspace_cache.set(("page", len(workspaces), None, None), workspaces)
+    # The test runs in its own task, the output does not leak.
+    set_output(Output("jsonl"))
+    await module.Command.show_workspaces(args)
+
+    captured = capfd.readouterr()
+    records = [json.loads(line) for line in captured.out.splitlines()]
+    assert [record["name"] for record in records] == [w.name for w in workspaces]
+    assert records[0]["created_at"] == "2021-07-03T00:00:00+00:00"
+    assert records[0]["updated_at"] is None
+    # The next page hint is not a record.
+    assert "--after" in captured.err
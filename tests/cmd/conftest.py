@@ -4,8 +4,13 @@ from _snadra.cmd.base import Commands
 
 
 @pytest.fixture(scope="session")
-def commands():
-    return Commands()
+def manifest_path(tmp_path_factory):
+    return tmp_path_factory.mktemp("cache") / "commands_manifest.json"
+
+
+@pytest.fixture(scope="session")
+def commands(manifest_path):
+    return Commands(manifest_path=manifest_path)
 
 
 @pytest.fixture(scope="session")
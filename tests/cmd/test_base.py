@@ -5,13 +5,15 @@ from hypothesis import assume, given
 import hypothesis.strategies as st
 import pytest
 
+from _snadra.cmd.base import Commands
+
 
 class TestCommands:
     def test_keywords(self, commands):
         """
         Test if all the expected keywords of the commands, are in `Commands.keywords`.
         """
-        expected = {"exit", "help", "workspace"}
+        expected = {"db_import", "exit", "help", "jobs", "stats", "workspace"}
         result = commands.keywords
 
         assert result == expected
@@ -47,7 +49,7 @@ class TestCommands:
                 continue
             seen_commands.add(command)
             result.append(command.keyword)
-            for alias in command.aliases:
+            for alias in command.aliases or ():
                 result.append(alias)
 
         expected = list(set(result))
@@ -58,3 +60,64 @@ class TestCommands:
         assume(keyword not in commands.all_keywords)
         result = commands.get_command(keyword)
         assert result is None
+
+    @pytest.mark.parametrize("keyword", ["exit", "help", "workspace"])
+    def test_get_command_cached(self, keyword, commands):
+        """
+        Check that the same instance (and parser) is reused between calls.
+        """
+        first = commands.get_command(keyword)
+        second = commands.get_command(keyword)
+
+        assert first is second
+        assert first.parser is second.parser
+
+    def test_get_command_alias_shares_instance(self, commands):
+        assert commands.get_command("quit") is commands.get_command("exit")
+
+    def test_invalidate(self, commands):
+        before = commands.get_command("exit")
+        commands.invalidate("quit")
+        after = commands.get_command("exit")
+
+        assert before is not after
+        assert commands.get_command("exit") is after
+
+    def test_register_replaces_command(self, manifest_path):
+        commands = Commands(manifest_path=manifest_path)
+        original = commands.get_command("exit")
+
+        class Command(type(original)):  # type: ignore[misc]
+            aliases = {"bye"}
+
+        commands.register(Command)
+
+        assert "quit" not in commands.aliases
+        assert "bye" in commands.aliases
+        assert isinstance(commands.get_command("bye"), Command)
+        assert commands.get_command("exit") is not original
+
+    def test_register_invalidates_on_new_keyword(self, manifest_path):
+        commands = Commands(manifest_path=manifest_path)
+        help_command = commands.get_command("help")
+        exit_command = commands.get_command("exit")
+
+        class Command(type(exit_command)):  # type: ignore[misc]
+            aliases = {"quit"}
+
+        # The same keywords, only the replaced command is invalidated.
+        commands.register(Command)
+        assert commands.get_command("help") is help_command
+
+        class Other(Command):
+            keyword = "other"
+            aliases = {"another"}
+
+        commands.register(Other)
+        new_help_command = commands.get_command("help")
+        assert new_help_command is not None
+        assert new_help_command is not help_command
+        assert new_help_command.parser.parse_args(["other"]).topic == "other"
+
+        commands.unregister("other")
+        assert commands.get_command("help") is not new_help_command
@@ -0,0 +1,125 @@
+import pathlib
+import sys
+import textwrap
+
+import pytest
+
+from _snadra.cmd.base import CORE_PACKAGE, Commands
+from _snadra.cmd.loader import CommandRoot, load_module
+
+SOURCE = textwrap.dedent(
+    """
+    from _snadra.cmd.utils import CommandMeta
+    {imports}
+
+
+    class Command(CommandMeta):
+        keyword = {keyword!r}
+        aliases = None
+        description = "Return a value"
+        long_help = ""
+
+        async def run(self, args):
+            return {result}
+    """
+)
+
+
+def write_module(path, keyword, result="None", imports=""):
+    path.parent.mkdir(parents=True, exist_ok=True)
+    path.write_text(SOURCE.format(keyword=keyword, result=result, imports=imports))
+
+
+@pytest.fixture
+def roots(tmp_path):
+    first = tmp_path / "first"
+    second = tmp_path / "second-plugins"
+    write_module(first / "scan.py", "scan_first", result="'first'")
+    write_module(second / "scan.py", "scan_second", result="'second'")
+    (second / "tools").mkdir()
+    (second / "tools" / "shared.py").write_text("VALUE = 'shared'\n")
+    write_module(
+        second / "tools" / "probe.py",
+        "probe",
+        result="VALUE",
+        imports="from .shared import VALUE",
+    )
+    return first, second
+
+
+@pytest.fixture
+def commands(tmp_path, roots):
+    first, second = roots
+    return Commands(
+        path=first, plugin_paths=[second], manifest_path=tmp_path / "manifest.json"
+    )
+
+
+async def run(commands, keyword):
+    command = commands.get_command(keyword)
+    return await command.run(command.parser.parse_args([]))
+
+
+def test_plugin_root_name(tmp_path):
+    root = CommandRoot.plugin(tmp_path / "my-plugins")
+    assert root.package.startswith("_snadra.plugins.my_plugins_")
+    assert CommandRoot.plugin(tmp_path / "my-plugins") == root
+    assert CommandRoot.plugin(tmp_path / "other" / "my-plugins") != root
+
+
+@pytest.mark.asyncio
+async def test_same_file_names_do_not_collide(commands):
+    assert commands.keywords == {"scan_first", "scan_second", "probe"}
+    assert await run(commands, "scan_first") == "first"
+    assert await run(commands, "scan_second") == "second"
+
+    first, second = (commands.get_command(k) for k in ["scan_first", "scan_second"])
+    assert type(first).__module__ != type(second).__module__
+    assert type(second).__module__ in sys.modules
+
+
+@pytest.mark.asyncio
+async def test_relative_imports(commands, roots):
+    assert await run(commands, "probe") == "shared"
+
+    # The helper module is not a command, and it is not imported again.
+    entry = commands.manifest.get(roots[1] / "tools" / "shared.py")
+    assert entry.keyword == ""
+
+
+def test_later_root_replaces_keyword(tmp_path, roots):
+    first, second = roots
+    write_module(second / "scan.py", "scan_first", result="'second'")
+
+    commands = Commands(
+        path=first, plugin_paths=[second], manifest_path=tmp_path / "manifest.json"
+    )
+    entry = commands.get_entry("scan_first")
+    assert entry is not None
+    assert entry.path == str(second / "scan.py")
+
+
+def test_core_modules_imported_once(manifest_path):
+    commands = Commands(manifest_path=manifest_path)
+    command = commands.get_command("help")
+
+    assert type(command).__module__ == f"{CORE_PACKAGE}.help"
+    entry = commands.get_entry("help")
+    assert entry is not None
+    assert (
+        commands.load_module(pathlib.Path(entry.path))
+        is sys.modules[f"{CORE_PACKAGE}.help"]
+    )
+
+
+def test_load_module_restores_previous(tmp_path):
+    path = tmp_path / "module.py"
+    path.write_text("VALUE = 1\n")
+    module = load_module(path, name="_snadra_test_module")
+    try:
+        path.write_text("raise RuntimeError\n")
+        with pytest.raises(RuntimeError):
+            load_module(path, name="_snadra_test_module", reload=True)
+        assert sys.modules["_snadra_test_module"] is module
+    finally:
+        del sys.modules["_snadra_test_module"]
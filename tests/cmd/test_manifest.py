@@ -0,0 +1,168 @@
+import os
+import textwrap
+
+import pytest
+
+from _snadra.cmd.base import Commands
+from _snadra.cmd.manifest import Manifest, extract_metadata
+
+MODULE_SOURCE = textwrap.dedent(
+    """
+    import module_that_does_not_exist
+
+    class Command:
+        keyword = "lazy"
+        aliases = {"idle"}
+        description = "Never imported"
+        long_help = "LONG HELP FOR LAZY COMMAND"
+    """
+)
+
+
+@pytest.fixture
+def lazy_dir(tmp_path):
+    commands_dir = tmp_path / "commands"
+    commands_dir.mkdir()
+    (commands_dir / "lazy.py").write_text(MODULE_SOURCE)
+    return commands_dir
+
+
+@pytest.mark.parametrize(
+    "source",
+    [
+        "",
+        "class NotCommand:\n    keyword = 'a'\n    description = 'b'\n",
+        "class Command:\n    keyword = get_keyword()\n    description = 'b'\n",
+        "class Command:\n    keyword = 'a'\n",
+        "class Command(:\n",
+        "class Command:\n    keyword = 'a'\n    aliases = {[]}\n",
+        "from other import Command\n",
+    ],
+)
+def test_extract_metadata_invalid(source):
+    assert extract_metadata(source.encode()) is None
+
+
+def test_extract_metadata():
+    result = extract_metadata(MODULE_SOURCE.encode())
+    expected = {
+        "keyword": "lazy",
+        "aliases": frozenset({"idle"}),
+        "description": "Never imported",
+        "long_help": "LONG HELP FOR LAZY COMMAND",
+    }
+    assert result == expected
+
+
+def test_manifest_persisted(lazy_dir, tmp_path):
+    manifest_path = tmp_path / "manifest.json"
+    module_path = lazy_dir / "lazy.py"
+
+    manifest = Manifest(path=manifest_path)
+    entry = manifest.get(module_path)
+    manifest.save()
+
+    assert entry is not None
+    assert manifest_path.is_file()
+    assert Manifest(path=manifest_path).entries == manifest.entries
+    assert entry.keyword == "lazy"
+
+
+def test_manifest_rebuilt_on_change(lazy_dir):
+    module_path = lazy_dir / "lazy.py"
+    manifest = Manifest()
+    before = manifest.get(module_path)
+    assert before is not None
+
+    module_path.write_text(MODULE_SOURCE.replace('"lazy"', '"eager"'))
+    stat = module_path.stat()
+    os.utime(module_path, ns=(stat.st_atime_ns, before.mtime_ns + 1))
+    after = manifest.get(module_path)
+
+    assert after is not None
+    assert before.keyword == "lazy"
+    assert after.keyword == "eager"
+
+
+def test_manifest_same_content_not_extracted(lazy_dir, monkeypatch):
+    module_path = lazy_dir / "lazy.py"
+    manifest = Manifest()
+    before = manifest.get(module_path)
+    assert before is not None
+
+    stat = module_path.stat()
+    os.utime(module_path, ns=(stat.st_atime_ns, before.mtime_ns + 1))
+    monkeypatch.setattr(
+        "_snadra.cmd.manifest.extract_metadata", pytest.fail, raising=True
+    )
+    after = manifest.get(module_path)
+
+    assert after is not None
+    assert after.mtime_ns == before.mtime_ns + 1
+    assert after._replace(mtime_ns=before.mtime_ns) == before
+
+
+def test_manifest_corrupted(tmp_path):
+    manifest_path = tmp_path / "manifest.json"
+    manifest_path.write_text("{not json")
+
+    assert Manifest(path=manifest_path).entries == {}
+
+
+def test_commands_lazy_import(lazy_dir, tmp_path):
+    commands = Commands(path=lazy_dir, manifest_path=tmp_path / "manifest.json")
+
+    assert commands.keywords == {"lazy"}
+    assert commands.aliases == {"idle"}
+    entry = commands.get_entry("idle")
+    assert entry is not None
+    assert entry.description == "Never imported"
+
+    # The module is imported only when the command is requested.
+    with pytest.raises(ModuleNotFoundError, match="module_that_does_not_exist"):
+        commands.get_command("lazy")
+
+
+def test_manifest_get_many(lazy_dir, tmp_path):
+    (lazy_dir / "helper.py").write_text("VALUE = 1\n")
+    (lazy_dir / "broken.py").write_text("class Command(:\n")
+    for index in range(4):
+        (lazy_dir / f"lazy_{index}.py").write_text(
+            MODULE_SOURCE.replace('"lazy"', f'"lazy_{index}"')
+        )
+    paths = sorted(lazy_dir.iterdir())
+
+    manifest = Manifest(path=tmp_path / "manifest.json")
+    entries = manifest.get_many(paths, max_workers=2)
+
+    # The helper module has to be imported to know that it has no command.
+    assert [entry and entry.keyword for entry in entries] == [
+        None,
+        None,
+        "lazy",
+        "lazy_0",
+        "lazy_1",
+        "lazy_2",
+        "lazy_3",
+    ]
+    assert entries == [manifest.get(path) for path in paths]
+
+
+def test_commands_import_fallback(lazy_dir, tmp_path, capfd):
+    (lazy_dir / "reexport.py").write_text(
+        MODULE_SOURCE.replace("import module_that_does_not_exist", "")
+        .replace("class Command", "class Reexported")
+        .replace('"lazy"', '"reexported"')
+        + "\nCommand = Reexported\n"
+    )
+    (lazy_dir / "helper.py").write_text("import os\n")
+    (lazy_dir / "broken.py").write_text("raise RuntimeError('broken plugin')\n")
+    manifest_path = tmp_path / "manifest.json"
+
+    commands = Commands(path=lazy_dir, manifest_path=manifest_path)
+    assert commands.keywords == {"lazy", "reexported"}
+    assert "Failed to load commands from broken.py" in capfd.readouterr().out
+
+    entry = Manifest(path=manifest_path).get(lazy_dir / "helper.py")
+    assert entry is not None
+    assert entry.keyword == ""
@@ -2,9 +2,13 @@
 Testing for the functions and classes that are in:
     snadra/commands/__init__.py
 """
+import shlex
+
+from hypothesis import given
+import hypothesis.strategies as st
 import pytest
 
-from _snadra.cmd.parsers import dispatch_line, parse_line
+from _snadra.cmd.parsers import dispatch_line, parse_line, tokenize
 
 
 class TestCommandParser:
@@ -97,3 +101,80 @@ class TestCommandParser:
     def test_parse_line_shlex_split(self, line):
         result = parse_line(line)
         assert result is None
+
+    @pytest.mark.asyncio
+    async def test_dispatch_line_background(self, capfd, commands):
+        await dispatch_line("help exit &", commands=commands)
+        [job] = commands.jobs.active()
+        await commands.jobs.join()
+
+        captured_out = capfd.readouterr().out
+        assert f"Started job {job.job_id}: help exit" in captured_out
+        assert "LONG HELP FOR EXIT COMMAND" in captured_out
+        assert job.status == "done"
+
+
+def shlex_split(line):
+    """
+    Return the tokens of ``shlex.split``, or the message of its error.
+    """
+    try:
+        return list(shlex.split(line))
+    except ValueError as err:
+        return err.args[0]
+
+
+def tokens(line):
+    try:
+        return list(tokenize(line))
+    except ValueError as err:
+        return err.args[0]
+
+
+class TestTokenize:
+    @given(line=st.text(alphabet=" \t\r\n\\'\"ab-=&"))
+    def test_same_as_shlex_quoting(self, line):
+        assert tokens(line) == shlex_split(line)
+
+    @given(line=st.text())
+    def test_same_as_shlex(self, line):
+        assert tokens(line) == shlex_split(line)
+
+    @given(words=st.lists(st.text(min_size=1), min_size=1))
+    def test_round_trip(self, words):
+        assert tokens(shlex.join(words)) == words
+
+    @pytest.mark.parametrize(
+        "line, expected",
+        [
+            ("a\u00a0b", ["a\u00a0b"]),  # Not whitespace for shlex
+            ("a '' b", ["a", "", "b"]),
+            ("a'b'\"c\"\\ d", ["abc d"]),
+            ('"\\a \\" \\\\"', ['\\a " \\']),
+        ],
+    )
+    def test_tokenize(self, line, expected):
+        assert list(tokenize(line)) == expected
+
+    @pytest.mark.parametrize(
+        "line, message",
+        [("'a", "No closing quotation"), ("a\\", "No escaped character")],
+    )
+    def test_tokenize_invalid(self, line, message):
+        with pytest.raises(ValueError, match=message):
+            tokenize(line)
+
+    def test_tokenize_cached(self):
+        line = "workspace --add cached"
+        assert tokenize(line) is tokenize(line)
+
+    def test_parse_line_copies(self):
+        line = "workspace --add copied"
+        pline = parse_line(line)
+        assert pline is not None
+        pline.append("&")
+        assert parse_line(line) == ["workspace", "--add", "copied"]
+
+    def test_parse_line_invalid(self, capfd):
+        assert parse_line("workspace 'a") is None
+        assert "No closing quotation" in capfd.readouterr().out
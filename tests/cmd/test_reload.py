@@ -0,0 +1,146 @@
+import asyncio
+
+import pytest
+
+from _snadra.cmd.base import Commands
+from _snadra.cmd.reload import CommandsWatcher, snapshot
+from _snadra.completion import SnadraCompleter
+
+SOURCE = """
+from _snadra.cmd.utils import CommandMeta
+
+
+class Command(CommandMeta):
+    keyword = {keyword!r}
+    aliases = {aliases!r}
+    description = "Return a number"
+    long_help = ""
+
+    async def run(self, args):
+        return {result!r}
+"""
+
+
+def write_module(path, keyword="greet", aliases=None, result=1):
+    path.write_text(SOURCE.format(keyword=keyword, aliases=aliases, result=result))
+
+
+@pytest.fixture
+def commands_dir(tmp_path):
+    commands_dir = tmp_path / "commands"
+    commands_dir.mkdir()
+    write_module(commands_dir / "greet.py")
+    write_module(commands_dir / "other.py", keyword="other")
+    return commands_dir
+
+
+@pytest.fixture
+def commands(tmp_path, commands_dir):
+    return Commands(path=commands_dir, manifest_path=tmp_path / "manifest.json")
+
+
+async def run(commands, keyword):
+    command = commands.get_command(keyword)
+    return await command.run(command.parser.parse_args([]))
+
+
+class TestReload:
+    @pytest.mark.asyncio
+    async def test_modified(self, commands, commands_dir):
+        assert await run(commands, "greet") == 1
+        other = commands.get_command("other")
+
+        write_module(commands_dir / "greet.py", result=2)
+        assert commands.reload(commands_dir / "greet.py") == {"greet"}
+
+        assert await run(commands, "greet") == 2
+        # The keywords are the same, the other commands are left as they were.
+        assert commands.get_command("other") is other
+
+        write_module(commands_dir / "greet.py", aliases={"hello"}, result=3)
+        commands.reload(commands_dir / "greet.py")
+
+        assert await run(commands, "hello") == 3
+        assert commands.get_command("other") is not other
+
+    def test_keyword_changed(self, commands, commands_dir):
+        write_module(commands_dir / "greet.py", keyword="welcome", aliases={"hi"})
+        commands.reload(commands_dir / "greet.py")
+
+        assert commands.keywords == {"welcome", "other"}
+        assert commands.aliases == {"hi"}
+
+    def test_added(self, commands, commands_dir):
+        write_module(commands_dir / "new.py", keyword="new")
+        assert commands.reload(commands_dir / "new.py") == {"new"}
+        assert commands.is_valid_keyword("new")
+
+    def test_removed(self, commands, commands_dir):
+        (commands_dir / "greet.py").unlink()
+        assert commands.reload(commands_dir / "greet.py") == set()
+        assert commands.keywords == {"other"}
+        assert not commands.manifest.entries.get(str(commands_dir / "greet.py"))
+
+    def test_broken_keeps_previous(self, commands, commands_dir):
+        before = commands.get_command("greet")
+        (commands_dir / "greet.py").write_text("class Command(:\n")
+
+        with pytest.raises(SyntaxError):
+            commands.reload(commands_dir / "greet.py")
+        assert commands.get_command("greet") is before
+
+    def test_unregister(self, commands):
+        assert commands.unregister("greet")
+        assert not commands.unregister("greet")
+        assert commands.get_command("greet") is None
+
+
+class TestCommandsWatcher:
+    def test_apply_reports_errors(self, capfd, commands, commands_dir):
+        (commands_dir / "greet.py").write_text("class Command(:\n")
+        write_module(commands_dir / "other.py", keyword="another")
+
+        CommandsWatcher(commands).apply(
+            [
+                commands_dir / "greet.py",
+                commands_dir / "other.py",
+                commands_dir / "a.txt",
+            ]
+        )
+
+        captured_out = capfd.readouterr().out
+        assert "Failed to reload greet.py" in captured_out
+        assert "Reloaded another from other.py" in captured_out
+        assert commands.keywords == {"greet", "another"}
+
+    @pytest.mark.asyncio
+    async def test_polling(self, commands, commands_dir):
+        completer = SnadraCompleter(commands)
+        watcher = CommandsWatcher(commands, interval=0.01, force_polling=True)
+        watcher.start()
+        try:
+            # Let the watcher take its first snapshot.
+            await asyncio.sleep(0.1)
+            write_module(commands_dir / "new.py", keyword="new")
+            (commands_dir / "greet.py").unlink()
+            for _ in range(100):
+                if commands.keywords == {"new", "other"}:
+                    break
+                await asyncio.sleep(0.01)
+        finally:
+            await watcher.stop()
+
+        assert commands.keywords == {"new", "other"}
+        assert list(completer.keywords.iter_prefix("n")) == ["new"]
+
+
+def test_snapshot_recursive(tmp_path, commands_dir):
+    plugins = tmp_path / "plugins"
+    (plugins / "sub").mkdir(parents=True)
+    write_module(plugins / "sub" / "nested.py", keyword="nested")
+
+    assert set(snapshot([commands_dir, plugins])) == {
+        commands_dir / "greet.py",
+        commands_dir / "other.py",
+        plugins / "sub" / "nested.py",
+    }
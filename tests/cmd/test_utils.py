@@ -21,3 +21,18 @@ def test_iter_dir_include_suffix(modules_dir):
     ]
     expected = ["module_4.txt"]
     assert sorted(result) == sorted(expected)
+
+
+def test_iter_dir_recursive(tmp_path):
+    for name in ["b.py", "sub/a.py", "sub/deeper/c.py", ".hidden/d.py"]:
+        (tmp_path / name).parent.mkdir(parents=True, exist_ok=True)
+        (tmp_path / name).touch()
+    (tmp_path / "__pycache__").mkdir()
+    (tmp_path / "__pycache__" / "e.py").touch()
+
+    result = [
+        path.relative_to(tmp_path).as_posix()
+        for path in iter_dir(tmp_path, recursive=True)
+    ]
+    assert result == ["b.py", "sub/a.py", "sub/deeper/c.py"]
+    assert [path.name for path in iter_dir(tmp_path)] == ["b.py"]
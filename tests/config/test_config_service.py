@@ -0,0 +1,117 @@
+import os
+import pathlib
+from typing import List
+
+import pytest
+import rtoml
+
+from _snadra.config import DEFAULT_CONFIG, ConfigService, parse_env
+
+
+@pytest.fixture
+def config_file(tmp_path):
+    path = tmp_path / "snadra_config.toml"
+    path.write_text('[database]\npool_size = 20\nhost = "db.local"\n')
+    return path
+
+
+@pytest.fixture
+def service(tmp_path, config_file):
+    return ConfigService(
+        path=config_file,
+        workspaces_dir=tmp_path / "workspaces",
+        environ={"SNADRA_DATABASE__PORT": "5433", "SNADRA_HISTORY__MAX_LINES": "10"},
+    )
+
+
+def touch(path, text):
+    """
+    Write a file, and make sure its modification time changes.
+    """
+    stat = path.stat() if path.exists() else None
+    path.write_text(text)
+    if stat is not None:
+        os.utime(path, ns=(stat.st_atime_ns, stat.st_mtime_ns + 1_000_000))
+
+
+def test_layers(service):
+    config = service.get()["database"]
+
+    assert config["pool_size"] == 20
+    assert config["port"] == 5433
+    assert config["user"] == DEFAULT_CONFIG["database"]["user"]
+    assert service.get()["history"]["max_lines"] == 10
+
+
+def test_snapshot_is_immutable(service):
+    with pytest.raises(TypeError):
+        service.get()["database"]["port"] = 1
+    assert isinstance(service.get()["plugins"]["paths"], tuple)
+
+
+def test_parse_env_invalid_toml():
+    assert parse_env({"SNADRA_DATABASE__HOST": "not toml"}) == {
+        "database": {"host": "not toml"}
+    }
+    assert parse_env({"SNADRA__PORT": "1", "SNADRA_DATABASE__": "1"}) == {}
+
+
+def test_refresh_only_on_change(service, config_file, monkeypatch):
+    snapshot = service.get()
+    assert not service.refresh()
+    assert service.get() is snapshot
+
+    parsed: List[pathlib.Path] = []
+
+    def parse_config_file(path):
+        parsed.append(path)
+        return rtoml.loads(path.read_text())
+
+    monkeypatch.setattr("_snadra.config.service.parse_config_file", parse_config_file)
+    touch(config_file, "[database]\npool_size = 30\n")
+    assert service.refresh()
+    assert parsed == [config_file]
+    assert service.get()["database"]["pool_size"] == 30
+    # The environment still takes precedence.
+    assert service.get()["database"]["port"] == 5433
+
+
+def test_refresh_invalid_file_keeps_previous(service, config_file):
+    touch(config_file, "[database\n")
+    with pytest.raises(rtoml.TomlParsingError):
+        service.refresh()
+
+    assert service.get()["database"]["pool_size"] == 20
+    # The broken file is not parsed again until it changes.
+    assert not service.refresh()
+
+
+def test_override(service, config_file):
+    service.override({"database": {"pool_size": 40}})
+    assert service.get()["database"]["pool_size"] == 40
+
+    # The overrides win over the files.
+    touch(config_file, "[database]\npool_size = 30\nport = 5433\n")
+    assert service.refresh()
+    assert service.get()["database"]["pool_size"] == 40
+    assert service.get()["database"]["port"] == 5433
+
+
+def test_workspace(service, tmp_path):
+    workspaces_dir = tmp_path / "workspaces"
+    workspaces_dir.mkdir()
+    assert service.get("engagement")["database"]["pool_size"] == 20
+
+    touch(service.workspace_path("engagement"), "[jobs]\nmax_concurrent = 1\n")
+    assert service.get("engagement")["jobs"]["max_concurrent"] == 4
+    assert service.refresh()
+
+    assert service.get("engagement")["jobs"]["max_concurrent"] == 1
+    assert service.get("default")["jobs"]["max_concurrent"] == 4
+    assert service.get()["jobs"]["max_concurrent"] == 4
+
+
+@pytest.mark.parametrize("workspace", ["../engagement", "a/b", "/etc/passwd", ".."])
+def test_workspace_path_stays_in_directory(service, tmp_path, workspace):
+    path = service.workspace_path(workspace)
+    assert path.parent == tmp_path / "workspaces"
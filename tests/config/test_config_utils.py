@@ -0,0 +1,34 @@
+import pytest
+
+from _snadra.config import DEFAULT_CONFIG, load_config, merge_config
+
+
+@pytest.fixture
+def config_file(tmp_path):
+    path = tmp_path / "snadra_config.toml"
+    path.write_text('[database]\npool_size = 20\nhost = "db.local"\n')
+    return path
+
+
+def test_merge_config_does_not_mutate():
+    base = {"a": {"b": 1, "c": 2}}
+    override = {"a": {"b": 3}, "d": 4}
+    result = merge_config(base, override)
+
+    assert result == {"a": {"b": 3, "c": 2}, "d": 4}
+    assert base == {"a": {"b": 1, "c": 2}}
+
+
+def test_load_config_missing_file(tmp_path):
+    result = load_config(tmp_path / "missing.toml")
+
+    assert result == DEFAULT_CONFIG
+    assert result is not DEFAULT_CONFIG
+
+
+def test_load_config(config_file):
+    result = load_config(config_file)["database"]
+
+    assert result["pool_size"] == 20
+    assert result["host"] == "db.local"
+    assert result["user"] == DEFAULT_CONFIG["database"]["user"]
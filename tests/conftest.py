@@ -1,6 +1,9 @@
 import os
 
 from hypothesis import Verbosity, settings
+import pytest
+
+from _snadra.db.cache import workspace_cache
 
 hypothesis_profile = os.getenv("HYPOTHESIS_PROFILE", "default").lower()
 
@@ -9,3 +12,25 @@ settings.register_profile("dev", max_examples=10)
 settings.register_profile("debug", max_examples=10, verbosity=Verbosity.verbose)
 
 settings.load_profile(hypothesis_profile)
+
+
+@pytest.fixture(autouse=True)
+def clear_workspace_cache():
+    """
+    Start and end every test with an empty workspace cache.
+    """
+    workspace_cache.clear()
+    yield
+    workspace_cache.clear()
+
+
+@pytest.fixture
+def no_session():
+    """
+    Return a session factory that fails the test, for the cached queries.
+    """
+
+    def no_session():
+        pytest.fail("The database should not be queried")
+
+    return no_session
@@ -0,0 +1,118 @@
+import functools
+import io
+import pathlib
+import threading
+from typing import AsyncGenerator, List
+
+import pytest
+
+from _snadra.db.bulk import batched, file_format, read_batches, read_workspaces
+
+
+@pytest.mark.parametrize(
+    "name, expected",
+    [("a.csv", "csv"), ("a.CSV", "csv"), ("a.jsonl", "jsonl")],
+)
+def test_file_format(name, expected):
+    assert file_format(pathlib.Path(name)) == expected
+
+
+@pytest.mark.parametrize("name", ["a", "a.txt", "a.json"])
+def test_file_format_unsupported(name):
+    with pytest.raises(ValueError, match="Unsupported file format"):
+        file_format(pathlib.Path(name))
+
+
+def test_batched_lazy():
+    def records():
+        yield from range(3)
+        pytest.fail("Read more than needed")
+
+    batches = batched(records(), 3)
+    assert next(batches) == [0, 1, 2]
+
+
+def test_read_workspaces_csv():
+    file_obj = io.StringIO("name,description\na,first\nb,\n")
+    result = list(read_workspaces(file_obj, "csv"))
+
+    assert result == [("a", "first"), ("b", "")]
+
+
+def test_read_workspaces_jsonl():
+    file_obj = io.StringIO('{"name": "a", "description": "first"}\n\n{"name": "b"}\n')
+    result = list(read_workspaces(file_obj, "jsonl"))
+
+    assert result == [("a", "first"), ("b", "")]
+
+
+@pytest.mark.parametrize(
+    "content, fmt, message",
+    [
+        ("name,description\n,nameless\n", "csv", "line 2 has no workspace name"),
+        ('\n{"description": "a"}\n', "jsonl", "line 2 has no workspace name"),
+        # Longer than the field size limit
+        (f"name\nfirst\n{'a' * 200_000}\n", "csv", "Invalid CSV on line 3"),
+        ('{"name": "a"}\n{"name": \n', "jsonl", "Invalid JSON on line 2"),
+        ('["a"]\n', "jsonl", "line 1 is not an object"),
+        ('{"name": 1}\n', "jsonl", "line 1 must be strings"),
+    ],
+    ids=["csv-nameless", "jsonl-nameless", "csv", "jsonl", "not-object", "not-str"],
+)
+def test_read_workspaces_invalid(content, fmt, message):
+    with pytest.raises(ValueError, match=message):
+        list(read_workspaces(io.StringIO(content), fmt))
+
+
+class File(io.StringIO):
+    def __init__(self, lines):
+        super().__init__("".join(f"{line}\n" for line in lines))
+        self.threads = set()
+        self.lines_read = 0
+
+    def readline(self, *args):
+        self.threads.add(threading.get_ident())
+        self.lines_read += 1
+        return super().readline(*args)
+
+    def __iter__(self):
+        return iter(self.readline, "")
+
+
+@pytest.mark.asyncio
+async def test_read_batches():
+    file_obj = File(range(5))
+    batches: AsyncGenerator[List[str], None] = read_batches(lambda: file_obj, list, 2)
+
+    assert [batch async for batch in batches] == [
+        ["0\n", "1\n"],
+        ["2\n", "3\n"],
+        ["4\n"],
+    ]
+    assert file_obj.closed
+    assert file_obj.threads and threading.get_ident() not in file_obj.threads
+
+
+@pytest.mark.asyncio
+async def test_read_batches_closed_early():
+    file_obj = File(range(100))
+    batches = read_batches(lambda: file_obj, functools.partial(map, str.strip), 2)
+
+    assert await batches.__anext__() == ["0", "1"]
+    await batches.aclose()
+    # The worker stopped, and closed the file, before aclose returned.
+    assert file_obj.closed
+    assert file_obj.lines_read < 10
+
+
+@pytest.mark.asyncio
+async def test_read_batches_error():
+    def read(file_obj):
+        yield "first"
+        raise ValueError("Invalid line 2")
+
+    file_obj = File([])
+    with pytest.raises(ValueError, match="Invalid line 2"):
+        async for _ in read_batches(lambda: file_obj, read, 1):
+            pass
+    assert file_obj.closed
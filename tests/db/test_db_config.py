@@ -0,0 +1,118 @@
+from pathlib import Path
+
+import pytest
+
+from _snadra.config import DEFAULT_CONFIG, ConfigService
+import _snadra.config.service
+import _snadra.db.config as module
+from _snadra.state import Session, set_session
+
+
+@pytest.fixture
+def database_config():
+    return dict(DEFAULT_CONFIG["database"])
+
+
+@pytest.fixture
+def no_engine(monkeypatch):
+    monkeypatch.setattr(module, "_engine", None)
+    monkeypatch.setattr(module, "_engine_config", None)
+    monkeypatch.setattr(module, "_async_session", None)
+
+
+def test_engine_url(database_config):
+    database_config.update(host="db.local", port=5433)
+    result = module.engine_url(database_config)
+
+    assert result.drivername == "postgresql+asyncpg"
+    assert result.host == "db.local"
+    assert result.port == 5433
+    assert result.database == database_config["db"]
+
+
+def test_engine_url_unsupported(database_config):
+    database_config["type"] = "oracle"
+    with pytest.raises(ValueError, match="oracle"):
+        module.engine_url(database_config)
+
+
+def test_engine_options(database_config):
+    database_config.update(pool_size=20, statement_cache_size=0)
+    result = module.engine_options(database_config)
+
+    assert result["pool_size"] == 20
+    assert result["connect_args"]["statement_cache_size"] == 0
+
+
+@pytest.mark.asyncio
+@pytest.mark.usefixtures("no_engine")
+async def test_get_engine_lazy():
+    assert module._engine is None
+
+    engine = module.get_engine()
+    assert module.get_engine() is engine
+
+    await module.dispose_engine()
+    assert module._engine is None
+    assert module.get_engine() is not engine
+    await module.dispose_engine()
+
+
+@pytest.mark.asyncio
+@pytest.mark.usefixtures("no_engine")
+async def test_get_engine_database_config(database_config):
+    database_config["host"] = "db.local"
+    engine = module.get_engine(database_config)
+    assert engine.url.host == "db.local"
+
+    database_config["host"] = "other.local"
+    assert module.get_engine(database_config) is engine
+    await module.dispose_engine()
+
+
+@pytest.mark.asyncio
+@pytest.mark.usefixtures("no_engine")
+async def test_get_engine_workspace_config(monkeypatch, tmp_path):
+    workspaces_dir = tmp_path / "workspaces"
+    workspaces_dir.mkdir()
+    (workspaces_dir / "engagement.toml").write_text('[database]\nhost = "db.local"\n')
+    service = ConfigService(
+        path=tmp_path / "missing.toml", workspaces_dir=workspaces_dir, environ={}
+    )
+    monkeypatch.setattr(_snadra.config.service, "_service", service)
+    # The test runs in its own task, the session does not leak.
+    set_session(Session("engagement"))
+
+    engine = module.get_engine()
+    assert engine.url.host == "db.local"
+    # The section did not change.
+    assert not await module.update_engine()
+    assert module.get_engine() is engine
+    await module.dispose_engine()
+
+
+@pytest.mark.parametrize("path", ["~/snadra.sqlite3", ":memory:"])
+def test_engine_url_sqlite(database_config, path):
+    database_config.update(type="sqlite", path=path)
+    result = module.engine_url(database_config)
+
+    assert result.drivername == "sqlite+aiosqlite"
+    assert result.database == (
+        path if path == ":memory:" else str(Path.home() / path[2:])
+    )
+
+
+def test_engine_options_sqlite(database_config, tmp_path):
+    database_config.update(type="sqlite", path=str(tmp_path / "snadra.sqlite3"))
+    result = module.engine_options(database_config)
+
+    assert result["pool_size"] == database_config["pool_size"]
+    assert "statement_cache_size" not in result["connect_args"]
+
+
+def test_engine_options_sqlite_memory(database_config):
+    database_config.update(type="sqlite", path=":memory:")
+    result = module.engine_options(database_config)
+
+    assert "poolclass" not in result
+    assert "pool_size" not in result
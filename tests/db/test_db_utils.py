@@ -0,0 +1,31 @@
+import pytest
+from sqlalchemy.dialects import postgresql, sqlite
+
+from _snadra.db.utils import delete_workspace_stmt, insert_workspace_stmt
+
+
+def compile_postgres(stmt):
+    return str(stmt.compile(dialect=postgresql.dialect()))
+
+
+def compile_sqlite(stmt):
+    return str(stmt.compile(dialect=sqlite.dialect()))
+
+
+@pytest.mark.parametrize("description", [None, "Some description"])
+def test_insert_workspace_stmt(description):
+    result = compile_postgres(insert_workspace_stmt("target", description))
+
+    assert result.endswith("ON CONFLICT (name) DO NOTHING")
+    assert ("description" in result) is (description is not None)
+
+
+def test_insert_workspace_stmt_sqlite():
+    stmt = insert_workspace_stmt("target", dialect="sqlite")
+    assert compile_sqlite(stmt).endswith("ON CONFLICT (name) DO NOTHING")
+
+
+def test_delete_workspace_stmt():
+    result = compile_postgres(delete_workspace_stmt("target"))
+
+    assert result == "DELETE FROM workspaces WHERE workspaces.name = %(name_1)s"
@@ -0,0 +1,136 @@
+import pytest
+from sqlalchemy import create_engine, inspect
+from sqlalchemy.future import select
+
+from _snadra.db import migrations
+from _snadra.db.models import SchemaVersion, Workspace
+from _snadra.db.models.base import Base
+
+
+@pytest.fixture
+def engine():
+    engine = create_engine("sqlite://", future=True)
+    yield engine
+    engine.dispose()
+
+
+def test_migrations_ordered():
+    versions = [migration.version for migration in migrations.MIGRATIONS]
+
+    assert versions == sorted(set(versions))
+    assert migrations.latest_version() == versions[-1]
+
+
+def test_migration_out_of_order():
+    with pytest.raises(ValueError, match="out of order"):
+        migrations.migration(1, "Duplicate version")(lambda connection: None)
+
+
+def test_upgrade_empty_database(engine):
+    with engine.begin() as connection:
+        applied = migrations.upgrade(connection)
+        version = migrations.current_version(connection)
+
+    expected = [migration.version for migration in migrations.MIGRATIONS]
+    assert applied == expected
+    assert version == migrations.latest_version()
+    assert inspect(engine).has_table(Workspace.__tablename__)
+
+
+def test_upgrade_up_to_date(engine):
+    with engine.begin() as connection:
+        migrations.upgrade(connection)
+    with engine.begin() as connection:
+        applied = migrations.upgrade(connection)
+
+    assert applied == []
+
+
+def test_upgrade_keeps_data(engine):
+    with engine.begin() as connection:
+        migrations.upgrade(connection)
+        connection.execute(Workspace.__table__.insert().values(name="engagement"))
+        connection.execute(SchemaVersion.__table__.delete())
+
+    # Re-running every migration over an existing schema must be harmless.
+    with engine.begin() as connection:
+        migrations.upgrade(connection)
+        names = connection.scalars(select(Workspace.name)).all()
+
+    assert names == ["engagement"]
+
+
+@pytest.mark.asyncio
+async def test_migrate_and_reset(tmp_path):
+    pytest.importorskip("aiosqlite")
+    from sqlalchemy.ext.asyncio import create_async_engine
+
+    engine = create_async_engine(f"sqlite+aiosqlite:///{tmp_path / 'snadra.db'}")
+    expected = [migration.version for migration in migrations.MIGRATIONS]
+    try:
+        assert await migrations.migrate(engine) == expected
+        assert await migrations.migrate(engine) == []
+        assert await migrations.reset(engine) == expected
+    finally:
+        await engine.dispose()
+
+
+def schema(engine):
+    inspector = inspect(engine)
+    return {
+        table: (
+            sorted(column["name"] for column in inspector.get_columns(table)),
+            sorted(index["name"] for index in inspector.get_indexes(table)),
+            sorted(
+                constraint["name"]
+                for constraint in inspector.get_unique_constraints(table)
+            ),
+        )
+        for table in inspector.get_table_names()
+    }
+
+
+def test_migrations_match_models(engine):
+    with engine.begin() as connection:
+        migrations.upgrade(connection)
+
+    models_engine = create_engine("sqlite://", future=True)
+    try:
+        Base.metadata.create_all(models_engine)
+        assert schema(engine) == schema(models_engine)
+    finally:
+        models_engine.dispose()
+
+
+def test_migrations_do_not_use_models(engine, monkeypatch):
+    # A model that changes later must not change what an old migration creates.
+    monkeypatch.setattr(Workspace.__table__, "create", pytest.fail)
+    with engine.begin() as connection:
+        migrations.upgrade(connection)
+
+
+def stale_version():
+    versions = iter([0, migrations.latest_version()])
+
+    async def _schema_version_of(engine):
+        return next(versions)
+
+    return _schema_version_of
+
+
+@pytest.mark.asyncio
+async def test_migrate_concurrently(tmp_path, monkeypatch):
+    pytest.importorskip("aiosqlite")
+    from sqlalchemy.ext.asyncio import create_async_engine
+
+    engine = create_async_engine(f"sqlite+aiosqlite:///{tmp_path / 'snadra.db'}")
+    try:
+        await migrations.migrate(engine)
+        # Another process applied the migrations, after this one checked the
+        # version.
+        monkeypatch.setattr(migrations, "_schema_version_of", stale_version())
+        monkeypatch.setattr(migrations, "current_version", lambda connection: 0)
+
+        assert await migrations.migrate(engine) == []
+    finally:
+        await engine.dispose()
@@ -0,0 +1,67 @@
+import io
+
+import pytest
+
+from _snadra.db.nmap import NmapService, read_nmap_xml
+
+NMAP_XML = b"""<?xml version="1.0" encoding="UTF-8"?>
+<nmaprun scanner="nmap" args="nmap -sV -oX scan.xml 10.0.0.0/30">
+  <host>
+    <status state="up" reason="arp-response"/>
+    <address addr="10.0.0.1" addrtype="ipv4"/>
+    <address addr="00:11:22:33:44:55" addrtype="mac" vendor="Acme"/>
+    <hostnames>
+      <hostname name="gw.reverse" type="PTR"/>
+      <hostname name="gateway" type="user"/>
+    </hostnames>
+    <ports>
+      <port protocol="tcp" portid="22">
+        <state state="open" reason="syn-ack"/>
+        <service name="ssh" product="OpenSSH" version="9.6"/>
+      </port>
+      <port protocol="udp" portid="53"><state state="open|filtered"/></port>
+    </ports>
+    <os><osmatch name="Linux 5.X" accuracy="98"/></os>
+  </host>
+  <host>
+    <status state="down" reason="no-response"/>
+    <address addr="10.0.0.2" addrtype="ipv4"/>
+  </host>
+  <host>
+    <status state="up"/>
+    <address addr="fe80::1" addrtype="ipv6"/>
+  </host>
+  <runstats><finished time="0"/></runstats>
+</nmaprun>
+"""
+
+
+def test_read_nmap_xml():
+    first, second = read_nmap_xml(io.BytesIO(NMAP_XML))
+
+    assert first.address == "10.0.0.1"
+    assert first.mac == "00:11:22:33:44:55"
+    assert first.name == "gateway"
+    assert first.os_name == "Linux 5.X"
+    assert first.services == [
+        NmapService("tcp", 22, "open", "ssh", "OpenSSH", "9.6"),
+        NmapService("udp", 53, "open|filtered"),
+    ]
+    assert second.address == "fe80::1"
+    assert second.name is None
+    assert second.services == []
+
+
+def test_read_nmap_xml_down_hosts():
+    hosts = read_nmap_xml(io.BytesIO(NMAP_XML), only_up=False)
+    assert [host.state for host in hosts] == ["up", "down", "up"]
+
+
+def test_read_nmap_xml_lazy():
+    data = NMAP_XML.replace(b"</nmaprun>", b"<host><unclosed></nmaprun>")
+    hosts = read_nmap_xml(io.BytesIO(data))
+
+    assert next(hosts).address == "10.0.0.1"
+    assert next(hosts).address == "fe80::1"
+    with pytest.raises(ValueError, match="Invalid Nmap XML"):
+        next(hosts)
@@ -0,0 +1,315 @@
+import csv
+import datetime
+import json
+import re
+
+import pytest
+from sqlalchemy import event, func
+from sqlalchemy.future import select
+
+from _snadra.cmd.base import Commands
+from _snadra.cmd.commands import workspace
+from _snadra.cmd.parsers import dispatch_line
+from _snadra.config import DEFAULT_CONFIG
+from _snadra.db import nmap
+from _snadra.db.bulk import export_workspaces, import_workspaces
+from _snadra.db.cache import workspace_cache
+import _snadra.db.config as db_config
+from _snadra.db.models import Host, Service, Workspace
+from _snadra.db.nmap import import_nmap
+from _snadra.db.utils import insert_default_rows, start_db
+from _snadra.db.workspaces import is_workspace_exists, workspace_names
+
+pytest.importorskip("aiosqlite")
+
+
+@pytest.fixture
+def database_config(tmp_path, monkeypatch):
+    """
+    Configuration of an empty SQLite database, which is the engine's.
+    """
+    monkeypatch.setattr(db_config, "_engine", None)
+    monkeypatch.setattr(db_config, "_engine_config", None)
+    monkeypatch.setattr(db_config, "_async_session", None)
+    workspace_cache.clear()
+    yield dict(
+        DEFAULT_CONFIG["database"],
+        type="sqlite",
+        path=str(tmp_path / "data" / "snadra.sqlite3"),
+    )
+    workspace_cache.clear()
+
+
+@pytest.fixture
+def commands(tmp_path):
+    return Commands(manifest_path=tmp_path / "manifest.json")
+
+
+@pytest.mark.asyncio
+async def test_pragmas(database_config):
+    engine = db_config.get_engine(database_config)
+    try:
+        async with engine.connect() as conn:
+            journal_mode = await conn.exec_driver_sql("PRAGMA journal_mode")
+            assert journal_mode.scalar() == "wal"
+            synchronous = await conn.exec_driver_sql("PRAGMA synchronous")
+            assert synchronous.scalar() == 1  # NORMAL
+            like = await conn.exec_driver_sql("SELECT 'Alpha' LIKE 'al%'")
+            assert like.scalar() == 0
+    finally:
+        await db_config.dispose_engine()
+
+
+@pytest.mark.asyncio
+async def test_workspace_command(capfd, database_config, commands):
+    engine = db_config.get_engine(database_config)
+    try:
+        await start_db(engine)
+        await insert_default_rows(None)
+        await insert_default_rows(None)
+        assert "Found default workspace" in capfd.readouterr().out
+
+        await dispatch_line("workspace --add Alpha --desc first", commands=commands)
+        await dispatch_line("workspace --add alpha", commands=commands)
+        await dispatch_line("workspace --add alpha", commands=commands)
+        assert "Workspace already exists!" in capfd.readouterr().out
+
+        # Prefix filtering is case sensitive, like on PostgreSQL.
+        await dispatch_line("workspace --filter al", commands=commands)
+        captured_out = capfd.readouterr().out
+        assert "alpha" in captured_out
+        assert "Alpha" not in captured_out
+
+        command = commands.get_command("workspace")
+        assert list(await command.complete("target", "a")) == ["alpha"]
+
+        await dispatch_line("workspace --delete alpha", commands=commands)
+        assert list(await command.complete("target", "a")) == []
+        await dispatch_line("workspace --delete alpha", commands=commands)
+        assert "does not exists" in capfd.readouterr().out
+
+        await dispatch_line("workspace", commands=commands)
+        captured_out = capfd.readouterr().out
+        assert "Alpha" in captured_out
+        assert "default" in captured_out
+    finally:
+        await db_config.dispose_engine()
+
+
+@pytest.mark.asyncio
+async def test_workspace_prefix_uses_index(database_config):
+    engine = db_config.get_engine(database_config)
+    statements = []
+
+    def before_cursor_execute(conn, cursor, statement, parameters, *args):
+        statements.append((statement, parameters))
+
+    try:
+        await start_db(engine)
+        event.listen(engine.sync_engine, "before_cursor_execute", before_cursor_execute)
+        pages = workspace.Command.list_workspaces(
+            async_session=db_config.async_session, limit=10, after=None, prefix="a_%"
+        )
+        assert [partition async for partition in pages] == []
+        event.remove(engine.sync_engine, "before_cursor_execute", before_cursor_execute)
+
+        ((statement, parameters),) = statements
+        async with engine.connect() as conn:
+            plan = await conn.exec_driver_sql(
+                f"EXPLAIN QUERY PLAN {statement}", parameters
+            )
+            (detail,) = [row.detail for row in plan]
+        # The index is searched, not scanned.
+        assert detail.startswith("SEARCH workspaces USING")
+        assert "(name>? AND name<?)" in detail
+    finally:
+        await db_config.dispose_engine()
+
+
+@pytest.mark.asyncio
+@pytest.mark.parametrize("suffix", [".csv", ".jsonl"])
+async def test_bulk(tmp_path, database_config, suffix):
+    source = tmp_path / "source.csv"
+    source.write_text("name,description\na,first\nb,\na,duplicate\n")
+
+    engine = db_config.get_engine(database_config)
+    try:
+        await start_db(engine)
+        assert await import_workspaces(source, engine=engine, batch_size=2) == 2
+        assert await import_workspaces(source, engine=engine) == 0
+
+        target = tmp_path / f"target{suffix}"
+        assert await export_workspaces(target, engine=engine) == 2
+        assert "first" in target.read_text()
+        assert "duplicate" not in target.read_text()
+    finally:
+        await db_config.dispose_engine()
+
+
+@pytest.mark.asyncio
+async def test_bulk_round_trip(tmp_path, database_config):
+    source = tmp_path / "source.csv"
+    source.write_text("name,description\na,first\nb,\n")
+
+    engine = db_config.get_engine(database_config)
+    try:
+        await start_db(engine)
+        await import_workspaces(source, engine=engine)
+        exported = tmp_path / "exported.csv"
+        await export_workspaces(exported, engine=engine)
+        await export_workspaces(tmp_path / "exported.jsonl", engine=engine)
+    finally:
+        await db_config.dispose_engine()
+
+    with exported.open(newline="") as file_obj:
+        records = list(csv.DictReader(file_obj))
+    with (tmp_path / "exported.jsonl").open() as file_obj:
+        assert [json.loads(line) for line in file_obj] == [
+            dict(record, updated_at=None) for record in records
+        ]
+    # The format of PostgreSQL's export, see _snadra.db.bulk._PG_TIMESTAMP_FORMAT.
+    for record in records:
+        assert re.fullmatch(
+            r"\d{4}-\d\d-\d\dT\d\d:\d\d:\d\d\.\d{6}\+00:00", record["created_at"]
+        )
+        assert datetime.datetime.fromisoformat(record["created_at"]).tzinfo
+
+    # The export imports into another database.
+    engine = db_config.get_engine(dict(database_config, path=str(tmp_path / "b.db")))
+    try:
+        await start_db(engine)
+        assert await import_workspaces(exported, engine=engine) == 2
+        await export_workspaces(tmp_path / "again.csv", engine=engine)
+    finally:
+        await db_config.dispose_engine()
+    with (tmp_path / "again.csv").open(newline="") as file_obj:
+        assert [(r["name"], r["description"]) for r in csv.DictReader(file_obj)] == [
+            ("a", "first"),
+            ("b", ""),
+        ]
+
+
+@pytest.mark.asyncio
+async def test_bulk_invalid_file(tmp_path, capfd, database_config, commands):
+    source = tmp_path / "source.jsonl"
+    source.write_text('{"name": "a"}\n["b"]\n')
+
+    engine = db_config.get_engine(database_config)
+    try:
+        await start_db(engine)
+        await dispatch_line(f"workspace --import {source}", commands=commands)
+        captured = capfd.readouterr()
+        assert "The record on line 2 is not an object" in captured.out
+        assert "Traceback" not in captured.out + captured.err
+    finally:
+        await db_config.dispose_engine()
+
+
+def nmap_xml(hosts, state="open"):
+    return "".join(
+        [
+            "<nmaprun>",
+            *(
+                f'<host><status state="up"/><address addr="{address}" addrtype="ipv4"/>'
+                f'<ports><port protocol="tcp" portid="445"><state state="{state}"/>'
+                '<service name="microsoft-ds"/></port></ports></host>'
+                for address in hosts
+            ),
+            "</nmaprun>",
+        ]
+    )
+
+
+@pytest.mark.asyncio
+async def test_import_nmap(tmp_path, capfd, monkeypatch, database_config, commands):
+    # The addresses of a batch are looked up in parts.
+    monkeypatch.setattr(nmap, "LOOKUP_SIZE", 100)
+    scan = tmp_path / "scan.xml"
+    scan.write_text(nmap_xml([f"10.0.{i // 256}.{i % 256}" for i in range(600)]))
+
+    engine = db_config.get_engine(database_config)
+    try:
+        await start_db(engine)
+        await insert_default_rows(None)
+        summary = await import_nmap(
+            scan, workspace="default", engine=engine, batch_size=256
+        )
+        assert summary == (600, 600)
+
+        # Importing again updates the hosts and the services in place.
+        scan.write_text(nmap_xml(["10.0.0.1", "10.0.0.1"], state="filtered"))
+        await dispatch_line(f"db_import {scan} --batch-size 1", commands=commands)
+        assert "Imported 2 hosts and 2 services" in capfd.readouterr().out
+
+        async with engine.connect() as conn:
+            assert await conn.scalar(select(func.count(Host.id))) == 600
+            states = await conn.execute(
+                select(Service.state, func.count()).group_by(Service.state)
+            )
+            assert dict(states.all()) == {"open": 599, "filtered": 1}
+
+        # The hosts go with their workspace.
+        await dispatch_line("workspace --delete default", commands=commands)
+        async with engine.connect() as conn:
+            assert await conn.scalar(select(func.count(Service.id))) == 0
+    finally:
+        await db_config.dispose_engine()
+
+
+@pytest.mark.asyncio
+async def test_update_engine(tmp_path, database_config):
+    engine = db_config.get_engine(database_config)
+    try:
+        await start_db(engine)
+        new_config = dict(database_config, path=str(tmp_path / "new.sqlite3"))
+        assert await db_config.update_engine(new_config)
+
+        # The new database is ready before the engine is replaced.
+        assert db_config.get_engine().url.database == new_config["path"]
+        async with db_config.async_session() as session:
+            result = await session.execute(select(Workspace.name))
+            assert result.scalars().all() == ["default"]
+        assert not await db_config.update_engine(new_config)
+    finally:
+        await db_config.dispose_engine()
+    assert not db_config._retired
+
+
+@pytest.mark.asyncio
+async def test_update_engine_clears_workspace_cache(tmp_path, database_config):
+    other_config = dict(database_config, path=str(tmp_path / "other.sqlite3"))
+    engine = db_config.get_engine(database_config)
+    try:
+        await start_db(engine)
+        await insert_default_rows(None)
+        async with db_config.async_session() as session:
+            async with session.begin():
+                session.add(Workspace(name="alpha"))
+
+        for config, expected in [
+            (database_config, True),
+            (other_config, False),
+            (database_config, True),
+        ]:
+            await db_config.update_engine(config)
+            names = await workspace_names(async_session=db_config.async_session)
+            assert list(names.iter_prefix("a")) == (["alpha"] if expected else [])
+            is_exists = await is_workspace_exists(
+                "alpha", async_session=db_config.async_session
+            )
+            assert is_exists is expected
+    finally:
+        await db_config.dispose_engine()
+    assert not workspace_cache
+
+
+@pytest.mark.asyncio
+async def test_update_engine_failure_keeps_previous(tmp_path, database_config):
+    engine = db_config.get_engine(database_config)
+    try:
+        # A directory is not a database.
+        with pytest.raises(Exception):
+            await db_config.update_engine(dict(database_config, path=str(tmp_path)))
+        assert db_config.get_engine() is engine
+    finally:
+        await db_config.dispose_engine()
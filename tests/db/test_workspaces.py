@@ -0,0 +1,69 @@
+import pytest
+
+import _snadra.cmd.commands.db_import as db_import
+import _snadra.cmd.commands.workspace as workspace
+from _snadra.db.cache import workspace_cache
+from _snadra.db.workspaces import is_workspace_exists, workspace_names
+from _snadra.trie import Trie
+
+
+class Session:
+    """
+    A session whose queries find nothing, while a workspace is added (by a job,
+    or another client).
+    """
+
+    async def __aenter__(self):
+        return self
+
+    async def __aexit__(self, *exc_info):
+        pass
+
+    async def execute(self, stmt):
+        workspace_cache.clear()
+        return Result()
+
+
+class Result:
+    def scalar_one_or_none(self):
+        return None
+
+
+@pytest.mark.asyncio
+@pytest.mark.parametrize("expected", [True, False])
+async def test_is_workspace_exists_cached(expected, no_session):
+    workspace_cache.set(("exists", "target"), expected)
+    result = await is_workspace_exists("target", async_session=no_session)
+    assert result is expected
+
+
+@pytest.mark.asyncio
+async def test_is_workspace_exists_invalidated_while_querying():
+    result = await is_workspace_exists("target", async_session=Session)
+    assert result is False
+    assert ("exists", "target") not in workspace_cache
+
+
+@pytest.mark.asyncio
+async def test_workspace_names_cached(no_session):
+    names = Trie(["web", "work"])
+    workspace_cache.set(("names",), names)
+    assert await workspace_names(async_session=no_session) is names
+
+
+@pytest.mark.asyncio
+@pytest.mark.parametrize(
+    "module, dest, other",
+    [(workspace, "target", "after"), (db_import, "workspace", None)],
+    ids=["workspace", "db_import"],
+)
+async def test_complete_cached(module, dest, other):
+    # The commands complete the workspace names from the cache.
+    workspace_cache.set(("names",), Trie(["web", "work", "other"]))
+    command = module.Command()
+
+    assert list(await command.complete(dest, "w")) == ["web", "work"]
+    if other is not None:
+        assert list(await command.complete(other, "o")) == ["other"]
+    assert list(await command.complete("path", "w")) == []
+    assert list(await command.complete("prefix", "w")) == []
@@ -0,0 +1,138 @@
+import io
+import textwrap
+
+import pytest
+
+from _snadra.batch import read_lines, run_lines
+from _snadra.cmd.base import Commands
+
+COMMAND_TEMPLATE = textwrap.dedent(
+    """
+    import asyncio
+
+    from _snadra.cmd.utils import CommandMeta
+
+
+    class Command(CommandMeta):
+        keyword = "{keyword}"
+        aliases = None
+        description = "Testing command"
+        long_help = ""
+        concurrent = {concurrent}
+
+        async def run(self, args):
+            print("start {keyword}")
+            await asyncio.sleep(0.01)
+            print("end {keyword}")
+    """
+)
+
+
+@pytest.fixture
+def commands(tmp_path):
+    commands_dir = tmp_path / "commands"
+    commands_dir.mkdir()
+    for keyword, concurrent in [("parallel", True), ("serial", False)]:
+        source = COMMAND_TEMPLATE.format(keyword=keyword, concurrent=concurrent)
+        (commands_dir / f"{keyword}.py").write_text(source)
+    (commands_dir / "fail.py").write_text(
+        COMMAND_TEMPLATE.format(keyword="fail", concurrent=False).replace(
+            'print("start fail")', "1 / 0"
+        )
+    )
+
+    for keyword, concurrent in [("stop", False), ("parallel_stop", True)]:
+        (commands_dir / f"{keyword}.py").write_text(
+            COMMAND_TEMPLATE.format(keyword=keyword, concurrent=concurrent).replace(
+                f'print("start {keyword}")', 'raise EOFError("stop")'
+            )
+        )
+    (commands_dir / "count.py").write_text(
+        COMMAND_TEMPLATE.format(keyword="count", concurrent=True).replace(
+            "concurrent = True",
+            'concurrent = True\n    arguments = {"--count": {"type": int}}',
+        )
+    )
+
+    return Commands(path=commands_dir, manifest_path=tmp_path / "manifest.json")
+
+
+async def run_script(script, commands):
+    return await run_lines(read_lines(io.StringIO(script)), commands=commands)
+
+
+@pytest.mark.asyncio
+async def test_read_lines():
+    script = "".join(f"line {i}\n" for i in range(10_000))
+    result = [line async for line in read_lines(io.StringIO(script))]
+
+    assert result == script.splitlines(keepends=True)
+
+
+@pytest.mark.asyncio
+async def test_run_lines_skips_comments_and_empty_lines(capfd, commands):
+    report = await run_script("# comment\n\n   \nserial\n", commands)
+
+    assert report.lines == 1
+    assert report.errors == 0
+    assert capfd.readouterr().out == "start serial\nend serial\n"
+
+
+@pytest.mark.asyncio
+async def test_run_lines_concurrent(capfd, commands):
+    report = await run_script("parallel\nparallel\nserial\nparallel\n", commands)
+
+    assert report.lines == 4
+    assert capfd.readouterr().out.splitlines() == [
+        "start parallel",
+        "start parallel",
+        "end parallel",
+        "end parallel",
+        "start serial",
+        "end serial",
+        "start parallel",
+        "end parallel",
+    ]
+
+
+@pytest.mark.asyncio
+async def test_run_lines_errors(capfd, commands):
+    report = await run_script("fail\nunknown\nserial 'unclosed\nserial\n", commands)
+
+    assert report.lines == 4
+    assert report.errors == 3
+    captured = capfd.readouterr()
+    assert "ZeroDivisionError" in captured.err
+    assert "end serial" in captured.out
+
+
+@pytest.mark.asyncio
+async def test_run_lines_stops_on_exit(capfd, commands):
+    report = await run_script("parallel\nstop\nserial\n", commands)
+
+    assert report.lines == 2
+    assert capfd.readouterr().out == "start parallel\nend parallel\n"
+
+
+@pytest.mark.asyncio
+@pytest.mark.parametrize("count", ["count", "serial"])
+async def test_run_lines_usage_error(capfd, commands, count):
+    script = f"count --count x\ncount -h\n{count}\nserial\n"
+    report = await run_script(script, commands)
+
+    assert report.lines == 4
+    assert report.errors == 1
+    captured = capfd.readouterr()
+    assert "invalid int value" in captured.err
+    assert "end serial" in captured.out
+
+
+@pytest.mark.asyncio
+async def test_run_lines_concurrent_exit(capfd, commands):
+    script = "count --count x\nparallel_stop\nparallel\nserial\n"
+    report = await run_script(script, commands)
+
+    # The concurrent lines before the exit finish, the script stops after them.
+    assert report.lines == 3
+    assert report.errors == 1
+    assert capfd.readouterr().out == "start parallel\nend parallel\n"
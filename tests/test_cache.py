@@ -0,0 +1,86 @@
+import pytest
+
+from _snadra.cache import TTLCache
+
+
+class FakeTimer:
+    def __init__(self):
+        self.now = 0.0
+
+    def __call__(self):
+        return self.now
+
+
+@pytest.fixture
+def timer():
+    return FakeTimer()
+
+
+@pytest.fixture
+def cache(timer):
+    return TTLCache(maxsize=3, ttl=10, timer=timer)
+
+
+def test_invalid_maxsize():
+    with pytest.raises(ValueError, match="maxsize"):
+        TTLCache(maxsize=0, ttl=10)
+
+
+def test_get_missing(cache):
+    assert cache.get("missing") is None
+    assert cache.get("missing", 1) == 1
+    assert "missing" not in cache
+
+
+def test_expiration(cache, timer):
+    cache.set("key", "value")
+    timer.now = 9.9
+    assert cache.get("key") == "value"
+
+    timer.now = 10
+    assert cache.get("key") is None
+    assert len(cache) == 0
+
+
+def test_falsy_values_are_cached(cache):
+    cache.set("key", False)
+    assert "key" in cache
+    assert cache.get("key", "default") is False
+
+
+def test_lru_eviction(cache):
+    for key in "abc":
+        cache.set(key, key)
+    cache.get("a")
+    cache.set("d", "d")
+
+    assert "b" not in cache
+    assert all(key in cache for key in "acd")
+
+
+def test_pop_and_clear(cache):
+    cache.set("a", 1)
+    cache.set("b", 2)
+
+    cache.pop("a")
+    cache.pop("missing")
+    assert "a" not in cache
+    assert "b" in cache
+
+    cache.clear()
+    assert len(cache) == 0
+
+
+def test_stale_generation_not_cached(cache):
+    generation = cache.generation
+    cache.set("a", 1, generation=generation)
+    cache.clear()
+    cache.set("b", 2, generation=generation)
+    cache.pop("c")
+    cache.set("c", 3, generation=generation + 1)
+
+    assert "a" not in cache
+    assert "b" not in cache
+    assert "c" not in cache
+    cache.set("d", 4, generation=cache.generation)
+    assert cache.get("d") == 4
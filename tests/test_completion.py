@@ -0,0 +1,150 @@
+from typing import Optional, Set
+
+from prompt_toolkit.completion import CompleteEvent
+from prompt_toolkit.document import Document
+import pytest
+
+from _snadra.cmd.base import Commands
+from _snadra.cmd.utils import CommandMeta
+from _snadra.completion import ArgumentsSpec, SnadraCompleter
+
+
+class Scan(CommandMeta):
+    keyword = "scan"
+    aliases: Optional[Set[str]] = {"sc"}
+    description = "Scan"
+    long_help = "Scan"
+    arguments = {
+        "mode": {"choices": ["fast", "full"]},
+        "hosts": {"nargs": "*"},
+        "-p,--ports": {"help": "Ports"},
+        "--proto": {"choices": ["tcp", "udp"], "dest": "protocol"},
+        "-v,--verbose": {"action": "store_true"},
+    }
+
+    async def complete(self, dest, prefix):
+        if dest != "hosts":
+            return []
+        return [host for host in ["10.0.0.1", "10.0.0.2"] if host.startswith(prefix)]
+
+    async def run(self, args):
+        pass
+
+
+@pytest.fixture
+def completer(tmp_path):
+    commands = Commands(manifest_path=tmp_path / "manifest.json")
+    commands.register(Scan)
+    return SnadraCompleter(commands)
+
+
+def complete(completer, text):
+    completions = completer.get_completions(Document(text), CompleteEvent())
+    return [completion.text for completion in completions]
+
+
+async def complete_async(completer, text):
+    completions = completer.get_completions_async(Document(text), CompleteEvent())
+    return [completion.text async for completion in completions]
+
+
+@pytest.mark.parametrize(
+    "text, expected",
+    [
+        (
+            "",
+            [
+                "HELP",
+                "db_import",
+                "exit",
+                "help",
+                "jobs",
+                "quit",
+                "sc",
+                "scan",
+                "stats",
+            ],
+        ),
+        ("s", ["sc", "scan", "stats"]),
+        ("help w", ["workspace", "workspaces"]),
+        ("scan --p", ["--ports", "--proto"]),
+        ("scan -", ["--ports", "--proto", "--verbose", "-p", "-v"]),
+        ("scan f", ["fast", "full"]),
+        ("scan --proto ", ["tcp", "udp"]),
+        ("scan -v fu", ["full"]),
+        ("scan --ports 80 f", ["fast", "full"]),
+        ("unknown ", []),
+    ],
+)
+def test_get_completions(completer, text, expected):
+    result = complete(completer, text)
+    if text == "":
+        # Only the commands that are not from the tree of the tests.
+        result = [word for word in result if not word.startswith("work")]
+    assert result == expected
+
+
+@pytest.mark.asyncio
+@pytest.mark.parametrize(
+    "text, expected",
+    [
+        ("scan fast ", ["10.0.0.1", "10.0.0.2"]),
+        ("sc fast 10.0.0.1 10.0.0.2", ["10.0.0.2"]),
+        ("scan --ports 10", []),
+    ],
+)
+async def test_get_completions_async(completer, text, expected):
+    assert await complete_async(completer, text) == expected
+
+
+def test_completions_quoted(completer):
+    class Quoted(Scan):
+        arguments = {"mode": {"choices": ["a b"]}}
+
+    completer.commands.register(Quoted)
+    completions = list(completer.get_completions(Document("scan a"), CompleteEvent()))
+
+    assert completions[0].text == "'a b'"
+    assert completions[0].display_text == "a b"
+    assert completions[0].start_position == -1
+
+
+def test_keywords_follow_registration(completer):
+    keywords = completer.keywords
+    assert completer.keywords is keywords
+
+    class Other(Scan):
+        keyword = "other"
+        aliases = None
+
+    completer.commands.register(Other)
+    assert "other" in completer.keywords
+
+
+def test_spec_follows_command_instance(completer):
+    command = completer.commands.get_command("scan")
+    spec = completer.spec(command)
+    assert completer.spec(command) is spec
+
+    completer.commands.invalidate("scan")
+    assert completer.spec(completer.commands.get_command("scan")) is not spec
+
+
+def test_max_completions(completer):
+    completer.max_completions = 2
+    assert complete(completer, "") == ["HELP", "db_import"]
+
+
+def test_arguments_spec():
+    spec = ArgumentsSpec.from_command(Scan())
+
+    assert spec.option_dests == {
+        "-p": "ports",
+        "--ports": "ports",
+        "--proto": "protocol",
+        "-v": None,
+        "--verbose": None,
+    }
+    assert spec.positionals == ["mode", "hosts"]
+    assert spec.is_last_repeated
+    assert spec.choices == {"mode": ["fast", "full"], "protocol": ["tcp", "udp"]}
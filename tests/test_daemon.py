@@ -0,0 +1,272 @@
+import asyncio
+import contextlib
+import io
+import json
+import socket
+
+import pytest
+
+from _snadra.cmd.base import Commands
+from _snadra.cmd.utils import CommandMeta
+from _snadra.daemon import (
+    DaemonClient,
+    SnadraDaemon,
+    client_output,
+    encode_frame,
+    read_frame,
+)
+from _snadra.state import get_session
+
+
+class UseCommand(CommandMeta):
+    keyword = "use"
+    aliases = None
+    description = "Switch workspace, without a database"
+    long_help = ""
+    arguments = {"target": {}}
+
+    async def run(self, args):
+        get_session().current_workspace = args.target
+
+
+class FailCommand(CommandMeta):
+    keyword = "fail"
+    aliases = None
+    description = "Raise an error"
+    long_help = ""
+
+    async def run(self, args):
+        raise RuntimeError("Something broke")
+
+
+class WaitCommand(CommandMeta):
+    keyword = "wait"
+    aliases = None
+    description = "Wait until released"
+    long_help = ""
+    # Set by the test, in its event loop
+    released: asyncio.Event
+
+    async def run(self, args):
+        await WaitCommand.released.wait()
+
+
+@pytest.fixture
+def commands(tmp_path):
+    commands = Commands(manifest_path=tmp_path / "manifest.json")
+    commands.register(UseCommand)
+    commands.register(FailCommand)
+    commands.register(WaitCommand)
+    return commands
+
+
+@pytest.fixture
+def socket_path(tmp_path):
+    return tmp_path / "snadra.sock"
+
+
+@contextlib.asynccontextmanager
+async def serving(commands, socket_path):
+    daemon = SnadraDaemon(commands, socket_path=socket_path)
+    await daemon.start()
+    try:
+        yield daemon
+    finally:
+        await daemon.close()
+
+
+@contextlib.asynccontextmanager
+async def connected(socket_path, output="rich"):
+    client = await DaemonClient.connect(
+        socket_path, output=output, stdout=io.StringIO(), stderr=io.StringIO()
+    )
+    try:
+        yield client
+    finally:
+        await client.close()
+
+
+@pytest.mark.asyncio
+async def test_records(commands, socket_path):
+    async with serving(commands, socket_path), connected(
+        socket_path, "jsonl"
+    ) as client:
+        assert not await client.send("help")
+
+    records = [json.loads(line) for line in client.stdout.getvalue().splitlines()]
+    assert {record["keyword"] for record in records} == commands.keywords
+
+
+@pytest.mark.asyncio
+async def test_session_per_client(commands, socket_path):
+    async with serving(commands, socket_path) as daemon:
+        async with connected(socket_path) as first, connected(socket_path) as second:
+            assert daemon.clients == 2
+            assert first.workspace == second.workspace == "default"
+
+            await first.send("use mine")
+            await second.send("help")
+            assert first.workspace == "mine"
+            assert second.workspace == "default"
+
+            await second.send("use theirs")
+            await first.send("help")
+            assert first.workspace == "mine"
+            assert second.workspace == "theirs"
+
+
+@pytest.mark.asyncio
+async def test_clients_are_concurrent(commands, socket_path):
+    WaitCommand.released = asyncio.Event()
+    async with serving(commands, socket_path):
+        async with connected(socket_path) as first, connected(socket_path) as second:
+            waiting = asyncio.ensure_future(first.send("wait"))
+            # The second client is not blocked by the first one.
+            await asyncio.wait_for(second.send("use theirs"), timeout=5)
+            assert not waiting.done()
+
+            WaitCommand.released.set()
+            await asyncio.wait_for(waiting, timeout=5)
+            assert first.workspace == "default"
+            assert second.workspace == "theirs"
+
+
+@pytest.mark.asyncio
+async def test_jobs_per_client(commands, socket_path):
+    WaitCommand.released = asyncio.Event()
+    async with serving(commands, socket_path):
+        async with connected(socket_path) as first, connected(socket_path) as second:
+            await first.send("wait &")
+            (job,) = commands.jobs.active()
+
+            await second.send("jobs")
+            assert "running" not in second.stdout.getvalue()
+            await second.send(f"jobs --kill {job.job_id}")
+            assert f"No running job with id {job.job_id}" in second.stdout.getvalue()
+            assert not job.task.done()
+
+            await first.send("jobs")
+            assert "running" in first.stdout.getvalue()
+            WaitCommand.released.set()
+            await commands.jobs.join()
+
+
+@pytest.mark.asyncio
+async def test_errors_go_to_the_client(capfd, commands, socket_path):
+    async with serving(commands, socket_path), connected(socket_path) as client:
+        assert not await client.send("not_a_command")
+        assert not await client.send("fail")
+        # The session goes on after an error.
+        assert not await client.send("help")
+
+    assert "unknown command" in client.stdout.getvalue()
+    assert "Help menu" in client.stdout.getvalue()
+    assert "Something broke" in client.stderr.getvalue()
+    # Nothing of the client is printed by the daemon itself.
+    assert capfd.readouterr().out == ""
+
+
+@pytest.mark.asyncio
+async def test_usage_goes_to_the_client(capfd, commands, socket_path):
+    async with serving(commands, socket_path), connected(socket_path) as client:
+        assert not await client.send("help not_a_command")
+        assert not await client.send("help -h")
+        # The session goes on after a usage error.
+        assert not await client.send("help")
+
+    assert "invalid choice: 'not_a_command'" in client.stderr.getvalue()
+    assert "usage: help" in client.stdout.getvalue()
+    assert "Help menu" in client.stdout.getvalue()
+    captured = capfd.readouterr()
+    assert captured.out == captured.err == ""
+
+
+@pytest.mark.asyncio
+async def test_exit(commands, socket_path):
+    async with serving(commands, socket_path) as daemon:
+        async with connected(socket_path) as client:
+            assert await client.send("exit")
+            with pytest.raises(ConnectionError):
+                await client.send("help")
+        assert daemon.clients == 0
+
+
+@pytest.mark.asyncio
+@pytest.mark.parametrize(
+    "hello",
+    [
+        {"colour": True},
+        {"output": "xml"},
+        {"width": "wide"},
+        {"width": True},
+        {"color": "yes"},
+        ["rich"],
+    ],
+)
+async def test_invalid_hello(capfd, commands, socket_path, hello):
+    async with serving(commands, socket_path):
+        reader, writer = await asyncio.open_unix_connection(str(socket_path))
+        writer.write(encode_frame(hello=hello))
+        frame = await read_frame(reader)
+        assert frame is not None
+        assert "hello" in frame["error"]
+        # The daemon closed the connection, and goes on serving.
+        assert await read_frame(reader) is None
+        writer.close()
+        await writer.wait_closed()
+
+        async with connected(socket_path) as client:
+            assert not await client.send("help")
+
+    assert "Traceback" not in capfd.readouterr().out
+
+
+class Writer:
+    def __init__(self):
+        self.frames = []
+        self.drained = 0
+
+    def is_closing(self):
+        return False
+
+    def write(self, data):
+        self.frames.append(json.loads(data))
+
+    async def drain(self):
+        self.drained += 1
+
+
+@pytest.mark.asyncio
+async def test_frames_are_lines():
+    writer = Writer()
+    output = client_output(writer, output="jsonl")  # type: ignore
+    output.file.write("{")
+    output.file.write('"a": 1}\n{"b"')
+    assert writer.frames == [{"out": '{"a": 1}\n{"b"'}]
+
+    await output.drain()
+    output.file.write(": 2}")
+    await output.drain()
+    assert writer.frames[1:] == [{"out": ": 2}"}]
+    # The "out" and the "err" files are drained, every time.
+    assert writer.drained == 4
+
+
+@pytest.mark.asyncio
+async def test_client_refused(commands, socket_path):
+    async with serving(commands, socket_path):
+        with pytest.raises(ConnectionError, match="Invalid hello option 'output'"):
+            await DaemonClient.connect(socket_path, output="xml")
+
+
+@pytest.mark.asyncio
+async def test_stale_socket(commands, socket_path):
+    stale = socket.socket(socket.AF_UNIX)
+    stale.bind(str(socket_path))
+    stale.close()
+
+    async with serving(commands, socket_path):
+        with pytest.raises(RuntimeError):
+            await SnadraDaemon(commands, socket_path=socket_path).start()
+
+    assert not socket_path.exists()
@@ -0,0 +1,96 @@
+import json
+
+from hypothesis import given
+import hypothesis.strategies as st
+from prompt_toolkit.buffer import Buffer
+from prompt_toolkit.document import Document
+import pytest
+
+from _snadra.history import IndexedAutoSuggest, SuggestionIndex, WorkspaceHistory
+
+
+@given(
+    lines=st.lists(st.text(alphabet="ab -", max_size=6)),
+    prefix=st.text(alphabet="ab -", max_size=3),
+)
+def test_suggestion_index(lines, prefix):
+    index = SuggestionIndex()
+    for line in lines:
+        index.add(line)
+
+    expected = next((line for line in reversed(lines) if line.startswith(prefix)), None)
+    assert index.latest(prefix) == expected
+
+
+@pytest.fixture
+def history(tmp_path):
+    return WorkspaceHistory(tmp_path / "history", max_lines=10, flush_interval=0)
+
+
+async def load(history):
+    return [string async for string in history.load()]
+
+
+@pytest.mark.asyncio
+class TestWorkspaceHistory:
+    async def test_store_and_load(self, tmp_path, history):
+        assert await load(history) == []
+        history.append_string("help")
+        history.append_string("workspace\n--add a")
+        await history.flush()
+
+        other = WorkspaceHistory(tmp_path / "history")
+        assert await load(other) == ["workspace\n--add a", "help"]
+        assert other.index.latest("--") == "--add a"
+
+    async def test_batched_flush(self, history):
+        await load(history)
+        history.flush_interval = 60
+        history.append_string("help")
+        assert not history.path.exists()
+
+        await history.flush()
+        assert history.path.read_text() == '"help"\n'
+
+    async def test_workspace_switch(self, tmp_path, history):
+        await load(history)
+        history.append_string("in default")
+        history.workspace = "../other"
+        assert history.path.parent == tmp_path / "history"
+        assert await load(history) == []
+
+        history.append_string("in other")
+        await history.flush()
+        assert history.index.latest("in") == "in other"
+
+        history.workspace = "default"
+        assert await load(history) == ["in default"]
+        assert history.index.latest("in") == "in default"
+
+    async def test_compact(self, history):
+        await load(history)
+        for i in range(16):
+            history.append_string(f"line {i}")
+            await history.flush()
+
+        lines = history.path.read_text().splitlines()
+        assert len(lines) == 10
+        assert json.loads(lines[-1]) == "line 15"
+
+    async def test_load_skips_partial_line(self, tmp_path, history):
+        history.directory.mkdir()
+        history.path.write_text('"help"\n"work')
+
+        assert await load(history) == ["help"]
+
+
+def test_auto_suggest(history):
+    history.index.add("workspace --add a")
+    auto_suggest = IndexedAutoSuggest(history)
+    buffer = Buffer()
+
+    suggestion = auto_suggest.get_suggestion(buffer, Document("work"))
+    assert suggestion is not None
+    assert suggestion.text == "space --add a"
+    assert auto_suggest.get_suggestion(buffer, Document("help")) is None
+    assert auto_suggest.get_suggestion(buffer, Document(" ")) is None
@@ -0,0 +1,94 @@
+"""
+Testing that the heavy dependencies are imported only when they are used.
+"""
+import os
+import subprocess
+import sys
+
+import pytest
+
+import _snadra
+
+HEAVY_MODULES = {"asyncpg", "prompt_toolkit", "rich", "sqlalchemy"}
+
+# Cumulative import time of the entry point, in microseconds. It is far above
+# the actual time, so only importing a heavy dependency eagerly crosses it.
+IMPORT_TIME_BUDGET = int(os.getenv("SNADRA_IMPORT_TIME_BUDGET", 400_000))
+
+
+def import_times(*args):
+    """
+    Run python with ``-X importtime``.
+
+    Returns
+    -------
+    Dict[str, int]
+        The cumulative import time of every imported module, in microseconds.
+    """
+    process = subprocess.run(
+        [sys.executable, "-X", "importtime", *args],
+        check=True,
+        stdout=subprocess.PIPE,
+        stderr=subprocess.PIPE,
+        text=True,
+    )
+    times = {}
+    for line in process.stderr.splitlines():
+        if not line.startswith("import time:"):
+            continue
+        _, cumulative, name = line.split("|")
+        if cumulative.strip().isdigit():
+            times[name.strip()] = int(cumulative)
+    return times
+
+
+def imported_heavy_modules(times):
+    return {name for name in times if name.split(".")[0] in HEAVY_MODULES}
+
+
+def test_entry_point():
+    times = import_times("-c", "import snadra.__main__")
+
+    assert imported_heavy_modules(times) == set()
+    assert times["snadra.__main__"] < IMPORT_TIME_BUDGET
+
+
+def test_version():
+    times = import_times("-m", "snadra", "--version")
+    assert imported_heavy_modules(times) == set()
+
+
+@pytest.mark.parametrize(
+    "code",
+    [
+        "import pathlib, sys\n"
+        "from _snadra.cmd.base import Commands\n"
+        "Commands(manifest_path=pathlib.Path(sys.argv[1]))",
+        "from _snadra.cmd.parsers import parse_line; parse_line('help')",
+        "import _snadra.batch",
+        "import _snadra.db.config",
+        "import _snadra.output",
+        "import _snadra.daemon",
+        "import _snadra.targets",
+    ],
+)
+def test_no_heavy_imports(tmp_path, code):
+    times = import_times("-c", code, str(tmp_path / "manifest.json"))
+    assert imported_heavy_modules(times) == set()
+
+
+def test_lazy_console(capfd):
+    from _snadra.cmd.utils import LazyConsole
+
+    lazy_console = LazyConsole(emoji=False)
+    created = [lazy_console._console is not None]
+
+    lazy_console.print("printed :smile:")
+    created.append(lazy_console._console is not None)
+    assert created == [False, True]
+    assert "printed :smile:" in capfd.readouterr().out
+
+
+def test_version_output(capfd):
+    subprocess.run([sys.executable, "-m", "snadra", "--version"], check=True)
+    assert capfd.readouterr().out.strip() == _snadra.__version__
@@ -0,0 +1,89 @@
+import asyncio
+import operator
+from typing import List
+
+import pytest
+
+from _snadra.jobs import Job, JobManager
+from _snadra.state import Session, set_session
+
+
+@pytest.fixture
+def jobs():
+    return JobManager(max_concurrent=1)
+
+
+def test_invalid_max_concurrent():
+    with pytest.raises(ValueError, match="max_concurrent"):
+        JobManager(max_concurrent=0)
+
+
+@pytest.mark.asyncio
+async def test_concurrency_limit(jobs):
+    event = asyncio.Event()
+    first = jobs.submit(event.wait(), name="first")
+    second = jobs.submit(asyncio.sleep(0), name="second")
+    await asyncio.sleep(0)
+
+    assert first.status == "running"
+    assert second.status == "queued"
+    assert second.duration is None
+
+    event.set()
+    await jobs.join()
+
+    assert first.status == second.status == "done"
+    assert first.duration >= 0
+    assert jobs.active() == []
+
+
+@pytest.mark.asyncio
+async def test_kill(jobs):
+    running = jobs.submit(asyncio.sleep(60), name="running")
+    queued = jobs.submit(asyncio.sleep(60), name="queued")
+    await asyncio.sleep(0)
+
+    assert jobs.kill(queued.job_id)
+    assert jobs.kill(running.job_id)
+    await jobs.join()
+
+    assert running.status == queued.status == "cancelled"
+    assert not jobs.kill(running.job_id)
+    assert not jobs.kill(12345)
+
+
+@pytest.mark.asyncio
+async def test_owned_by_session(jobs):
+    mine = jobs.submit(asyncio.sleep(60), name="mine")
+    session = Session()
+    set_session(session)
+    theirs = jobs.submit(asyncio.sleep(60), name="theirs")
+
+    assert jobs.owned(session) == [theirs]
+    assert not jobs.kill(mine.job_id, session=session)
+    assert jobs.kill(theirs.job_id, session=session)
+    await jobs.shutdown()
+    assert mine.status == theirs.status == "cancelled"
+
+
+@pytest.mark.asyncio
+async def test_failed_job_and_on_done(jobs):
+    done: List[Job] = []
+
+    async def fail():
+        raise RuntimeError("boom")
+
+    job = jobs.submit(fail(), name="fail", on_done=done.append)
+    await jobs.join()
+    await asyncio.sleep(0)
+
+    assert job.status == "failed"
+    assert done == [job]
+
+
+@pytest.mark.asyncio
+async def test_run_in_executor(jobs):
+    result = await jobs.run_in_executor(operator.add, 1, 2)
+    await jobs.shutdown()
+
+    assert result == 3
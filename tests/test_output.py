@@ -0,0 +1,139 @@
+import datetime
+import io
+import json
+
+import pytest
+
+from _snadra.output import OUTPUT_MODES, Column, Output, get_output
+
+COLUMNS = [
+    Column("name", "Name"),
+    Column("size", "Size", justify="right", format="{:.1f}".format),
+    Column("created_at", "Created at"),
+]
+
+ROWS = [
+    ("first", 1.25, datetime.datetime(2021, 7, 3, 12, 30)),
+    ("tab\tand\nnewline", None, None),
+]
+
+
+def write(mode, batches, show_empty=True):
+    file_obj = io.StringIO()
+    output = Output(mode, file=file_obj)
+    with output.records("Things", COLUMNS, show_empty=show_empty) as writer:
+        for batch in batches:
+            writer.write(batch)
+    return file_obj.getvalue(), writer.count
+
+
+def test_default_output():
+    assert get_output().mode == "rich"
+
+
+def test_unsupported_mode():
+    with pytest.raises(ValueError):
+        Output("xml")
+
+
+@pytest.mark.parametrize("mode", [mode for mode in OUTPUT_MODES if mode != "rich"])
+@pytest.mark.parametrize("batches", [[ROWS], [ROWS[:1], [], ROWS[1:]]])
+def test_machine_modes_agree(mode, batches):
+    text, count = write(mode, batches)
+    assert count == len(ROWS)
+
+    if mode == "json":
+        records = json.loads(text)
+    elif mode == "jsonl":
+        records = [json.loads(line) for line in text.splitlines()]
+    else:
+        header, *lines = text.splitlines()
+        keys = header.split("\t")
+        records = [dict(zip(keys, line.split("\t"))) for line in lines]
+
+    assert len(records) == len(ROWS)
+    assert records[0]["name"] == "first"
+
+
+def test_json():
+    text, _ = write("json", [ROWS])
+    assert json.loads(text) == [
+        {"name": "first", "size": 1.25, "created_at": "2021-07-03T12:30:00"},
+        {"name": "tab\tand\nnewline", "size": None, "created_at": None},
+    ]
+
+
+@pytest.mark.parametrize(
+    "mode, expected",
+    [("json", "[]\n"), ("jsonl", ""), ("tsv", "name\tsize\tcreated_at\n")],
+)
+def test_empty(mode, expected):
+    assert write(mode, []) == (expected, 0)
+
+
+def test_tsv_escapes():
+    text, _ = write("tsv", [ROWS])
+    assert text.splitlines() == [
+        "name\tsize\tcreated_at",
+        "first\t1.25\t2021-07-03T12:30:00",
+        "tab\\tand\\nnewline\t\t",
+    ]
+
+
+def test_rich(capfd):
+    write("rich", [ROWS[:1], ROWS[1:]])
+
+    captured_out = capfd.readouterr().out
+    # The header is shown once, and the columns are formatted.
+    assert captured_out.count("Things") == 1
+    assert captured_out.count("Created at") == 1
+    assert "1.2" in captured_out
+    assert "#" in captured_out
+
+
+@pytest.mark.parametrize("show_empty", [True, False])
+def test_rich_empty(capfd, show_empty):
+    write("rich", [], show_empty=show_empty)
+    assert ("Things" in capfd.readouterr().out) is show_empty
+
+
+@pytest.mark.parametrize("mode", OUTPUT_MODES)
+def test_log(capfd, mode):
+    Output(mode).log("Something happened")
+
+    captured = capfd.readouterr()
+    if mode == "rich":
+        assert "Something happened" in captured.out
+    else:
+        assert captured.out == ""
+        assert "Something happened" in captured.err
+
+
+@pytest.mark.parametrize(
+    "mode, expected",
+    [("json", '{"long_help": "Some help"}\n'), ("tsv", "Some help\n")],
+)
+def test_text(mode, expected):
+    file_obj = io.StringIO()
+    output = Output(mode, file=file_obj)
+    output.text("long_help", "Some help")
+    assert file_obj.getvalue() == expected
+
+
+class DrainedFile(io.StringIO):
+    drained = 0
+
+    async def drain(self):
+        self.drained += 1
+
+
+@pytest.mark.asyncio
+async def test_drain(capfd):
+    file_obj = DrainedFile()
+    output = Output("jsonl", file=file_obj)
+    output.write_records("Things", COLUMNS, ROWS[:1])
+    # The consoles are not drained, they have no drain().
+    await output.drain()
+
+    assert file_obj.drained == 1
+    assert capfd.readouterr().out == ""
@@ -0,0 +1,59 @@
+import asyncio
+
+import pytest
+
+from _snadra.cmd.base import Commands
+from _snadra.cmd.parsers import dispatch_line
+from _snadra.cmd.utils import CommandMeta
+from _snadra.state import Session, get_session, set_session
+
+
+class UseCommand(CommandMeta):
+    keyword = "use"
+    aliases = None
+    description = "Switch workspace, without a database"
+    long_help = ""
+    arguments = {"target": {}}
+
+    async def run(self, args):
+        get_session().current_workspace = args.target
+        # Let the other sessions run in between.
+        await asyncio.sleep(0)
+        assert get_session().current_workspace == args.target
+
+
+@pytest.fixture
+def commands(tmp_path):
+    commands = Commands(manifest_path=tmp_path / "manifest.json")
+    commands.register(UseCommand)
+    return commands
+
+
+def test_default_session():
+    assert get_session() is get_session()
+    assert isinstance(get_session(), Session)
+
+
+@pytest.mark.asyncio
+async def test_concurrent_sessions(commands):
+    async def operator(name):
+        session = Session()
+        set_session(session)
+        for i in range(10):
+            await dispatch_line(f"use {name}_{i}", commands=commands)
+        return session
+
+    sessions = await asyncio.gather(*(operator(name) for name in ["a", "b", "c"]))
+
+    assert [s.current_workspace for s in sessions] == ["a_9", "b_9", "c_9"]
+
+
+@pytest.mark.asyncio
+async def test_background_job_shares_session(commands):
+    session = Session()
+    set_session(session)
+
+    await dispatch_line("use background &", commands=commands)
+    await commands.jobs.join()
+
+    assert session.current_workspace == "background"
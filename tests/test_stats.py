@@ -0,0 +1,124 @@
+import asyncio
+import tracemalloc
+
+import pytest
+
+from _snadra.stats import DispatchMetrics, Histogram, Stats, current_dispatch
+
+
+class TestHistogram:
+    def test_empty(self):
+        histogram = Histogram()
+        assert histogram.percentile(99) == 0.0
+        assert histogram.summary()["count"] == 0
+
+    def test_window(self):
+        histogram = Histogram(size=10)
+        for value in range(100):
+            histogram.record(value)
+
+        summary = histogram.summary()
+        assert summary["count"] == 100
+        assert summary["max"] == 99
+        assert summary["p50"] == 94
+        assert histogram.percentile(0) == 90
+
+
+class TestStats:
+    @pytest.mark.asyncio
+    async def test_track(self):
+        stats = Stats()
+        metrics = DispatchMetrics("help")
+
+        async def run():
+            dispatch = current_dispatch()
+            assert dispatch is not None
+            dispatch.db_queries += 2
+            dispatch.db_seconds += 0.5
+            return "result"
+
+        with metrics.stage("parse"):
+            pass
+        assert await stats.track(metrics, run()) == "result"
+        assert current_dispatch() is None
+
+        summary = stats.summary()["help"]
+        assert set(summary) == {"db_ms", "db_queries", "parse_ms", "run_ms", "total_ms"}
+        assert summary["db_queries"]["p50"] == 2
+        assert summary["db_ms"]["max"] == 500
+
+    @pytest.mark.asyncio
+    async def test_track_failure_is_recorded(self):
+        stats = Stats()
+
+        async def run():
+            raise ValueError
+
+        with pytest.raises(ValueError):
+            await stats.track(DispatchMetrics("help"), run())
+        assert stats.summary()["help"]["run_ms"]["count"] == 1
+
+    @pytest.mark.asyncio
+    async def test_track_allocations(self):
+        stats = Stats(track_allocations=True)
+
+        async def run():
+            return [bytearray(1024) for _ in range(64)]
+
+        try:
+            await stats.track(DispatchMetrics("help"), run())
+        finally:
+            tracemalloc.stop()
+        assert stats.summary()["help"]["allocated_kib"]["max"] >= 64
+
+    @pytest.mark.asyncio
+    async def test_track_allocations_concurrent(self):
+        stats = Stats(track_allocations=True)
+
+        async def run():
+            await asyncio.sleep(0)
+            return [bytearray(1024) for _ in range(64)]
+
+        async def nested():
+            # Starts and finishes while the outer dispatch runs.
+            await stats.track(DispatchMetrics("inner"), run())
+
+        try:
+            await asyncio.gather(
+                stats.track(DispatchMetrics("a"), run()),
+                stats.track(DispatchMetrics("b"), run()),
+            )
+            await stats.track(DispatchMetrics("outer"), nested())
+            await stats.track(DispatchMetrics("alone"), run())
+        finally:
+            tracemalloc.stop()
+        summary = stats.summary()
+        # The allocations of overlapping dispatches can not be told apart.
+        for keyword in ["a", "b", "outer", "inner"]:
+            assert "allocated_kib" not in summary[keyword]
+        assert summary["alone"]["allocated_kib"]["max"] >= 64
+
+    @pytest.mark.asyncio
+    async def test_track_concurrent_dispatches(self):
+        stats = Stats()
+
+        async def run():
+            for _ in range(2):
+                dispatch = current_dispatch()
+                assert dispatch is not None
+                dispatch.db_queries += 1
+                await asyncio.sleep(0)
+
+        await asyncio.gather(
+            stats.track(DispatchMetrics("a"), run()),
+            stats.track(DispatchMetrics("b"), run()),
+        )
+        summary = stats.summary()
+        assert summary["a"]["db_queries"]["max"] == 2
+        assert summary["b"]["db_queries"]["max"] == 2
+
+    def test_reset(self):
+        stats = Stats()
+        stats.record("help", "total_ms", 1.0)
+        stats.reset()
+        assert stats.summary() == {}
@@ -0,0 +1,167 @@
+import argparse
+import ipaddress
+
+from hypothesis import given
+import hypothesis.strategies as st
+import pytest
+
+from _snadra.cmd.utils import CommandMeta
+from _snadra.targets import TargetSet, target_set
+
+# Small ranges of keys, around the end of the IPv4 addresses
+intervals = st.lists(
+    st.tuples(st.integers(2**32 - 64, 2**32 + 64), st.integers(0, 8)).map(
+        lambda interval: (interval[0], interval[0] + interval[1])
+    ),
+    max_size=8,
+)
+
+
+def expand(intervals):
+    return {key for start, end in intervals for key in range(start, end + 1)}
+
+
+def keys(targets):
+    return [
+        int(address) + (0 if address.version == 4 else 2**32) for address in targets
+    ]
+
+
+@given(intervals=intervals)
+def test_dedupes(intervals):
+    targets = TargetSet(intervals)
+    expected = sorted(expand(intervals))
+
+    assert keys(targets) == expected
+    assert len(targets) == len(expected)
+    assert [targets[index] for index in range(len(targets))] == list(targets)
+
+
+@given(intervals=intervals, count=st.integers(1, 10))
+def test_shard(intervals, count):
+    targets = TargetSet(intervals)
+    shards = targets.shard(count)
+
+    assert len(shards) == count
+    assert [address for shard in shards for address in shard] == list(targets)
+    assert max(map(len, shards)) - min(map(len, shards)) <= 1
+
+
+@given(first=intervals, second=intervals)
+def test_union(first, second):
+    result = TargetSet(first) | TargetSet(second)
+    assert set(keys(result)) == expand(first) | expand(second)
+
+
+@pytest.mark.parametrize(
+    "spec, expected",
+    [
+        ("10.0.0.1", ["10.0.0.1-10.0.0.1"]),
+        ("10.0.0.0/30 10.0.0.1", ["10.0.0.0-10.0.0.3"]),
+        ("10.0.0.5/30", ["10.0.0.4-10.0.0.7"]),
+        ("10.0.0.1-10.0.0.2 10.0.0.3", ["10.0.0.1-10.0.0.3"]),
+        (
+            "192.168.1-2.1-254",
+            ["192.168.1.1-192.168.1.254", "192.168.2.1-192.168.2.254"],
+        ),
+        ("10.0.0,2.*", ["10.0.0.0-10.0.0.255", "10.0.2.0-10.0.2.255"]),
+        ("10.*.*.*", ["10.0.0.0-10.255.255.255"]),
+        ("*.*.*.*", ["0.0.0.0-255.255.255.255"]),
+        ("fe80::1-fe80::3 10.0.0.1", ["10.0.0.1-10.0.0.1", "fe80::1-fe80::3"]),
+    ],
+)
+def test_parse(spec, expected):
+    targets = TargetSet.parse(spec)
+
+    assert [f"{first}-{last}" for first, last in targets.ranges()] == expected
+    assert TargetSet.parse(str(targets)) == targets
+
+
+@pytest.mark.parametrize(
+    "spec",
+    [
+        "10.0.0",
+        "10.0.0.256",
+        "10.0.0.5-3",
+        "10.0.0.1-fe80::1",
+        "10.0.0.2-10.0.0.1",
+        "host.example",
+        "10.0.0.0/33",
+    ],
+)
+def test_parse_invalid(spec):
+    with pytest.raises(ValueError):
+        TargetSet.parse(spec)
+
+
+def test_octet_ranges_limit():
+    # 254 ** 2 ranges, under the limit
+    targets = TargetSet.parse("10.1-254.1-254.1")
+    assert targets.size == 254**2
+
+    for spec in ["*.*.*.1", "*.*.0-255.1,3", "1-255.1-255.*.1"]:
+        with pytest.raises(ValueError, match="too many ranges"):
+            TargetSet.parse(spec)
+    with pytest.raises(argparse.ArgumentTypeError, match="too many ranges"):
+        target_set("*.*.*.1")
+
+
+def test_compact():
+    targets = TargetSet.parse("10.0.0.0/8 0.0.0.0/0 ::/0")
+
+    assert targets.size == 2**32 + 2**128
+    assert len(targets._starts) == 2
+    with pytest.raises(OverflowError):
+        len(targets)
+    assert str(targets[-1]) == "ffff:ffff:ffff:ffff:ffff:ffff:ffff:ffff"
+    assert [len(shard._starts) for shard in targets.shard(3)] == [2, 1, 1]
+
+
+def test_contains():
+    targets = TargetSet.parse("10.0.0.0/24")
+
+    assert ipaddress.ip_address("10.0.0.255") in targets
+    assert "10.0.1.0" not in targets
+    assert "::a00:1" not in targets
+    assert "not an address" not in targets
+    assert 1 not in targets
+
+
+def test_file(tmp_path):
+    path = tmp_path / "targets.txt"
+    path.write_text("# Scope\n10.0.0.1 10.0.0.2\n\n10.0.0.3  # the gateway\n")
+
+    assert str(TargetSet.parse(f"file:{path} 10.0.0.0")) == "10.0.0.0/30"
+
+    path.write_text(f"file:{path}\n")
+    with pytest.raises(ValueError):
+        TargetSet.parse(f"file:{path}")
+
+
+class ScanCommand(CommandMeta):
+    keyword = "scan"
+    aliases = None
+    description = "Scan targets"
+    long_help = ""
+    arguments = {"rhosts": {"type": target_set, "help": "The targets"}}
+
+    async def run(self, args):
+        pass
+
+
+def test_argument(capfd, tmp_path):
+    parser = ScanCommand().parser
+    args = parser.parse_args(["192.168.0.1-10"])
+    assert len(args.rhosts) == 10
+
+    for invalid in ["192.168.0.300", f"file:{tmp_path / 'missing.txt'}", ""]:
+        with pytest.raises(SystemExit):
+            parser.parse_args([invalid])
+    captured_err = capfd.readouterr().err
+    assert "argument rhosts" in captured_err
+    assert "No targets" in captured_err
+
+
+def test_argparse_type_error():
+    with pytest.raises(argparse.ArgumentTypeError, match="Invalid target"):
+        target_set("nope")
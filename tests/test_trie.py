@@ -0,0 +1,43 @@
+from hypothesis import given
+import hypothesis.strategies as st
+
+from _snadra.trie import Trie
+
+
+@given(words=st.sets(st.text()), prefix=st.text(max_size=2))
+def test_iter_prefix(words, prefix):
+    trie = Trie(words)
+
+    assert len(trie) == len(words)
+    assert list(trie) == sorted(words)
+    assert list(trie.iter_prefix(prefix)) == sorted(
+        word for word in words if word.startswith(prefix)
+    )
+
+
+@given(words=st.sets(st.text()), removed=st.sets(st.text()))
+def test_discard(words, removed):
+    trie = Trie(words)
+    for word in removed:
+        assert trie.discard(word) is (word in words)
+
+    assert set(trie) == words - removed
+    assert all(word not in trie for word in removed)
+
+
+def test_add_existing():
+    trie = Trie(["a"])
+    assert not trie.add("a")
+    assert len(trie) == 1
+
+
+def test_discard_prunes():
+    trie = Trie(["ab", "abc"])
+    trie.discard("abc")
+
+    assert trie.discard("ab")
+    assert not trie._root.children
+
+
+def test_contains_not_str():
+    assert 1 not in Trie(["1"])